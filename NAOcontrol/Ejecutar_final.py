@@ -5,16 +5,21 @@ nao_control.py
 
 Controla al robot NAO recibiendo ángulos por socket y ejecutando movimientos.
 Usa setAngles con velocidad limitada para evitar exceder la velocidad máxima.
-Guarda en CSV los ángulos recibidos.
-"""
+Graba los ángulos recibidos con recorder.Recorder (binario, en segundo
+plano); recorder.py to-csv los convierte al CSV de siempre.
 
+Cada trama se aplica con un solo setAngles para todas las articulaciones que
+cambiaron más que DEADBAND_DEG; las manos se abren/cierran solo al cambiar
+de estado.
+"""
+from __future__ import print_function
 import sys
 import socket
-import json
 import time
-import csv
-from datetime import datetime
-from naoqi import ALProxy
+import math
+from wire_protocol import FrameDecoder
+from recorder import Recorder
+from proxy_pool import get_proxy, stats_line as proxy_stats_line
 
 # ======================
 # Configuración del robot
@@ -23,40 +28,74 @@ NAO_IP = "192.168.137.115"   # cámbialo a la IP de tu robot
 NAO_PORT = 9559
 SOCKET_PORT = 6000
 SPEED = 0.2  # 20% de la velocidad máxima
+DEADBAND_DEG = 1.0  # cambios menores (en grados) no se reenvían
+DEADBAND_OVERRIDES = {}  # p. ej. {"HeadYaw": 2.0}
+HAND_JOINTS = ("LHand", "RHand")
+RECORD_PREFIX = "nao_angles"  # archivos nao_angles_<fecha>_<n>.naorec
 
 # ======================
-# Logger CSV
+# Comandos al NAO
 # ======================
-class CSVLogger:
-    def __init__(self, filename_prefix="nao_angles"):
-        now_str = datetime.now().strftime("%Y%m%d_%H%M%S")
-        self.filename = "{}_{}.csv".format(filename_prefix, now_str)
-        self.file = open(self.filename, mode="wb")
-        self.writer = csv.writer(self.file)
-
-        self.joints = [
-            "HeadYaw", "HeadPitch",
-            "LShoulderPitch", "LShoulderRoll",
-            "RShoulderPitch", "RShoulderRoll",
-            "LElbowRoll", "RElbowRoll",
-            "LHand", "RHand"
-        ]
-        self.writer.writerow(["timestamp"] + self.joints)
-
-    def log(self, angles):
-        ts = time.time()
-        row = [ts] + [angles.get(j, None) for j in self.joints]
-        self.writer.writerow(row)
-
-    def close(self):
-        self.file.close()
+def build_command(angles, last_sent):
+    """
+    Articulaciones (sin manos) que superan la banda muerta respecto de lo
+    último enviado, ya en radianes. Actualiza last_sent.
+    """
+    names = []
+    values = []
+    for joint, angle in angles.items():
+        if joint in HAND_JOINTS:
+            continue
+        rad = math.radians(angle)
+        deadband = math.radians(DEADBAND_OVERRIDES.get(joint, DEADBAND_DEG))
+        previous = last_sent.get(joint)
+        if previous is not None and abs(rad - previous) < deadband:
+            continue
+        names.append(joint)
+        values.append(rad)
+        last_sent[joint] = rad
+    return names, values
+
+
+def update_hands(motion, angles, hand_state):
+    """Las manos llegan como 0/1: abre o cierra (sin esperar) solo si cambió."""
+    for hand in HAND_JOINTS:
+        if hand not in angles:
+            continue
+        is_open = angles[hand] >= 0.5
+        if hand_state.get(hand) == is_open:
+            continue
+        try:
+            if is_open:
+                motion.post.openHand(hand)
+            else:
+                motion.post.closeHand(hand)
+            hand_state[hand] = is_open
+        except Exception as e:
+            print("Error con la mano", hand, ":", e)
+
+
+def apply_angles(motion, angles, last_sent, hand_state):
+    """Devuelve la cantidad de RPCs de articulaciones realizadas (0 o 1)."""
+    update_hands(motion, angles, hand_state)
+    names, values = build_command(angles, last_sent)
+    if not names:
+        return 0
+    try:
+        motion.setAngles(names, values, SPEED)
+    except Exception as e:
+        print("Error moviendo", names, ":", e)
+        # Se reintenta en la próxima trama
+        for joint in names:
+            last_sent.pop(joint, None)
+    return 1
 
 # ======================
 # Conexión al NAO
 # ======================
 try:
-    motionProxy = ALProxy("ALMotion", NAO_IP, NAO_PORT)
-    postureProxy = ALProxy("ALRobotPosture", NAO_IP, NAO_PORT)
+    motionProxy = get_proxy("ALMotion", NAO_IP, NAO_PORT)
+    postureProxy = get_proxy("ALRobotPosture", NAO_IP, NAO_PORT)
 except Exception as e:
     print("Error al conectar con NAO:", e)
     sys.exit(1)
@@ -75,7 +114,12 @@ print("Esperando conexión en el puerto", SOCKET_PORT)
 conn, addr = server_socket.accept()
 print("Conectado con:", addr)
 
-logger = CSVLogger()
+recorder = Recorder(RECORD_PREFIX)
+decoder = FrameDecoder()
+last_sent = {}
+hand_state = {}
+frames_applied = 0
+rpc_count = 0
 
 try:
     while True:
@@ -83,28 +127,30 @@ try:
         if not data:
             break
 
-        try:
-            angles = json.loads(data)
-        except Exception as e:
-            print("Error al decodificar JSON:", e)
-            continue
-
-        # Ejecutar movimiento en NAO con límite de velocidad
-        for joint, angle in angles.items():
-            try:
-                motionProxy.setAngles(joint, angle * 3.14159 / 180.0, SPEED)  # a radianes
-            except Exception as e:
-                print("Error moviendo", joint, ":", e)
+        frames = decoder.feed(data)
+        # Grabar todas las tramas (sin E/S en este hilo)
+        for frame in frames:
+            recorder.log(frame.angles)
 
-        # Guardar en CSV
-        logger.log(angles)
+        # Al robot solo le sirve la más reciente de las que llegaron juntas
+        if frames:
+            rpc_count += apply_angles(motionProxy, frames[-1].angles, last_sent, hand_state)
+            frames_applied += 1
 
 except KeyboardInterrupt:
     print("Interrumpido por el usuario")
 
 finally:
-    logger.close()
+    if decoder.errors or decoder.lost:
+        print("Tramas inválidas:", decoder.errors, "tramas perdidas:", decoder.lost)
+    print("Tramas recibidas: {}, aplicadas: {}, llamadas setAngles: {}".format(
+        decoder.frames, frames_applied, rpc_count))
+    files = recorder.close()
+    print("Grabación: {} filas en {}".format(recorder.rows, ", ".join(files)))
+    if recorder.dropped:
+        print("Filas descartadas por escritura lenta: {}".format(recorder.dropped))
     conn.close()
     server_socket.close()
     motionProxy.setStiffnesses("Body", 0.0)
+    print(proxy_stats_line())
     print("Conexión cerrada y rigidez desactivada.")
@@ -1,12 +1,17 @@
 # -*- coding: utf-8 -*-
+import os
+import sys
 import threading
 import Tkinter as tk
 import tkMessageBox
 import json
 import time
-from naoqi import ALProxy
 import threading
 
+# proxy_pool.py está en NAOcontrol/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from proxy_pool import get_proxy, stats_line as proxy_stats_line
+
 # Configuración del robot
 ROBOT_IP = "192.168.137.134"  # Cambiar a la IP real del NAO
 PORT = 9559 #9559
@@ -64,8 +69,9 @@ def ejecutar_rutina():
         tkMessageBox.showinfo("Info", "No hay ejercicios en la rutina para ejecutar.")
         return
     try:
-        bm = ALProxy("ALBehaviorManager", ROBOT_IP, PORT)
-        tts = ALProxy("ALTextToSpeech", ROBOT_IP, PORT)
+        # Los proxies se reutilizan entre rutinas (y se reconectan si NAOqi se reinició)
+        bm = get_proxy("ALBehaviorManager", ROBOT_IP, PORT)
+        tts = get_proxy("ALTextToSpeech", ROBOT_IP, PORT)
 
         # === SALUDO (primer elemento de basicos) ===
         saludo = basicos[0]
@@ -127,6 +133,7 @@ def ejecutar_rutina():
             bm.runBehavior(despedida)
         else:
             print("[!] El comportamiento de despedida no está instalado:", despedida)
+        print(proxy_stats_line())
 
     except Exception as e:
         tkMessageBox.showerror("Error", "No se pudo conectar con el robot:\n{}".format(e))
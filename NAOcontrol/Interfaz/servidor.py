@@ -1,11 +1,15 @@
 # -*- coding: utf-8 -*-
 from time import sleep
 from flask import Flask, render_template_string, request, jsonify
-from naoqi import ALProxy
 import subprocess
 import os
+import sys
 import threading
 
+# proxy_pool.py está en NAOcontrol/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from proxy_pool import get_proxy, pool
+
 app = Flask(__name__)
 
 # Configuración del robot NAO
@@ -53,12 +57,12 @@ def ejecutar():
 
     try:
         if accion == "saludo":
-            bm = ALProxy("ALBehaviorManager", ROBOT_IP, PORT)
+            bm = get_proxy("ALBehaviorManager", ROBOT_IP, PORT)
             bm.runBehavior("saludar-909889/BienvenidaTerapia")
             return jsonify({"mensaje": "Saludo ejecutado en NAO"})
 
         elif accion == "despedida":
-            bm = ALProxy("ALBehaviorManager", ROBOT_IP, PORT)
+            bm = get_proxy("ALBehaviorManager", ROBOT_IP, PORT)
             bm.runBehavior("despedida-afd07c/behavior_1")
             return jsonify({"mensaje": "Despedida ejecutada en NAO"})
 
@@ -98,5 +102,11 @@ def ejecutar():
         return jsonify({"mensaje": mensaje}), 500
 
 
+@app.route("/proxies")
+def proxies():
+    """Reutilización de proxies de NAOqi (creados, reutilizados, reconexiones)."""
+    return jsonify(pool.stats())
+
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=8080, debug=True)
@@ -3,40 +3,238 @@
 """
 Reproduce los movimientos grabados en CSV en el robot NAO,
 respetando los tiempos originales de la grabación.
+
+Cada fila se programa contra un deadline absoluto (inicio + tiempo de la
+grabación / velocidad) sobre el reloj monotónico de clock.py, así el tiempo
+de proceso de una fila no se acumula y un ajuste de hora no la mueve.
+Dos modos:
+  stream       un setAngles por fila con todas sus articulaciones; si se
+               atrasa, salta a la fila que corresponde al momento actual
+  trajectory   sube la grabación por tramos de CHUNK_SECONDS como
+               trayectorias de angleInterpolation (tiempos por articulación)
+
+Las celdas vacías entre dos valores de una articulación se completan por
+interpolación lineal (las manos mantienen el estado anterior), así los CSV
+de keyframes de trajectory_compression.py se reproducen igual que la
+grabación original: cada tramo lleva el valor de cada articulación en sus
+bordes, y en modo stream los saltos de más de STREAM_STEP se subdividen.
+
+Uso:
+  python2.7 cargar_csv.py imitacion_nao.csv --mode trajectory --speed 0.5
+También acepta grabaciones .naorec de Ejecutar_final.py.
 """
+from __future__ import print_function
 import csv
 import math
 import time
-from naoqi import ALProxy
+import argparse
+from proxy_pool import get_proxy, stats_line as proxy_stats_line
+from clock import monotonic as clock
 
 NAO_IP = "localhost"  # Cambia a la IP de tu NAO
 NAO_PORT = 50443
+SPEED = 0.2             # fracción de la velocidad máxima en modo stream
+MIN_SPEED, MAX_SPEED = 0.5, 2.0
+CHUNK_SECONDS = 5.0     # duración de cada tramo subido en modo trajectory
+MIN_STEP = 0.02         # separación mínima entre puntos de una trayectoria (s)
+STREAM_STEP = 1.0 / 30  # separación máxima entre setAngles en modo stream (s)
+HAND_JOINTS = ("LHand", "RHand")  # 0/1, no se convierten a radianes
+
+
+def load_recording(filename):
+    """Lista de (timestamp, {articulación: valor}) ordenada por tiempo."""
+    rows = []
+    if filename.endswith(".naorec"):
+        from recorder import iter_rows
+        for ts, values in iter_rows([filename]):
+            rows.append((ts, dict((j, v) for j, v in values.items() if v is not None)))
+    else:
+        with open(filename, "rb") as f:
+            for row in csv.DictReader(f):
+                values = {}
+                for joint, val in row.items():
+                    if joint != "timestamp" and val not in [None, "", " "]:
+                        try:
+                            values[joint] = float(val)
+                        except ValueError:
+                            print("Valor inválido en {}: {}".format(joint, val))
+                rows.append((float(row["timestamp"]), values))
+    rows.sort(key=lambda r: r[0])
+    return rows
+
+
+def fill_gaps(rows):
+    """
+    Completa, por articulación, las filas que quedan entre dos valores
+    conocidos: interpolación lineal en el tiempo, o el estado anterior en
+    las manos. Antes del primer valor y después del último no se agrega nada.
+    """
+    last = {}  # articulación -> índice de la última fila con valor
+    for i, (ts, values) in enumerate(rows):
+        for joint, value in values.items():
+            j = last.get(joint)
+            last[joint] = i
+            if j is None or j == i - 1:
+                continue
+            t_prev, v_prev = rows[j][0], rows[j][1][joint]
+            span = ts - t_prev
+            for k in range(j + 1, i):
+                if joint in HAND_JOINTS or span <= 0:
+                    rows[k][1][joint] = v_prev
+                else:
+                    rows[k][1][joint] = v_prev + (value - v_prev) * (rows[k][0] - t_prev) / span
+    return rows
+
+
+def densify(rows, step=STREAM_STEP):
+    """Agrega filas interpoladas donde dos filas seguidas distan más de step."""
+    out = []
+    for (ta, va), (tb, vb) in zip(rows, rows[1:]):
+        out.append((ta, va))
+        n = int(math.ceil((tb - ta) / step - 1e-6))
+        if n < 2:
+            continue
+        joints = [j for j in va if j in vb]
+        for k in range(1, n):
+            f = float(k) / n
+            out.append((ta + (tb - ta) * f, dict(
+                (j, va[j] if j in HAND_JOINTS else va[j] + (vb[j] - va[j]) * f) for j in joints)))
+    out.append(rows[-1])
+    return out
+
+
+def to_robot(joint, value):
+    """Grados -> radianes (las manos van tal cual, 0 = cerrada, 1 = abierta)."""
+    return value if joint in HAND_JOINTS else value * math.pi / 180.0
+
+
+def sleep_until(deadline):
+    delay = deadline - clock()
+    if delay > 0:
+        time.sleep(delay)
 
-def reproducir_csv(filename):
-    motion = ALProxy("ALMotion", NAO_IP, NAO_PORT)
+
+def play_stream(motion, rows, speed=1.0, fraction=SPEED):
+    """Un setAngles por fila en su deadline; devuelve las filas salteadas."""
+    t0 = rows[0][0]
+    start = clock()
+    skipped = 0
+    i = 0
+    while i < len(rows):
+        sleep_until(start + (rows[i][0] - t0) / speed)
+        # Si ya venció el deadline de la fila siguiente, se saltea esta
+        now = clock()
+        while i + 1 < len(rows) and start + (rows[i + 1][0] - t0) / speed <= now:
+            i += 1
+            skipped += 1
+        values = rows[i][1]
+        if values:
+            names = list(values)
+            try:
+                motion.setAngles(names, [to_robot(j, values[j]) for j in names], fraction)
+            except Exception as e:
+                print("Error procesando fila {}: {}".format(i, e))
+        i += 1
+    return skipped
+
+
+def split_chunks(rows, chunk_seconds=CHUNK_SECONDS):
+    """Índices [inicio, fin) de tramos de la grabación de chunk_seconds."""
+    chunks = []
+    begin = 0
+    for i in range(1, len(rows) + 1):
+        if i == len(rows) or rows[i][0] - rows[begin][0] >= chunk_seconds:
+            chunks.append((begin, i))
+            begin = i
+    return chunks
+
+
+def build_trajectory(rows, t_start, speed, offset=0.0):
+    """
+    names, angleLists, timeLists para angleInterpolation con tiempos
+    absolutos desde t_start. offset corrige el atraso al subir el tramo;
+    los puntos que ya vencieron se descartan.
+    """
+    points = {}
+    for ts, values in rows:
+        t = (ts - t_start) / speed + offset
+        for joint, value in values.items():
+            angles, times = points.setdefault(joint, ([], []))
+            if t < MIN_STEP or (times and t - times[-1] < MIN_STEP):
+                continue
+            angles.append(to_robot(joint, value))
+            times.append(t)
+    names = [j for j in sorted(points) if points[j][1]]
+    return names, [points[j][0] for j in names], [points[j][1] for j in names]
+
+
+def play_trajectory(motion, rows, speed=1.0, chunk_seconds=CHUNK_SECONDS):
+    """Sube tramo por tramo; cada uno arranca en su deadline absoluto."""
+    t0 = rows[0][0]
+    start = clock()
+    for begin, end in split_chunks(rows, chunk_seconds):
+        # El tramo arranca desde la última fila del anterior (ya alcanzada)
+        t_start = rows[begin - 1][0] if begin else rows[begin][0]
+        deadline = start + (t_start - t0) / speed
+        sleep_until(deadline)
+        names, angles, times = build_trajectory(rows[begin:end], t_start, speed, deadline - clock())
+        if not names:
+            continue
+        try:
+            task = motion.post.angleInterpolation(names, angles, times, True)
+            motion.wait(task, 0)
+        except Exception as e:
+            print("Error en el tramo {}-{}: {}".format(begin, end, e))
+
+
+def reproducir_csv(filename, mode="stream", speed=1.0, ip=NAO_IP, port=NAO_PORT,
+                   chunk_seconds=CHUNK_SECONDS):
+    rows = fill_gaps(load_recording(filename))
+    if not rows:
+        print("La grabación está vacía.")
+        return
+    motion = get_proxy("ALMotion", ip, port)
     motion.setStiffnesses("Body", 1.0)
+    # Pose inicial antes de largar el reloj
+    first = rows[0][1]
+    names = list(first)
+    motion.angleInterpolationWithSpeed(names, [to_robot(j, first[j]) for j in names], SPEED)
+
+    duration = (rows[-1][0] - rows[0][0]) / speed
+    print("Reproduciendo {} filas ({:.1f} s a {}x) en modo {}".format(len(rows), duration, speed, mode))
+    start = clock()
+    try:
+        if mode == "trajectory":
+            play_trajectory(motion, rows, speed, chunk_seconds)
+        else:
+            skipped = play_stream(motion, densify(rows), speed)
+            if skipped:
+                print("Filas salteadas por atraso: {}".format(skipped))
+    except KeyboardInterrupt:
+        print("Interrumpido por el usuario")
+    finally:
+        print("Duración real: {:.2f} s (esperada {:.2f} s)".format(clock() - start, duration))
+        motion.setStiffnesses("Body", 0.0)
+        print(proxy_stats_line())
+
+
+def _speed(value):
+    value = float(value)
+    if not MIN_SPEED <= value <= MAX_SPEED:
+        raise argparse.ArgumentTypeError("la velocidad debe estar entre {} y {}".format(MIN_SPEED, MAX_SPEED))
+    return value
 
-    with open(filename, "rb") as f:
-        reader = csv.DictReader(f)
-        prev_ts = None
-        for row in reader:
-            ts = float(row["timestamp"])
-            if prev_ts is not None:
-                delay = ts - prev_ts
-                if delay > 0:
-                    time.sleep(delay)  # espera el mismo tiempo que en la grabación
-            prev_ts = ts
-
-            # preparar movimientos
-            for joint, val in row.items():
-                if joint != "timestamp" and val not in [None, "", " "]:
-                    try:
-                        angle_rad = float(val) * math.pi / 180.0
-                        motion.setAngles(joint, angle_rad, 0.2)  # velocidad = 20%
-                    except Exception as e:
-                        print("Error procesando {}: {}".format(joint, e))
-
-    motion.setStiffnesses("Body", 0.0)
 
 if __name__ == "__main__":
-    reproducir_csv("imitacion_nao.csv")  # archivo CSV generado
+    parser = argparse.ArgumentParser(description="Reproduce una grabación de ángulos en el NAO")
+    parser.add_argument("archivo", nargs="?", default="imitacion_nao.csv",
+                        help="CSV (o .naorec) generado al grabar")
+    parser.add_argument("--mode", choices=["stream", "trajectory"], default="stream")
+    parser.add_argument("--speed", type=_speed, default=1.0,
+                        help="escala de tiempo, de 0.5 (más lento) a 2 (más rápido)")
+    parser.add_argument("--chunk-seconds", type=float, default=CHUNK_SECONDS,
+                        help="duración de cada tramo en modo trajectory")
+    parser.add_argument("--ip", default=NAO_IP)
+    parser.add_argument("--port", type=int, default=NAO_PORT)
+    args = parser.parse_args()
+    reproducir_csv(args.archivo, args.mode, args.speed, args.ip, args.port, args.chunk_seconds)
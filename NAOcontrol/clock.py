@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+clock.py
+
+Reloj monotónico compartido por los scripts del robot y metrics.py
+(Python 2.7 y 3). En Python 3 es time.perf_counter, que es monotónico y
+tiene la mejor resolución (time.monotonic en Windows avanza de a ~15 ms).
+Python 2.7 no tiene ninguno, y time.time() salta si NTP corrige la hora a
+mitad de sesión; por eso en 2.7 se lee el reloj del sistema con ctypes:
+  - Linux / macOS: clock_gettime(CLOCK_MONOTONIC)
+  - Windows: QueryPerformanceCounter
+
+Si nada de eso está disponible se usa time.time() y MONOTONIC queda en
+False (los deadlines pueden saltar con un ajuste de hora).
+
+Uso:
+  from clock import monotonic
+  deadline = monotonic() + 0.5
+"""
+import sys
+import time
+
+MONOTONIC = True
+
+
+def _posix_clock():
+    import ctypes
+    import ctypes.util
+
+    class timespec(ctypes.Structure):
+        _fields_ = [("tv_sec", ctypes.c_long), ("tv_nsec", ctypes.c_long)]
+
+    clock_id = 6 if sys.platform == "darwin" else 1  # CLOCK_MONOTONIC
+    for name in ("c", "rt"):
+        path = ctypes.util.find_library(name)
+        if path is None:
+            continue
+        clock_gettime = getattr(ctypes.CDLL(path, use_errno=True), "clock_gettime", None)
+        if clock_gettime is None:
+            continue
+        clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(timespec)]
+
+        def monotonic():
+            # Un timespec por llamada: se usa desde varios hilos
+            ts = timespec()
+            if clock_gettime(clock_id, ctypes.byref(ts)) != 0:
+                raise OSError(ctypes.get_errno(), "clock_gettime")
+            return ts.tv_sec + ts.tv_nsec * 1e-9
+        monotonic()
+        return monotonic
+    return None
+
+
+def _windows_clock():
+    import ctypes
+    kernel32 = ctypes.windll.kernel32
+    frequency = ctypes.c_int64()
+    kernel32.QueryPerformanceFrequency(ctypes.byref(frequency))
+    scale = 1.0 / frequency.value
+
+    def monotonic():
+        counter = ctypes.c_int64()
+        kernel32.QueryPerformanceCounter(ctypes.byref(counter))
+        return counter.value * scale
+    return monotonic
+
+
+def _find_clock():
+    if hasattr(time, "perf_counter"):
+        return time.perf_counter
+    try:
+        if sys.platform == "win32":
+            return _windows_clock()
+        return _posix_clock()
+    except (OSError, AttributeError, ValueError):
+        return None
+
+
+monotonic = _find_clock()
+if monotonic is None:
+    MONOTONIC = False
+    monotonic = time.time
@@ -0,0 +1,336 @@
+# -*- coding: utf-8 -*-
+"""
+fanout.py
+
+Reparte un mismo flujo de ángulos a varios receptores del NAO (main.py o
+Ejecutar_final.py de cada robot), p. ej. en terapia grupal. Compatible con
+Python 2.7 y 3; solo usa la biblioteca estándar.
+
+Cada robot tiene su propio hilo emisor, su cola acotada y su política de
+descarte, así un robot lento o desconectado nunca atrasa a los demás:
+publish() solo encola y vuelve enseguida. Sin modo delta la trama se
+codifica una sola vez para todos; en modo delta cada robot tiene su propio
+DeltaEncoder (la referencia depende de lo que ese robot recibió).
+
+Se usa desde Vision_comp.py (--robot, una vez por robot) o con el relay:
+  python2.7 fanout.py --listen-port 6000 --robot nao1=192.168.1.10:6000 --robot nao2=192.168.1.11:6000
+"""
+from __future__ import print_function
+import re
+import socket
+import time
+import argparse
+import threading
+from collections import deque
+try:
+    from wire_protocol import (encode_frame, DeltaEncoder, FrameDecoder, FLAG_PREDICTED,
+                               DELTA_KEYFRAME_INTERVAL)
+    from metrics import Registry, SnapshotWriter
+    from clock import monotonic as clock
+except ImportError:
+    # Importado como NAOcontrol.fanout desde Vision_comp.py
+    from NAOcontrol.wire_protocol import (encode_frame, DeltaEncoder, FrameDecoder, FLAG_PREDICTED,
+                                          DELTA_KEYFRAME_INTERVAL)
+    from NAOcontrol.metrics import Registry, SnapshotWriter
+    from NAOcontrol.clock import monotonic as clock
+
+QUEUE_SIZE = 2
+DROP_POLICY = "oldest"   # "oldest": descarta lo más viejo de la cola; "newest": descarta lo que llega
+CONNECT_TIMEOUT = 1.0
+SEND_TIMEOUT = 0.5       # un robot que no acepta datos en este tiempo se reconecta
+# Buffer de envío chico: si el robot no lee, el atraso queda en la cola
+# propia (que descarta) y no en el buffer del kernel (que nunca descarta)
+SEND_BUFFER = 2048
+RECONNECT_MIN = 0.5      # espera entre reintentos, se duplica hasta RECONNECT_MAX
+RECONNECT_MAX = 5.0
+STATS_INTERVAL = 5.0
+BUFFER_SIZE = 4096
+
+
+def parse_endpoint(text, index=0):
+    """'[nombre=]host:puerto' -> (nombre, host, puerto)."""
+    name, _, address = text.rpartition("=")
+    host, _, port = address.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError("Destino inválido (se espera [nombre=]host:puerto): {}".format(text))
+    # El nombre se usa en las métricas: solo letras, números y "_"
+    name = re.sub(r"\W", "_", name) if name else "robot{}".format(index)
+    return name, host, int(port)
+
+
+class _SendQueue(object):
+    """Cola acotada que nunca bloquea al que publica."""
+
+    def __init__(self, maxsize=QUEUE_SIZE, policy=DROP_POLICY):
+        if policy not in ("oldest", "newest"):
+            raise ValueError("Política de descarte desconocida: {}".format(policy))
+        self.items = deque()
+        self.maxsize = maxsize
+        self.policy = policy
+        self.cond = threading.Condition()
+        self.closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self.cond:
+            if len(self.items) >= self.maxsize:
+                self.dropped += 1
+                if self.policy == "newest":
+                    return
+                self.items.popleft()
+            self.items.append(item)
+            self.cond.notify()
+
+    def get(self, timeout=None):
+        with self.cond:
+            if not self.items and not self.closed:
+                self.cond.wait(timeout)
+            return self.items.popleft() if self.items else None
+
+    def clear(self):
+        with self.cond:
+            self.dropped += len(self.items)
+            self.items.clear()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def __len__(self):
+        return len(self.items)
+
+
+class RobotSender(threading.Thread):
+    """
+    Hilo emisor de un robot: se conecta (y reconecta con espera creciente),
+    toma la trama más reciente de su cola y la envía. Mientras está
+    desconectado las tramas se descartan.
+    """
+
+    def __init__(self, name, host, port, registry, delta=False,
+                 keyframe_interval=DELTA_KEYFRAME_INTERVAL, use_json=False,
+                 queue_size=QUEUE_SIZE, drop_policy=DROP_POLICY):
+        threading.Thread.__init__(self, name="envio_" + name)
+        self.daemon = True
+        self.robot = name
+        self.host = host
+        self.port = port
+        self.queue = _SendQueue(queue_size, drop_policy)
+        self.encoder = DeltaEncoder(keyframe_interval) if delta else None
+        self.use_json = use_json
+        self.metrics = registry
+        self.sock = None
+        self.retry_at = 0.0
+        self.backoff = RECONNECT_MIN
+        self.sent = 0
+        self.bytes = 0
+        self.errors = 0
+        self.connects = 0
+
+    @property
+    def connected(self):
+        return self.sock is not None
+
+    def _connect(self):
+        if clock() < self.retry_at:
+            return False
+        try:
+            sock = socket.create_connection((self.host, self.port), CONNECT_TIMEOUT)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SEND_BUFFER)
+            sock.settimeout(SEND_TIMEOUT)
+        except (socket.error, socket.timeout) as e:
+            if self.connects == 0 and self.backoff == RECONNECT_MIN:
+                print("[{}] No se pudo conectar a {}:{}: {}".format(self.robot, self.host, self.port, e))
+            self.retry_at = clock() + self.backoff
+            self.backoff = min(self.backoff * 2, RECONNECT_MAX)
+            return False
+        self.sock = sock
+        self.backoff = RECONNECT_MIN
+        self.connects += 1
+        if self.encoder is not None:
+            self.encoder.force_keyframe()
+        # Lo encolado mientras no había conexión ya está viejo
+        self.queue.clear()
+        print("[{}] Conectado a {}:{}".format(self.robot, self.host, self.port))
+        return True
+
+    def _disconnect(self, error):
+        print("[{}] Conexión perdida: {}".format(self.robot, error))
+        self.errors += 1
+        self.metrics.incr("errores_" + self.robot)
+        try:
+            self.sock.close()
+        except socket.error:
+            pass
+        self.sock = None
+        self.retry_at = clock() + self.backoff
+
+    def run(self):
+        while True:
+            if self.sock is None and not self._connect():
+                if self.queue.closed:
+                    break
+                # Descarta lo que llega mientras espera para reintentar
+                self.queue.clear()
+                time.sleep(min(0.05, max(self.retry_at - clock(), 0.0)))
+                continue
+            # Sin timeout: en Python 2.7 wait(timeout) sondea cada hasta 50 ms;
+            # close() despierta al hilo igual
+            item = self.queue.get()
+            if item is None:
+                break
+            angles, seq, timestamp, flags, payload, queued = item
+            if self.encoder is not None:
+                payload = self.encoder.encode(angles, seq, timestamp, self.use_json, flags)
+            try:
+                self.sock.sendall(payload)
+            except (socket.error, socket.timeout) as e:
+                self._disconnect(e)
+                continue
+            now = time.time()
+            self.sent += 1
+            self.bytes += len(payload)
+            self.metrics.observe("espera_cola_" + self.robot, clock() - queued)
+            self.metrics.observe("captura_a_envio_" + self.robot, max(now - timestamp, 0.0))
+            self.metrics.mark("envio_" + self.robot)
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+
+class FanOut(object):
+    """Publica cada trama de ángulos una sola vez a todos los robots."""
+
+    def __init__(self, endpoints, delta=False, keyframe_interval=DELTA_KEYFRAME_INTERVAL,
+                 use_json=False, queue_size=QUEUE_SIZE, drop_policy=DROP_POLICY, registry=None):
+        self.metrics = registry if registry is not None else Registry()
+        self.delta = delta
+        self.use_json = use_json
+        self.published = 0
+        self.senders = []
+        for i, endpoint in enumerate(endpoints):
+            name, host, port = parse_endpoint(endpoint, i) if isinstance(endpoint, str) else endpoint
+            sender = RobotSender(name, host, port, self.metrics, delta, keyframe_interval,
+                                 use_json, queue_size, drop_policy)
+            self.senders.append(sender)
+            self.metrics.gauge("cola_" + name, lambda s=sender: len(s.queue))
+            self.metrics.gauge("descartadas_" + name, lambda s=sender: s.queue.dropped)
+            self.metrics.gauge("conectado_" + name, lambda s=sender: int(s.connected))
+
+    def start(self):
+        for sender in self.senders:
+            sender.start()
+        return self
+
+    def publish(self, angles, seq, timestamp=None, flags=0):
+        """Encola la trama para cada robot; nunca espera a la red."""
+        if timestamp is None:
+            timestamp = time.time()
+        payload = None
+        if not self.delta:
+            payload = encode_frame(angles, seq, timestamp, self.use_json, flags)
+        item = (angles, seq, timestamp, flags, payload, clock())
+        for sender in self.senders:
+            sender.queue.put(item)
+        self.published += 1
+
+    def stop(self, timeout=2.0):
+        for sender in self.senders:
+            sender.queue.close()
+        for sender in self.senders:
+            sender.join(timeout)
+
+    def stats_lines(self):
+        """Una línea por robot: enviadas, descartadas, reconexiones y retraso."""
+        lines = []
+        for s in self.senders:
+            hist = self.metrics.histograms.get("captura_a_envio_" + s.robot)
+            lag = ""
+            if hist is not None and hist.count:
+                lag = ", retraso p50/p95 {:.1f}/{:.1f} ms".format(hist.percentile(0.5) * 1000,
+                                                                  hist.percentile(0.95) * 1000)
+            lines.append("[{}] {}:{} {} enviadas, {} descartadas, {} conexiones, {} errores{}".format(
+                s.robot, s.host, s.port, s.sent, s.queue.dropped, s.connects, s.errors, lag))
+        return lines
+
+
+# ======================
+# Relay
+# ======================
+def relay(listen_ip, listen_port, fanout):
+    """
+    Recibe el flujo de un Vision_comp.py (uno por vez) y lo reparte a los
+    robots. Las tramas delta se reconstruyen antes de reenviar.
+    """
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind((listen_ip, listen_port))
+    server.listen(1)
+    print("Relay escuchando en {}:{} para {} robots".format(listen_ip, listen_port, len(fanout.senders)))
+    decoder = FrameDecoder()
+    next_stats = time.time() + STATS_INTERVAL
+    try:
+        while True:
+            conn, addr = server.accept()
+            print("Cliente de visión conectado:", addr)
+            decoder.reset()
+            conn.settimeout(1.0)
+            try:
+                while True:
+                    try:
+                        data = conn.recv(BUFFER_SIZE)
+                    except socket.timeout:
+                        data = None
+                    if data == b"":
+                        break
+                    for frame in decoder.feed(data or b""):
+                        fanout.publish(frame.angles, frame.seq, frame.timestamp,
+                                       frame.flags & FLAG_PREDICTED)
+                    if time.time() >= next_stats:
+                        for line in fanout.stats_lines():
+                            print(line)
+                        next_stats = time.time() + STATS_INTERVAL
+            finally:
+                conn.close()
+                print("Cliente de visión desconectado.")
+    finally:
+        server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reparte un flujo de ángulos a varios robots NAO")
+    parser.add_argument("--robot", action="append", required=True, metavar="[NOMBRE=]HOST:PUERTO",
+                        help="receptor de un robot (repetir por cada uno)")
+    parser.add_argument("--listen", default="0.0.0.0")
+    parser.add_argument("--listen-port", type=int, default=6000)
+    parser.add_argument("--delta", action="store_true", help="enviar a cada robot en modo delta")
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE)
+    parser.add_argument("--drop", choices=["oldest", "newest"], default=DROP_POLICY,
+                        help="qué descartar cuando la cola de un robot está llena")
+    parser.add_argument("--metrics-file", default=None,
+                        help="escribe el retraso por robot en este archivo (.json o .prom)")
+    args = parser.parse_args()
+
+    registry = Registry(prefix="relay")
+    fanout = FanOut(args.robot, args.delta, queue_size=args.queue_size,
+                    drop_policy=args.drop, registry=registry).start()
+    writer = None
+    if args.metrics_file:
+        writer = SnapshotWriter(registry, args.metrics_file, STATS_INTERVAL)
+        writer.start()
+    try:
+        relay(args.listen, args.listen_port, fanout)
+    except KeyboardInterrupt:
+        print("Relay detenido.")
+    finally:
+        fanout.stop()
+        if writer is not None:
+            writer.stop()
+        for line in fanout.stats_lines():
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,15 +4,29 @@
 nao_control.py
 
 Script para controlar un robot NAO mediante NAOqi (Python 2.7).
-Escucha ángulos corporales enviados en JSON por socket y mueve las articulaciones del robot.
+Escucha ángulos corporales enviados por socket (tramas de wire_protocol) y
+mueve las articulaciones del robot.
+
+Un hilo de red atiende con select() a uno o varios clientes de visión y
+conserva solo la pose más reciente que elige el árbitro (ARBITRATION); el
+hilo principal la aplica con llamadas no bloqueantes (setAngles / post), de
+modo que el retraso no crece aunque la visión envíe más rápido de lo que el
+robot se mueve. Los clientes pueden desconectarse y volver sin que el robot
+repita la postura inicial.
 """
 from __future__ import print_function
 import sys
 import socket
-import json
 import math
 import time
-from naoqi import ALProxy
+import errno
+import select
+import argparse
+import threading
+from wire_protocol import Frame, FrameDecoder, FLAG_PREDICTED, JOINT_ORDER
+from metrics import Registry, SnapshotWriter
+from proxy_pool import get_proxy, stats_line as proxy_stats_line
+from clock import monotonic
 
 # Mapeo de nombres de ángulos a nombres de articulaciones de NAO
 ANGLE_MAP = {
@@ -56,19 +70,375 @@ def clamp(val, lo, hi):
 NAO_IP = "192.168.137.115"  # Cambiar a la IP de tu robot NAO
 NAO_PORT = 9559     # Puerto NAOqi (por defecto 9559)
 SOCK_IP = "127.0.0.1"
-SOCK_PORT = 6000       # Puerto para recibir ángulos JSON
+SOCK_PORT = 6000       # Puerto para recibir las tramas de ángulos
 BUFFER_SIZE = 4096
+ACTUATION_HZ = 30       # Frecuencia máxima de comandos al robot
+SPEED_FRACTION = 0.3    # Fracción de la velocidad máxima para setAngles
+STATS_INTERVAL = 5.0    # Segundos entre reportes de tramas descartadas
+METRICS_FILE = None     # p. ej. "metricas_nao.json" o "metricas_nao.prom"
+
+# Varios clientes de visión (p. ej. cámara principal y de respaldo)
+MAX_CLIENTS = 4
+ARBITRATION = "priority"   # "priority", "freshest" o "confidence"
+CLIENT_PRIORITIES = {}     # IP -> prioridad (menor = preferido), p. ej. {"192.168.137.10": 0}
+DEFAULT_PRIORITY = 1
+STALE_AFTER = 0.5          # s sin tramas para dar a un cliente por callado
+PREDICTED_CONFIDENCE = 0.5 # peso de una trama extrapolada frente a una inferida
+CONFIDENCE_ALPHA = 0.2
+SELECT_TIMEOUT = 0.2
+# Las tramas llevan la hora de captura del reloj del cliente. Si los relojes
+# están sincronizados (NTP/chrony) se usan tal cual; si no, se estima el
+# desfase por cliente (ver ClientConnection). Los clientes locales siempre
+# comparten el reloj.
+SYNCED_CLOCKS = False
+LOCAL_ADDRESSES = ("127.0.0.1", "::1", "localhost")
+HAND_JOINTS = ("LHand", "RHand")
+
+# Latencias del lado del robot: red (captura -> recepción), espera en el
+# buzón, RPCs al NAO y punta a punta (captura -> comando enviado al NAO).
+# Con relojes distintos, red y punta a punta no incluyen la demora mínima
+# de captura a recepción, que queda dentro del desfase estimado
+metrics = Registry()
 
 def deg2rad(deg):
     return deg * math.pi / 180.0
 
-def main(robot_ip, robot_port, sock_ip, sock_port):
-    # Conectar a los proxies de NAO
+class LatestPose(object):
+    """
+    Buzón de una sola pose: cada trama nueva reemplaza a la anterior si esta
+    todavía no se aplicó, y se cuenta como descartada. Junto con la trama
+    guarda su hora de captura en el reloj monotónico local.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self.frame = None
+        self.captured = None
+        self.put_time = None
+        self.closed = False
+        self.received = 0
+        self.applied = 0
+        self.discarded = 0
+        self.predicted = 0  # tramas extrapoladas (sin inferencia) en Vision_comp
+
+    def put(self, frame, captured):
+        with self.lock:
+            if self.frame is not None:
+                self.discarded += 1
+            self.frame = frame
+            self.captured = captured
+            self.put_time = monotonic()
+            self.received += 1
+            if frame.flags & FLAG_PREDICTED:
+                self.predicted += 1
+            self.ready.set()
+
+    def take(self, timeout=None):
+        """(pose pendiente, hora de captura) o (None, None) si no llegó nada a tiempo."""
+        self.ready.wait(timeout)
+        with self.lock:
+            frame, captured = self.frame, self.captured
+            self.frame = self.captured = None
+            self.ready.clear()
+            if frame is not None:
+                self.applied += 1
+                metrics.observe("espera", monotonic() - self.put_time)
+            return frame, captured
+
+    def close(self):
+        self.closed = True
+        self.ready.set()
+
+
+# ======================
+# Servidor de varios clientes
+# ======================
+class ClientConnection(object):
+    """Un cliente de visión conectado, con su propio decodificador."""
+
+    def __init__(self, sock, addr, client_id, priority, synced=SYNCED_CLOCKS):
+        self.sock = sock
+        self.addr = addr
+        self.id = client_id
+        self.priority = priority
+        self.decoder = FrameDecoder()
+        self.frame = None        # última trama (pose completa)
+        self.received_at = None  # hora local de la última trama
+        # Mínimo de (recepción - timestamp): pasa la hora de captura, medida
+        # con el reloj del cliente, al reloj local (desfase + demora mínima).
+        # Con el mismo reloj (cliente local o relojes sincronizados) es 0
+        self.same_clock = synced or addr[0] in LOCAL_ADDRESSES
+        self.clock_offset = 0.0 if self.same_clock else None
+        self.confidence = 0.0
+
+    def update(self, frame, now):
+        self.frame = frame
+        self.received_at = now
+        offset = now - frame.timestamp
+        if not self.same_clock and (self.clock_offset is None or offset < self.clock_offset):
+            self.clock_offset = offset
+        sample = PREDICTED_CONFIDENCE if frame.flags & FLAG_PREDICTED else 1.0
+        sample *= float(len(frame.angles)) / len(JOINT_ORDER)
+        self.confidence += CONFIDENCE_ALPHA * (sample - self.confidence)
+
+    def weight(self, now):
+        """Confianza descontada por la antigüedad de la última trama."""
+        if self.received_at is None:
+            return 0.0
+        return self.confidence * max(0.0, 1.0 - (now - self.received_at) / STALE_AFTER)
+
+    def fresh(self, now):
+        return self.received_at is not None and now - self.received_at < STALE_AFTER
+
+    def local_capture(self, frame):
+        """Hora de captura de frame en el reloj local (tras update)."""
+        return frame.timestamp + self.clock_offset
+
+
+class Arbiter(object):
+    """
+    Decide qué llega al robot cuando hay varios clientes:
+      priority    el de mejor prioridad (menor número) con tramas recientes;
+                  si se calla más de STALE_AFTER, toma el siguiente
+      freshest    cualquier trama con captura más nueva que la última aplicada;
+                  las capturas se comparan en el reloj local (clock_offset),
+                  porque cada cliente pone la hora de su propia máquina
+      confidence  promedio de las poses recientes pesado por la confianza de
+                  cada cliente (manos: las del cliente de más confianza)
+    """
+
+    def __init__(self, policy=ARBITRATION):
+        self.policy = policy
+        self.last_source = None
+        self.last_capture = None  # hora local de captura de la última trama aplicada
+        self.seq = 0
+
+    def select(self, client, frame, clients, now):
+        """Trama a aplicar (o None) al llegar frame desde client."""
+        if self.policy == "confidence":
+            return self._blend(client, frame, clients, now)
+        if self.policy == "priority":
+            active = min([c for c in clients if c.fresh(now)] or [client],
+                         key=lambda c: (c.priority, c.id))
+            if active is not client:
+                return None
+        elif self.last_capture is not None and client.local_capture(frame) <= self.last_capture:
+            return None
+        # Un delta vacío no mueve al robot, salvo al cambiar de cliente
+        if not frame.changed and client.id == self.last_source:
+            return None
+        self.last_source = client.id
+        self.last_capture = client.local_capture(frame)
+        return frame
+
+    def _blend(self, client, frame, clients, now):
+        weighted = [(c.weight(now), c.frame) for c in clients if c.frame is not None]
+        weighted = [(w, f) for w, f in weighted if w > 0]
+        if len(weighted) <= 1:
+            # Un solo cliente: igual que las otras políticas
+            if not frame.changed and client.id == self.last_source:
+                return None
+            self.last_source = client.id
+            return frame
+        self.last_source = "blend"
+        totals, sums = {}, {}
+        for w, f in weighted:
+            for joint, value in f.angles.items():
+                if joint in HAND_JOINTS:
+                    continue
+                totals[joint] = totals.get(joint, 0.0) + w
+                sums[joint] = sums.get(joint, 0.0) + w * value
+        angles = dict((j, sums[j] / totals[j]) for j in sums)
+        best = max(weighted, key=lambda item: item[0])[1]
+        for hand in HAND_JOINTS:
+            if hand in best.angles:
+                angles[hand] = best.angles[hand]
+        self.seq += 1
+        return Frame(frame.version, frame.flags & FLAG_PREDICTED, self.seq, frame.timestamp,
+                     angles, tuple(angles))
+
+
+class AngleServer(object):
+    """
+    Acepta clientes de visión en cualquier momento (también reconexiones)
+    con select(), sin tocar al robot; cada trama pasa por el árbitro y la
+    elegida va al buzón LatestPose del bucle de actuación.
+    """
+
+    def __init__(self, host, port, latest, policy=ARBITRATION, max_clients=MAX_CLIENTS,
+                 synced_clocks=SYNCED_CLOCKS):
+        self.latest = latest
+        self.arbiter = Arbiter(policy)
+        self.synced_clocks = synced_clocks
+        self.max_clients = max_clients
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind((host, port))
+        self.listener.listen(max_clients)
+        self.listener.setblocking(False)
+        self.clients = {}  # socket -> ClientConnection
+        self.accepted = 0
+        self.rejected = 0
+        self.frames = 0
+        self.errors = 0   # acumulados de los clientes ya desconectados
+        self.lost = 0
+        self.running = True
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(2 * SELECT_TIMEOUT)
+
+    def run(self):
+        try:
+            while self.running:
+                readable, _, _ = select.select([self.listener] + list(self.clients), [], [], SELECT_TIMEOUT)
+                for sock in readable:
+                    if sock is self.listener:
+                        self._accept()
+                    else:
+                        self._read(sock)
+        finally:
+            for sock in list(self.clients):
+                self._drop(sock, "servidor detenido")
+            self.listener.close()
+            self.latest.close()
+
+    def _accept(self):
+        try:
+            sock, addr = self.listener.accept()
+        except socket.error:
+            return
+        if len(self.clients) >= self.max_clients:
+            self.rejected += 1
+            print("Cliente rechazado (máximo {}): {}".format(self.max_clients, addr))
+            sock.close()
+            return
+        sock.setblocking(False)
+        priority = CLIENT_PRIORITIES.get(addr[0], DEFAULT_PRIORITY)
+        client = ClientConnection(sock, addr, self.accepted, priority, self.synced_clocks)
+        self.clients[sock] = client
+        self.accepted += 1
+        print("Cliente {} conectado desde {} (prioridad {})".format(client.id, addr, priority))
+
+    def _read(self, sock):
+        client = self.clients[sock]
+        try:
+            data = sock.recv(BUFFER_SIZE)
+        except socket.error as e:
+            if e.args and e.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                return
+            self._drop(sock, "error de socket: {}".format(e))
+            return
+        if not data:
+            self._drop(sock, "conexión cerrada por el cliente")
+            return
+        now = time.time()
+        now_mono = monotonic()
+        clients = list(self.clients.values())
+        for frame in client.decoder.feed(data):
+            self.frames += 1
+            client.update(frame, now)
+            # Hora de captura de Vision_comp, pasada al reloj local
+            age = now - client.local_capture(frame)
+            metrics.observe("red", age)
+            metrics.mark("recepcion")
+            chosen = self.arbiter.select(client, frame, clients, now)
+            if chosen is not None:
+                # La antigüedad medida con el reloj de pared, anclada al
+                # monotónico: la actuación ya no depende de time.time()
+                self.latest.put(chosen, now_mono - age)
+
+    def _drop(self, sock, reason):
+        client = self.clients.pop(sock)
+        self.errors += client.decoder.errors
+        self.lost += client.decoder.lost
+        try:
+            sock.close()
+        except socket.error:
+            pass
+        print("Cliente {} desconectado ({}); el robot sigue en su pose".format(client.id, reason))
+
+    def totals(self):
+        """Errores y tramas perdidas, incluidos los clientes conectados."""
+        clients = list(self.clients.values())
+        return (self.errors + sum(c.decoder.errors for c in clients),
+                self.lost + sum(c.decoder.lost for c in clients))
+
+
+def apply_angles(motion, angles_dict, last_hand_state):
+    joint_names = []
+    target_angles = []
+
+    # Ejecutar apertura/cierre de manos asincrónicamente (solo si cambió estado)
+    for hand_key in ["LHand", "RHand"]:
+        if hand_key in angles_dict:
+            current = angles_dict[hand_key] >= 0.5
+            if last_hand_state[hand_key] != current:
+                try:
+                    with metrics.timer("manos"):
+                        if current:
+                            motion.post.openHand(hand_key)
+                        else:
+                            motion.post.closeHand(hand_key)
+                except Exception as e:
+                    print("Error con la mano {}: {}".format(hand_key, e))
+                last_hand_state[hand_key] = current
+
+    # Procesar articulaciones (excluyendo manos)
+    for key, joint in ANGLE_MAP.items():
+        if key in angles_dict and key not in ["LHand", "RHand"]:
+            deg_val = angles_dict[key]            # llega en grados
+            rad_val = deg2rad(deg_val)  ##MATH.RADIANS????
+
+            
+            # ⬇️ Ajusta al rango físico
+            lo, hi = JOINT_LIMITS_RAD[joint]
+            rad_val = clamp(rad_val, lo, hi)
+
+            joint_names.append(joint)
+            target_angles.append(rad_val)
+
+            
+    # Mover articulaciones (no bloqueante: setAngles retorna de inmediato y
+    # un nuevo objetivo reemplaza al anterior en el controlador del NAO)
+    if joint_names:
+        #print("Ángulos (rad) enviados al NAO:")
+        #for n, a in zip(joint_names, target_angles):
+        #    print("  {}: {:.4f}".format(n, a))
+        try:
+            with metrics.timer("setAngles"):
+                motion.setAngles(joint_names, target_angles, SPEED_FRACTION)
+        except Exception as e:
+            print("Error moviendo articulaciones: {}".format(e))
+
+
+def print_stats(latest, server):
+    errors, lost = server.totals()
+    print("Tramas recibidas: {} ({} elegidas, {} predichas), aplicadas: {}, descartadas por viejas: {}, inválidas: {}, perdidas: {}".format(
+        server.frames, latest.received, latest.predicted, latest.applied, latest.discarded, errors, lost))
+    print("Clientes conectados: {} (aceptados: {}, rechazados: {})".format(
+        len(server.clients), server.accepted, server.rejected))
+    for line in metrics.summary_lines():
+        print("  " + line)
+    print(proxy_stats_line())
+
+def main(robot_ip, robot_port, sock_ip, sock_port, policy=ARBITRATION, exit_when_idle=False,
+         synced_clocks=SYNCED_CLOCKS):
+    # Conectar a los proxies de NAO (proxy_pool importa naoqi recién aquí,
+    # así apply_angles se puede usar en los benchmarks sin el SDK)
     try:
-        motion = ALProxy("ALMotion", robot_ip, robot_port)
-        posture = ALProxy("ALRobotPosture", robot_ip, robot_port)
-        tts = ALProxy("ALTextToSpeech", robot_ip, robot_port)
-        autonomousLifeProxy = ALProxy("ALAutonomousLife", robot_ip, robot_port)
+        motion = get_proxy("ALMotion", robot_ip, robot_port)
+        posture = get_proxy("ALRobotPosture", robot_ip, robot_port)
+        tts = get_proxy("ALTextToSpeech", robot_ip, robot_port)
+        autonomousLifeProxy = get_proxy("ALAutonomousLife", robot_ip, robot_port)
 
     except Exception as e:
         print("Error al conectar con NAOqi:", e)
@@ -77,98 +447,76 @@ def main(robot_ip, robot_port, sock_ip, sock_port):
     motion.setStiffnesses("Body", 1.0)
     posture.goToPosture("Stand", 0.5)
 
-    # Configurar socket TCP para escuchar ángulos
-    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    s.bind((sock_ip, sock_port))
-    s.listen(1)
-    print("Esperando conexión en {}:{}...".format(sock_ip, sock_port))
-    conn, addr = s.accept()
-    print("Conectado desde", addr)
-    # Hacer que NAO diga una frase
-    tts.say("Estoy listo y preparado, realiza un movimiento con las extremidades")
-
-
-
-
+    # Servidor TCP: los clientes de visión entran y salen sin reiniciar el robot
     last_hand_state = {"LHand": None, "RHand": None}
+    latest = LatestPose()
+    server = AngleServer(sock_ip, sock_port, latest, policy, synced_clocks=synced_clocks)
+    server.start()
+    print("Esperando clientes en {}:{} (arbitraje: {})...".format(sock_ip, sock_port, policy))
+
+    metrics.gauge("recibidas", lambda: server.frames)
+    metrics.gauge("descartadas", lambda: latest.discarded)
+    metrics.gauge("perdidas", lambda: server.totals()[1])
+    metrics.gauge("clientes", lambda: len(server.clients))
+    writer = None
+    if METRICS_FILE:
+        writer = SnapshotWriter(metrics, METRICS_FILE, STATS_INTERVAL)
+        writer.start()
 
+    greeted = False
+    period = 1.0 / ACTUATION_HZ
+    next_stats = time.time() + STATS_INTERVAL
     try:
-        while True:
-            data = conn.recv(BUFFER_SIZE)
-            if not data:
-                print("Conexión cerrada por cliente.")
+        while not latest.closed:
+            if not greeted and server.accepted:
+                # Hacer que NAO diga una frase (en segundo plano, una sola vez)
+                tts.post.say("Estoy listo y preparado, realiza un movimiento con las extremidades")
+                greeted = True
+            if exit_when_idle and server.accepted and not server.clients:
+                print("Sin clientes conectados.")
                 break
-            try:
-                angles_dict = json.loads(data)
-            except ValueError:
-                #print("Datos JSON inválidos recibidos:", data)
-                continue
-
-            joint_names = []
-            target_angles = []
-
-            # Ejecutar apertura/cierre de manos asincrónicamente (solo si cambió estado)
-            for hand_key in ["LHand", "RHand"]:
-                if hand_key in angles_dict:
-                    current = angles_dict[hand_key] >= 0.5
-                    if last_hand_state[hand_key] != current:
-                        try:
-                            if current:
-                                motion.post.openHand(hand_key)
-                            else:
-                                motion.post.closeHand(hand_key)
-                        except Exception as e:
-                            print("Error con la mano {}: {}".format(hand_key, e))
-                        last_hand_state[hand_key] = current
-
-            # Procesar articulaciones (excluyendo manos)
-            for key, joint in ANGLE_MAP.items():
-                if key in angles_dict and key not in ["LHand", "RHand"]:
-                    deg_val = angles_dict[key]            # llega en grados
-                    rad_val = deg2rad(deg_val)  ##MATH.RADIANS????
-
-                    
-                    # ⬇️ Ajusta al rango físico
-                    lo, hi = JOINT_LIMITS_RAD[joint]
-                    rad_val = clamp(rad_val, lo, hi)
-
-                    joint_names.append(joint)
-                    target_angles.append(rad_val)
-
-                    
-            # Mover articulaciones (bloqueante para evitar conflictos)
-            if joint_names:
-                #print("Ángulos recibidos en radianes:")
-                print("Ángulos (rad) enviados al NAO:")
-                for n, a in zip(joint_names, target_angles):
-                    print("  {}: {:.4f}".format(n, a))
-
-                times = [0.5] * len(joint_names)  # Duración fija de 0.5s para suavidad
-                try:
-                    motion.angleInterpolation(joint_names, target_angles, times, True)
-                except Exception as e:
-                    print("Error moviendo articulaciones: {}".format(e))
 
-            time.sleep(0.01)  # Pequeña pausa para evitar saturar CPU
+            frame, captured = latest.take(timeout=period)
+            if frame is not None:
+                start = time.time()
+                apply_angles(motion, frame.angles, last_hand_state)
+                metrics.observe("captura_a_robot", monotonic() - captured)
+                metrics.mark("actuacion")
+                # Limita la tasa de RPCs; las poses intermedias se descartan
+                remaining = period - (time.time() - start)
+                if remaining > 0:
+                    time.sleep(remaining)
+
+            if time.time() >= next_stats:
+                print_stats(latest, server)
+                next_stats = time.time() + STATS_INTERVAL
 
     except KeyboardInterrupt:
         print("Interrupción por teclado.")
     finally:
-        print("Cerrando conexión y bajando rigidez.")
-        conn.close()
-        s.close()
+        print("Cerrando conexiones y bajando rigidez.")
+        server.stop()
+        print_stats(latest, server)
+        if writer is not None:
+            writer.stop()
         motion.setStiffnesses("Body", 0.0)
         print("Robot en reposo.")
 
 
 if __name__ == '__main__':
-    ip = NAO_IP
-    port = NAO_PORT
-    if len(sys.argv) >= 2:
-        ip = sys.argv[1]
-    if len(sys.argv) >= 3:
-        port = int(sys.argv[2])
-
-    print("Iniciando control NAO en {}:{}".format(ip, port))
-    main(ip, port, SOCK_IP, SOCK_PORT)
+    parser = argparse.ArgumentParser(description="Control del NAO con ángulos recibidos por socket")
+    parser.add_argument("ip", nargs="?", default=NAO_IP, help="IP del robot")
+    parser.add_argument("port", nargs="?", type=int, default=NAO_PORT, help="puerto de NAOqi")
+    parser.add_argument("--listen", default=SOCK_IP, help="interfaz donde escuchar a los clientes")
+    parser.add_argument("--listen-port", type=int, default=SOCK_PORT)
+    parser.add_argument("--policy", choices=["priority", "freshest", "confidence"], default=ARBITRATION,
+                        help="cómo elegir entre varios clientes de visión")
+    parser.add_argument("--exit-when-idle", action="store_true",
+                        help="terminar cuando se desconecta el último cliente (comportamiento anterior)")
+    parser.add_argument("--synced-clocks", action="store_true", default=SYNCED_CLOCKS,
+                        help="los relojes de las PCs de visión están sincronizados con este (NTP)")
+    args = parser.parse_args()
+
+    print("Iniciando control NAO en {}:{}".format(args.ip, args.port))
+    main(args.ip, args.port, args.listen, args.listen_port, args.policy, args.exit_when_idle,
+         args.synced_clocks)
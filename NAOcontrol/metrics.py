@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""
+metrics.py
+
+Instrumentación liviana de latencias, compartida por Vision_comp.py
+(Python 3) y los receptores del NAO (Python 2.7). Solo usa la biblioteca
+estándar.
+
+  Histogram  tiempos en buckets fijos (sin guardar muestras), con p50/p95/p99
+  Meter      eventos por segundo (FPS)
+  Registry   agrupa histogramas, contadores, medidores y gauges; genera
+             snapshots en JSON o en texto de Prometheus
+  SnapshotWriter  hilo que escribe el snapshot a un archivo cada N segundos
+
+Las duraciones se miden con clock.monotonic (perf_counter en Python 3, el
+reloj monotónico del sistema en 2.7). Las latencias de punta a punta las
+calcula quien llama: main.py pasa la captura remota al reloj local con el
+desfase estimado de cada cliente.
+"""
+from __future__ import print_function
+import bisect
+import json
+import os
+import threading
+import time
+try:
+    from clock import monotonic as clock
+except ImportError:
+    # Importado como NAOcontrol.metrics desde Vision_comp.py
+    from NAOcontrol.clock import monotonic as clock
+
+# Límites superiores de los buckets, en segundos (0.1 ms a 5 s)
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.002, 0.003, 0.005, 0.0075,
+    0.01, 0.015, 0.02, 0.03, 0.04, 0.05, 0.075, 0.1, 0.15, 0.2,
+    0.3, 0.5, 0.75, 1.0, 2.0, 5.0
+)
+PERCENTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram(object):
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.bounds = list(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)  # el último: desborde
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, seconds):
+        idx = bisect.bisect_left(self.bounds, seconds)
+        with self.lock:
+            self.counts[idx] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def percentile(self, q):
+        """Estimación interpolando dentro del bucket (None sin muestras)."""
+        with self.lock:
+            counts = list(self.counts)
+            count = self.count
+            top = self.max
+        if not count:
+            return None
+        target = q * count
+        cumulative = 0
+        for idx, n in enumerate(counts):
+            if n and cumulative + n >= target:
+                lower = self.bounds[idx - 1] if idx > 0 else 0.0
+                upper = self.bounds[idx] if idx < len(self.bounds) else top
+                upper = min(upper, top)
+                frac = (target - cumulative) / float(n)
+                return lower + (max(upper, lower) - lower) * frac
+            cumulative += n
+        return top
+
+    def summary(self):
+        result = {"count": self.count,
+                  "mean": self.total / self.count if self.count else None,
+                  "max": self.max if self.count else None}
+        for q in PERCENTILES:
+            result["p%d" % int(q * 100)] = self.percentile(q)
+        return result
+
+
+class Meter(object):
+    """Tasa de eventos por segundo, promediada exponencialmente."""
+
+    def __init__(self, alpha=0.1):
+        self.alpha = alpha
+        self.count = 0
+        self.rate = 0.0
+        self.last = None
+
+    def mark(self):
+        now = clock()
+        if self.last is not None:
+            dt = now - self.last
+            if dt > 0:
+                inst = 1.0 / dt
+                self.rate = inst if self.count == 1 else self.alpha * inst + (1 - self.alpha) * self.rate
+        self.last = now
+        self.count += 1
+
+
+class _Timer(object):
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = clock()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(clock() - self.start)
+
+
+class Registry(object):
+    def __init__(self, prefix="nao"):
+        self.prefix = prefix
+        self.histograms = {}
+        self.meters = {}
+        self.counters = {}
+        self.gauges = {}
+        self.lock = threading.Lock()
+        self.started = time.time()
+
+    def histogram(self, name):
+        hist = self.histograms.get(name)
+        if hist is None:
+            with self.lock:
+                hist = self.histograms.setdefault(name, Histogram())
+        return hist
+
+    def meter(self, name):
+        meter = self.meters.get(name)
+        if meter is None:
+            with self.lock:
+                meter = self.meters.setdefault(name, Meter())
+        return meter
+
+    def timer(self, name):
+        """Uso: `with metrics.timer("holistic"): ...`"""
+        return _Timer(self.histogram(name))
+
+    def observe(self, name, seconds):
+        self.histogram(name).observe(seconds)
+
+    def mark(self, name):
+        self.meter(name).mark()
+
+    def incr(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def gauge(self, name, func):
+        """Registra una función que devuelve el valor actual (p. ej. len(cola))."""
+        self.gauges[name] = func
+
+    def snapshot(self):
+        gauges = {}
+        for name, func in list(self.gauges.items()):
+            try:
+                gauges[name] = func()
+            except Exception:
+                gauges[name] = None
+        return {
+            "timestamp": time.time(),
+            "uptime": time.time() - self.started,
+            "stages": dict((name, hist.summary()) for name, hist in list(self.histograms.items())),
+            "fps": dict((name, meter.rate) for name, meter in list(self.meters.items())),
+            "counters": dict(self.counters),
+            "gauges": gauges,
+        }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2, sort_keys=True)
+
+    def to_prometheus(self):
+        p = self.prefix
+        lines = ["# TYPE %s_stage_seconds histogram" % p]
+        for name, hist in sorted(self.histograms.items()):
+            with hist.lock:
+                counts = list(hist.counts)
+                count, total = hist.count, hist.total
+            cumulative = 0
+            for bound, n in zip(hist.bounds, counts):
+                cumulative += n
+                lines.append('%s_stage_seconds_bucket{stage="%s",le="%g"} %d' % (p, name, bound, cumulative))
+            lines.append('%s_stage_seconds_bucket{stage="%s",le="+Inf"} %d' % (p, name, count))
+            lines.append('%s_stage_seconds_sum{stage="%s"} %.6f' % (p, name, total))
+            lines.append('%s_stage_seconds_count{stage="%s"} %d' % (p, name, count))
+        lines.append("# TYPE %s_stage_quantile_seconds gauge" % p)
+        for name, hist in sorted(self.histograms.items()):
+            for q in PERCENTILES:
+                value = hist.percentile(q)
+                if value is not None:
+                    lines.append('%s_stage_quantile_seconds{stage="%s",quantile="%g"} %.6f' % (p, name, q, value))
+        lines.append("# TYPE %s_fps gauge" % p)
+        for name, meter in sorted(self.meters.items()):
+            lines.append('%s_fps{name="%s"} %.3f' % (p, name, meter.rate))
+        for name, value in sorted(self.counters.items()):
+            lines.append("# TYPE %s_%s_total counter" % (p, name))
+            lines.append("%s_%s_total %d" % (p, name, value))
+        for name, value in sorted(self.snapshot()["gauges"].items()):
+            if value is not None:
+                lines.append("# TYPE %s_%s gauge" % (p, name))
+                lines.append("%s_%s %s" % (p, name, value))
+        return "\n".join(lines) + "\n"
+
+    def summary_lines(self, names=None):
+        """Líneas cortas 'etapa p50/p95/p99 ms' para consola u overlay."""
+        lines = []
+        for name in names or sorted(self.histograms):
+            hist = self.histograms.get(name)
+            if hist is None or not hist.count:
+                continue
+            values = [hist.percentile(q) * 1000 for q in PERCENTILES]
+            lines.append("%s %.1f/%.1f/%.1f ms" % (name, values[0], values[1], values[2]))
+        for name, meter in sorted(self.meters.items()):
+            lines.append("%s %.1f FPS" % (name, meter.rate))
+        return lines
+
+
+class SnapshotWriter(threading.Thread):
+    """
+    Escribe el snapshot cada `interval` segundos. El formato sale de la
+    extensión: .prom / .txt en texto de Prometheus, cualquier otra en JSON.
+    """
+
+    def __init__(self, registry, path, interval=5.0):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self.prometheus = path.endswith((".prom", ".txt"))
+        self.stop_event = threading.Event()
+
+    def write(self):
+        text = self.registry.to_prometheus() if self.prometheus else self.registry.to_json()
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(text)
+        # Reemplazo atómico (en Windows con Python 2 no existe os.replace)
+        try:
+            os.rename(tmp, self.path)
+        except OSError:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            os.rename(tmp, self.path)
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.write()
+            except (IOError, OSError) as e:
+                print("No se pudo escribir el snapshot de métricas: {}".format(e))
+
+    def stop(self):
+        self.stop_event.set()
+        try:
+            self.write()
+        except (IOError, OSError):
+            pass
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+proxy_pool.py
+
+Registro compartido de proxies de NAOqi para los scripts del robot
+(Python 2.7). Crear un ALProxy cuesta una ida y vuelta al broker, así que
+cada (servicio, ip, puerto) se crea una sola vez y se reutiliza.
+
+  - Chequeo de salud perezoso: al pedir un proxy que no se usó ni se
+    verificó en HEALTH_INTERVAL segundos se le hace ping(); si falla, se
+    vuelve a crear.
+  - Reconexión transparente: si una llamada falla y el ping también (p. ej.
+    NAOqi se reinició), se descartan los proxies de ese robot, se recrea el
+    proxy y se repite la llamada una vez. Si el ping responde, el error era
+    del método y se propaga tal cual.
+  - Estadísticas de reutilización: proxies creados, pedidos servidos desde
+    el registro, chequeos, reconexiones y errores.
+
+Uso:
+  from proxy_pool import get_proxy
+  motion = get_proxy("ALMotion", NAO_IP, NAO_PORT)
+"""
+from __future__ import print_function
+import threading
+from clock import monotonic as clock
+
+HEALTH_INTERVAL = 5.0   # segundos sin uso tras los que se verifica el proxy
+RETRIES = 1             # reintentos de una llamada después de reconectar
+
+
+def _naoqi_proxy(service, ip, port):
+    # Import diferido: el módulo se puede importar sin el SDK instalado
+    from naoqi import ALProxy
+    return ALProxy(service, ip, port)
+
+
+class _Entry(object):
+    __slots__ = ("proxy", "last_ok")
+
+    def __init__(self, proxy):
+        self.proxy = proxy
+        self.last_ok = clock()
+
+
+class ProxyPool(object):
+    """Proxies por (servicio, ip, puerto), con chequeo de salud y reconexión."""
+
+    def __init__(self, factory=_naoqi_proxy, health_interval=HEALTH_INTERVAL):
+        self.factory = factory
+        self.health_interval = health_interval
+        self.entries = {}
+        self.lock = threading.RLock()
+        self.created = 0
+        self.reused = 0
+        self.health_checks = 0
+        self.reconnects = 0
+        self.failures = 0
+
+    def get(self, service, ip, port):
+        """Proxy envuelto (PooledProxy); lo crea si hace falta."""
+        key = (service, ip, int(port))
+        self._raw(key, count=True)
+        return PooledProxy(self, key)
+
+    def _raw(self, key, count=False):
+        """Proxy de NAOqi vigente para key, verificado si estuvo inactivo."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if clock() - entry.last_ok < self.health_interval or self._healthy(entry):
+                    if count:
+                        self.reused += 1
+                    return entry.proxy
+                print("Proxy {} en {}:{} sin respuesta, reconectando".format(*key))
+                self._invalidate_robot(key[1], key[2])
+                self.reconnects += 1
+            entry = _Entry(self.factory(*key))
+            self.entries[key] = entry
+            self.created += 1
+            return entry.proxy
+
+    def _healthy(self, entry):
+        self.health_checks += 1
+        try:
+            entry.proxy.ping()
+        except Exception:
+            return False
+        entry.last_ok = clock()
+        return True
+
+    def _invalidate_robot(self, ip, port):
+        # Si el broker se cayó, ningún proxy de ese robot sirve
+        for key in [k for k in self.entries if k[1] == ip and k[2] == port]:
+            del self.entries[key]
+
+    def call(self, key, method, args, post=False):
+        """Llama proxy.method(*args) (o proxy.post.method) con reconexión."""
+        for attempt in range(RETRIES + 1):
+            proxy = self._raw(key)
+            target = proxy.post if post else proxy
+            try:
+                result = getattr(target, method)(*args)
+            except Exception:
+                self.failures += 1
+                with self.lock:
+                    entry = self.entries.get(key)
+                    # Si el proxy responde, el error es del método: se propaga
+                    if attempt == RETRIES or entry is None or self._healthy(entry):
+                        raise
+                    print("Conexión con {} en {}:{} perdida, reconectando".format(*key))
+                    self._invalidate_robot(key[1], key[2])
+                    self.reconnects += 1
+                continue
+            entry = self.entries.get(key)
+            if entry is not None:
+                entry.last_ok = clock()
+            return result
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        requests = self.created + self.reused
+        return {
+            "proxies": len(self.entries),
+            "created": self.created,
+            "reused": self.reused,
+            "reuse_ratio": float(self.reused) / requests if requests else 0.0,
+            "health_checks": self.health_checks,
+            "reconnects": self.reconnects,
+            "failures": self.failures,
+        }
+
+    def stats_line(self):
+        s = self.stats()
+        return ("Proxies NAOqi: {proxies} activos, {created} creados, {reused} reutilizados "
+                "({reuse_ratio:.0%}), {health_checks} chequeos, {reconnects} reconexiones, "
+                "{failures} errores".format(**s))
+
+
+class _PostCaller(object):
+    """proxy.post.metodo(...) a través del registro."""
+
+    def __init__(self, pool, key):
+        self._pool = pool
+        self._key = key
+
+    def __getattr__(self, method):
+        def call(*args):
+            return self._pool.call(self._key, method, args, post=True)
+        return call
+
+
+class PooledProxy(object):
+    """
+    Se usa igual que un ALProxy. No guarda el proxy de NAOqi: cada llamada
+    toma el vigente del registro, así que sobrevive a las reconexiones.
+    """
+
+    def __init__(self, pool, key):
+        self._pool = pool
+        self._key = key
+        self.post = _PostCaller(pool, key)
+
+    def __getattr__(self, method):
+        if method.startswith("__"):
+            raise AttributeError(method)
+
+        def call(*args):
+            return self._pool.call(self._key, method, args)
+        call.__name__ = method
+        return call
+
+    def __repr__(self):
+        return "PooledProxy({!r}, {!r}, {})".format(*self._key)
+
+
+# Registro compartido por todos los scripts de un proceso
+pool = ProxyPool()
+
+
+def get_proxy(service, ip, port):
+    return pool.get(service, ip, port)
+
+
+def stats_line():
+    return pool.stats_line()
@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+"""
+recorder.py
+
+Grabación de ángulos del lado del robot sin frenar el bucle de control.
+Compatible con Python 2.7 y 3; solo usa la biblioteca estándar.
+
+El hilo de control escribe cada trama en un bloque preasignado (sin formato
+de texto ni E/S); cuando el bloque se llena o pasan FLUSH_INTERVAL segundos
+lo pasa a un hilo escritor y sigue con otro bloque libre. Si el flujo se
+pausa sin cerrar la grabación, el escritor reclama el bloque a medio llenar
+al cumplirse FLUSH_INTERVAL. El escritor guarda los bloques en archivos
+binarios que rota por tamaño o por duración.
+
+Formato de cada archivo (.naorec, little-endian):
+  cabecera  "<6sHH": magic "NAOREC", versión, cantidad de columnas;
+            "<H" largo + nombres de las columnas en utf-8 separados por ","
+  bloques   "<4sIdd": "CHNK", filas, primer y último timestamp;
+            timestamps float64 x filas, luego cada columna float32 x filas
+            (NaN = sin dato)
+
+Convertir al CSV de siempre (timestamp + una columna por articulación):
+  python recorder.py to-csv nao_angles_*.naorec --out sesion.csv
+"""
+from __future__ import print_function
+import os
+import sys
+import csv
+import time
+import struct
+import argparse
+import threading
+from array import array
+from collections import deque
+from datetime import datetime
+
+MAGIC = b"NAOREC"
+VERSION = 1
+EXTENSION = ".naorec"
+FILE_HEADER = struct.Struct("<6sHH")
+NAMES_LEN = struct.Struct("<H")
+CHUNK_MAGIC = b"CHNK"
+CHUNK_HEADER = struct.Struct("<4sIdd")
+
+# Mismas columnas que el CSV de Ejecutar_final.py
+DEFAULT_COLUMNS = [
+    "HeadYaw", "HeadPitch",
+    "LShoulderPitch", "LShoulderRoll",
+    "RShoulderPitch", "RShoulderRoll",
+    "LElbowRoll", "RElbowRoll",
+    "LHand", "RHand"
+]
+CHUNK_ROWS = 1024               # filas por bloque
+POOL_CHUNKS = 8                 # bloques preasignados (~2 min a 60 Hz)
+FLUSH_INTERVAL = 1.0            # segundos máximos que una fila espera en memoria
+MAX_FILE_BYTES = 64 * 1024 * 1024
+MAX_FILE_SECONDS = 3600.0
+
+NAN = float("nan")
+LITTLE_ENDIAN = sys.byteorder == "little"
+
+
+def _to_bytes(arr):
+    if not LITTLE_ENDIAN:
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes() if hasattr(arr, "tobytes") else arr.tostring()
+
+
+def _from_bytes(typecode, data):
+    arr = array(typecode)
+    if hasattr(arr, "frombytes"):
+        arr.frombytes(data)
+    else:
+        arr.fromstring(data)
+    if not LITTLE_ENDIAN:
+        arr.byteswap()
+    return arr
+
+
+class _Chunk(object):
+    __slots__ = ("timestamps", "columns", "rows", "opened")
+
+    def __init__(self, rows, ncols):
+        self.timestamps = array("d", [0.0]) * rows
+        self.columns = [array("f", [0.0]) * rows for _ in range(ncols)]
+        self.rows = 0
+        self.opened = 0.0  # time.time() local de la primera fila
+
+
+class Recorder(object):
+    """
+    Grabador con hilo escritor. log() nunca hace E/S ni espera al disco (el
+    escritor solo toma el lock para mover bloques entre colas): si el
+    escritor se atrasa tanto que no quedan bloques libres, la fila se
+    descarta y se cuenta en dropped.
+    """
+
+    def __init__(self, prefix="nao_angles", columns=None, chunk_rows=CHUNK_ROWS,
+                 pool_chunks=POOL_CHUNKS, flush_interval=FLUSH_INTERVAL,
+                 max_bytes=MAX_FILE_BYTES, max_seconds=MAX_FILE_SECONDS):
+        self.prefix = prefix
+        self.columns = list(columns or DEFAULT_COLUMNS)
+        self.chunk_rows = chunk_rows
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+
+        self.free = [_Chunk(chunk_rows, len(self.columns)) for _ in range(pool_chunks)]
+        self.current = self.free.pop()
+        self.pending = deque()
+        self.cond = threading.Condition(threading.Lock())
+        self.closing = False
+
+        self.files = []
+        self.file = None
+        self.file_bytes = 0
+        self.file_opened = 0.0
+        self.rows = 0
+        self.chunks = 0
+        self.dropped = 0
+        self.max_write = 0.0  # segundos del bloque más lento en escribirse
+
+        self.thread = threading.Thread(target=self._write_loop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    # ----- hilo de control -----
+    def log(self, angles, timestamp=None):
+        if timestamp is None:
+            timestamp = time.time()
+        # Bajo el lock: el escritor puede reclamar el bloque actual
+        with self.cond:
+            chunk = self.current
+            if chunk is None:
+                chunk = self.current = self.free.pop() if self.free else None
+                if chunk is None:
+                    self.dropped += 1
+                    return
+            i = chunk.rows
+            if i == 0:
+                chunk.opened = time.time()
+            chunk.timestamps[i] = timestamp
+            get = angles.get
+            for column, name in zip(chunk.columns, self.columns):
+                value = get(name)
+                column[i] = NAN if value is None else value
+            chunk.rows = i + 1
+            self.rows += 1
+            if chunk.rows == self.chunk_rows or timestamp - chunk.timestamps[0] >= self.flush_interval:
+                self._hand_off(chunk)
+
+    def _hand_off(self, chunk):
+        # Con self.cond tomado
+        self.pending.append(chunk)
+        self.current = self.free.pop() if self.free else None
+        self.cond.notify()
+
+    def close(self):
+        """Escribe lo pendiente, espera al escritor y devuelve los archivos."""
+        with self.cond:
+            chunk = self.current
+            if chunk is not None and chunk.rows:
+                self._hand_off(chunk)
+            self.closing = True
+            self.cond.notify()
+        self.thread.join()
+        return self.files
+
+    # ----- hilo escritor -----
+    def _write_loop(self):
+        try:
+            while True:
+                with self.cond:
+                    while not self.pending and not self.closing:
+                        timeout = self._claim_stale()
+                        if not self.pending:
+                            self.cond.wait(timeout)
+                    if not self.pending:
+                        break
+                    chunk = self.pending.popleft()
+                start = time.time()
+                self._write_chunk(chunk)
+                self.max_write = max(self.max_write, time.time() - start)
+                with self.cond:
+                    chunk.rows = 0
+                    self.free.append(chunk)
+        finally:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+    def _claim_stale(self):
+        """
+        Con self.cond tomado: si el bloque actual tiene filas desde hace
+        FLUSH_INTERVAL (el flujo se pausó), lo pasa a pendientes. Devuelve
+        cuánto esperar antes de volver a mirar.
+        """
+        chunk = self.current
+        if chunk is None or not chunk.rows:
+            return self.flush_interval
+        age = time.time() - chunk.opened
+        if age < self.flush_interval:
+            return self.flush_interval - age
+        self._hand_off(chunk)
+        return self.flush_interval
+
+    def _rotate_if_needed(self):
+        if (self.file is not None and self.file_bytes < self.max_bytes
+                and time.time() - self.file_opened < self.max_seconds):
+            return
+        if self.file is not None:
+            self.file.close()
+        now_str = datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = "{}_{}_{:03d}{}".format(self.prefix, now_str, len(self.files), EXTENSION)
+        self.file = open(path, "wb")
+        header = file_header(self.columns)
+        self.file.write(header)
+        self.file_bytes = len(header)
+        self.file_opened = time.time()
+        self.files.append(path)
+
+    def _write_chunk(self, chunk):
+        self._rotate_if_needed()
+        n = chunk.rows
+        timestamps = chunk.timestamps[:n]
+        parts = [CHUNK_HEADER.pack(CHUNK_MAGIC, n, timestamps[0], timestamps[-1]), _to_bytes(timestamps)]
+        parts.extend(_to_bytes(column[:n]) for column in chunk.columns)
+        data = b"".join(parts)
+        self.file.write(data)
+        self.file.flush()
+        self.file_bytes += len(data)
+        self.chunks += 1
+
+
+def file_header(columns):
+    """Bytes de la cabecera de un archivo con estas columnas."""
+    names = ",".join(columns).encode("utf-8")
+    return FILE_HEADER.pack(MAGIC, VERSION, len(columns)) + NAMES_LEN.pack(len(names)) + names
+
+
+# ======================
+# Lectura y conversión
+# ======================
+def read_header(f):
+    """Lee la cabecera de un archivo abierto; devuelve los nombres de columna."""
+    magic, version, ncols = FILE_HEADER.unpack(f.read(FILE_HEADER.size))
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("No es una grabación {} v{}".format(MAGIC.decode("ascii"), VERSION))
+    length, = NAMES_LEN.unpack(f.read(NAMES_LEN.size))
+    columns = f.read(length).decode("utf-8").split(",")
+    if len(columns) != ncols:
+        raise ValueError("Cabecera inconsistente")
+    return columns
+
+
+def iter_chunks(path):
+    """
+    Genera (timestamps, {columna: array}) por bloque. Un bloque final cortado
+    (p. ej. si el proceso murió escribiendo) se ignora.
+    """
+    with open(path, "rb") as f:
+        columns = read_header(f)
+        while True:
+            header = f.read(CHUNK_HEADER.size)
+            if len(header) < CHUNK_HEADER.size:
+                break
+            magic, rows, _, _ = CHUNK_HEADER.unpack(header)
+            if magic != CHUNK_MAGIC:
+                raise ValueError("Bloque inválido en {}".format(path))
+            data = f.read(rows * (8 + 4 * len(columns)))
+            if len(data) < rows * (8 + 4 * len(columns)):
+                break
+            timestamps = _from_bytes("d", data[:rows * 8])
+            values = {}
+            offset = rows * 8
+            for name in columns:
+                values[name] = _from_bytes("f", data[offset:offset + rows * 4])
+                offset += rows * 4
+            yield timestamps, values
+
+
+def iter_rows(paths):
+    """Genera (timestamp, {columna: valor o None}) de una o varias grabaciones."""
+    for path in paths:
+        for timestamps, values in iter_chunks(path):
+            names = list(values)
+            for i, ts in enumerate(timestamps):
+                row = {}
+                for name in names:
+                    v = values[name][i]
+                    row[name] = v if v == v else None
+                yield ts, row
+
+
+def to_csv(paths, out_path):
+    """Convierte grabaciones al CSV de Ejecutar_final (timestamp + articulaciones)."""
+    with open(paths[0], "rb") as f:
+        columns = read_header(f)
+    if sys.version_info[0] < 3:
+        out = open(out_path, "wb")
+    else:
+        out = open(out_path, "w", newline="")
+    rows = 0
+    with out:
+        writer = csv.writer(out)
+        writer.writerow(["timestamp"] + columns)
+        for ts, row in iter_rows(paths):
+            writer.writerow(["%.3f" % ts] + ["" if row.get(c) is None else "%.7g" % row[c] for c in columns])
+            rows += 1
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Grabaciones binarias de ángulos (.naorec)")
+    sub = parser.add_subparsers(dest="command")
+    conv = sub.add_parser("to-csv", help="convierte al CSV de siempre")
+    conv.add_argument("files", nargs="+", help="archivos .naorec en orden")
+    conv.add_argument("--out", required=True)
+    info = sub.add_parser("info", help="filas, bloques y duración")
+    info.add_argument("files", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "to-csv":
+        rows = to_csv(args.files, args.out)
+        print("{} filas -> {}".format(rows, args.out))
+    elif args.command == "info":
+        for path in args.files:
+            rows = chunks = 0
+            first = last = None
+            for timestamps, _ in iter_chunks(path):
+                chunks += 1
+                rows += len(timestamps)
+                first = timestamps[0] if first is None else first
+                last = timestamps[-1]
+            span = (last - first) if rows else 0.0
+            print("{}: {} filas en {} bloques, {:.1f} s, {} bytes".format(
+                path, rows, chunks, span, os.path.getsize(path)))
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+load_test.py
+
+Prueba de carga de un receptor del robot (main.py, Ejecutar_final.py...)
+contra el NAO simulado de naoqi.py. Lanza el script con esta carpeta en el
+PYTHONPATH, le envía tramas de wire_protocol a una tasa fija y después lee
+la traza del simulador para medir:
+
+  - tramas enviadas y comandos que llegaron al robot por segundo
+  - demora envío -> comando (p50/p95/máx) y su pendiente en el tiempo:
+    si crece, el receptor acumula atraso (backlog)
+  - demora comando -> pose alcanzada, con los límites de velocidad del NAO
+
+Cada trama marca su número de secuencia en LShoulderPitch, así cada
+setAngles de la traza se asocia a la trama que lo originó.
+
+Uso (Python 2.7 o 3):
+  python load_test.py ../main.py --rate 60 --seconds 10 --latency-ms 5
+"""
+from __future__ import print_function
+import argparse
+import json
+import math
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+NAOCONTROL = os.path.dirname(HERE)
+sys.path.insert(0, NAOCONTROL)
+from wire_protocol import encode_frame  # noqa: E402
+
+MARKER_JOINT = "LShoulderPitch"
+MARKER_OFFSET = -50.0   # grados
+MARKER_STEP = 0.1       # grados por número de secuencia
+MARKER_MODULO = 1000
+
+
+def marker_angle(seq):
+    return MARKER_OFFSET + (seq % MARKER_MODULO) * MARKER_STEP
+
+
+def marker_seq(radians, last_seq):
+    """Recupera el número de secuencia (desenrollando el módulo)."""
+    mod = int(round((math.degrees(radians) - MARKER_OFFSET) / MARKER_STEP)) % MARKER_MODULO
+    base = max(last_seq, 0) - MARKER_MODULO // 2
+    seq = (base // MARKER_MODULO) * MARKER_MODULO + mod
+    while seq < base:
+        seq += MARKER_MODULO
+    return seq
+
+
+def sample_angles(seq, t):
+    """Movimiento de brazos y cabeza, con la marca en MARKER_JOINT."""
+    wave = math.sin(2 * math.pi * 0.5 * t)
+    return {
+        "HeadYaw": 20 * wave, "HeadPitch": 5 * wave,
+        MARKER_JOINT: marker_angle(seq), "LShoulderRoll": 10 + 10 * wave,
+        "RShoulderPitch": 40 * wave, "RShoulderRoll": -10 - 10 * wave,
+        "LElbowRoll": -30 + 20 * wave, "RElbowRoll": 30 - 20 * wave,
+        "LHand": 1.0 if wave > 0 else 0.0, "RHand": 0.0 if wave > 0 else 1.0,
+    }
+
+
+def connect(host, port, timeout):
+    deadline = time.time() + timeout
+    while True:
+        try:
+            return socket.create_connection((host, port), timeout=5)
+        except socket.error:
+            if time.time() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def send_frames(sock, rate, seconds):
+    """Envía a tasa fija con deadlines absolutos; devuelve {seq: hora de envío}."""
+    sent = {}
+    period = 1.0 / rate
+    start = time.time()
+    seq = 0
+    while True:
+        deadline = start + seq * period
+        if deadline - start >= seconds:
+            break
+        delay = deadline - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        now = time.time()
+        sock.sendall(encode_frame(sample_angles(seq, now - start), seq, now))
+        sent[seq] = now
+        seq += 1
+    return sent
+
+
+def _marker_radians(args):
+    """Ángulo de MARKER_JOINT en los argumentos de un setAngles de la traza."""
+    names, angles = args[0], args[1]
+    if isinstance(names, list):
+        if MARKER_JOINT in names:
+            return angles[names.index(MARKER_JOINT)]
+        return None
+    if names == MARKER_JOINT:
+        return angles[0] if isinstance(angles, list) else angles
+    return None
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def slope(xs, ys):
+    if len(xs) < 2:
+        return 0.0
+    mx = sum(xs) / len(xs)
+    my = sum(ys) / len(ys)
+    den = sum((x - mx) ** 2 for x in xs)
+    return sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / den if den else 0.0
+
+
+def analyze(trace_path, sent):
+    commands, reached, calls = [], [], {}
+    last_seq = -1
+    with open(trace_path) as f:
+        for line in f:
+            entry = json.loads(line)
+            if entry.get("event") == "reached":
+                reached.append(entry["lag"])
+                continue
+            method = entry.get("method")
+            calls[method] = calls.get(method, 0) + 1
+            if method not in ("setAngles", "angleInterpolation", "angleInterpolationWithSpeed"):
+                continue
+            radians = _marker_radians(entry["args"])
+            if radians is None:
+                continue
+            seq = marker_seq(radians, last_seq)
+            if seq in sent:
+                last_seq = seq
+                commands.append((sent[seq], entry["end"] - sent[seq], seq, entry["end"]))
+
+    first_send = min(sent.values()) if sent else 0.0
+    lags = [c[1] for c in commands]
+    duration = (max(sent.values()) - first_send) if sent else 0.0
+    command_span = (commands[-1][3] - commands[0][3]) if len(commands) > 1 else 0.0
+    return {
+        "frames_sent": len(sent),
+        "send_rate": len(sent) / duration if duration else None,
+        "frames_commanded": len(set(c[2] for c in commands)),
+        "command_rate": len(commands) / command_span if command_span else None,
+        "lag_p50": percentile(lags, 0.5), "lag_p95": percentile(lags, 0.95),
+        "lag_max": max(lags) if lags else None,
+        # s de atraso acumulado por s de prueba (0 = sin backlog)
+        "lag_growth": slope([c[0] - first_send for c in commands], lags),
+        "pose_lag_p50": percentile(reached, 0.5), "pose_lag_p95": percentile(reached, 0.95),
+        "calls": calls,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga de un receptor contra el NAO simulado")
+    parser.add_argument("script", help="script del robot, p. ej. ../main.py")
+    parser.add_argument("--python", default="python2.7", help="intérprete para el script")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6000)
+    parser.add_argument("--rate", type=float, default=30.0, help="tramas por segundo")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="latencia de cada RPC simulada")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--time-scale", type=float, default=0.05,
+                        help="escala de las esperas bloqueantes de arranque (postura, say)")
+    parser.add_argument("--json", help="guarda el resultado en este archivo")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="naosim_")
+    trace_path = os.path.join(workdir, "trace.jsonl")
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([HERE, NAOCONTROL, env.get("PYTHONPATH", "")])
+    env["NAOSIM_TRACE"] = trace_path
+    env["NAOSIM_LATENCY_MS"] = str(args.latency_ms)
+    env["NAOSIM_JITTER_MS"] = str(args.jitter_ms)
+    env["NAOSIM_TIME_SCALE"] = str(args.time_scale)
+
+    script = os.path.abspath(args.script)
+    log_path = os.path.join(workdir, "salida.log")
+    with open(log_path, "w") as log:
+        proc = subprocess.Popen([args.python, script], cwd=workdir, env=env,
+                                stdout=log, stderr=subprocess.STDOUT)
+        try:
+            sock = connect(args.host, args.port, timeout=30)
+            sent = send_frames(sock, args.rate, args.seconds)
+            sock.close()
+            # Los receptores que siguen esperando clientes (main.py) se
+            # cierran con Ctrl+C, para que bajen la rigidez como siempre
+            if not _wait(proc, 2):
+                proc.send_signal(signal.SIGINT)
+                if not _wait(proc, 30):
+                    proc.kill()
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+
+    result = analyze(trace_path, sent)
+    result.update({"script": args.script, "latency_ms": args.latency_ms, "rate": args.rate})
+
+    def ms(value):
+        return "-" if value is None else "{:.1f} ms".format(value * 1000)
+    print("Script: {}  ({} tramas a {:.0f}/s, RPC {:.1f} ms)".format(
+        args.script, result["frames_sent"], args.rate, args.latency_ms))
+    print("Comandos con marca: {:.1f}/s, tramas que llegaron al robot: {}".format(
+        result["command_rate"] or 0, result["frames_commanded"]))
+    print("Envío -> comando: p50 {}, p95 {}, máx {}".format(
+        ms(result["lag_p50"]), ms(result["lag_p95"]), ms(result["lag_max"])))
+    print("Crecimiento del atraso: {:.3f} s/s{}".format(
+        result["lag_growth"], "  <-- BACKLOG" if result["lag_growth"] > 0.05 else ""))
+    print("Comando -> pose: p50 {}, p95 {}".format(ms(result["pose_lag_p50"]), ms(result["pose_lag_p95"])))
+    print("Llamadas: {}".format(", ".join("{}={}".format(k, v) for k, v in sorted(result["calls"].items()))))
+    print("Traza y salida del script en {}".format(workdir))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+
+
+def _wait(proc, timeout):
+    deadline = time.time() + timeout
+    while proc.poll() is None:
+        if time.time() > deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,639 @@
+# -*- coding: utf-8 -*-
+"""
+naoqi.py (simulador)
+
+Reemplazo local del SDK de NAOqi para probar los scripts del robot sin un NAO
+físico. Se usa anteponiendo esta carpeta al PYTHONPATH, sin tocar los scripts:
+
+    PYTHONPATH=NAOcontrol/simulator python2.7 NAOcontrol/main.py
+
+Simula ALMotion, ALRobotPosture, ALTextToSpeech, ALBehaviorManager y
+ALAutonomousLife con:
+  - latencia de RPC configurable (más variación aleatoria)
+  - llamadas bloqueantes (angleInterpolation, goToPosture, say, runBehavior)
+    y no bloqueantes (setAngles, proxy.post.*)
+  - límite de velocidad por articulación: la pose avanza hacia el objetivo
+    a lo sumo a fracción * velocidad máxima
+  - reinicio del broker (restart_broker()): los proxies creados antes
+    fallan con RuntimeError, como en NAOqi real
+  - traza de comandos en memoria y, opcionalmente, en un archivo JSON lines,
+    incluyendo cuándo cada articulación alcanzó el objetivo de un comando
+
+Configuración por variables de entorno (o configure() desde Python):
+  NAOSIM_LATENCY_MS       latencia de cada RPC (por defecto 2)
+  NAOSIM_JITTER_MS        variación uniforme adicional (por defecto 0)
+  NAOSIM_TRACE            archivo donde se escribe la traza
+  NAOSIM_TIME_SCALE       acelera (<1) o frena (>1) las esperas bloqueantes
+  NAOSIM_BEHAVIOR_SECONDS duración de runBehavior (por defecto 3)
+  NAOSIM_BEHAVIORS        comportamientos instalados, separados por coma
+                          (vacío = cualquier nombre está instalado)
+  NAOSIM_SPEECH_CPS       caracteres por segundo de say() (por defecto 15)
+"""
+from __future__ import print_function
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+
+# ======================
+# Modelo del robot
+# ======================
+# Articulación: (mínimo, máximo, velocidad máxima) en radianes y rad/s
+JOINTS = {
+    "HeadYaw": (-2.0857, 2.0857, 8.26797),
+    "HeadPitch": (-0.6720, 0.5149, 7.19407),
+    "LShoulderPitch": (-2.0857, 2.0857, 8.26797),
+    "LShoulderRoll": (-0.3142, 1.3265, 7.19407),
+    "LElbowYaw": (-2.0857, 2.0857, 8.26797),
+    "LElbowRoll": (-1.5446, -0.0349, 7.19407),
+    "LWristYaw": (-1.8238, 1.8238, 24.6229),
+    "LHand": (0.0, 1.0, 8.33),
+    "RShoulderPitch": (-2.0857, 2.0857, 8.26797),
+    "RShoulderRoll": (-1.3265, 0.3142, 7.19407),
+    "RElbowYaw": (-2.0857, 2.0857, 8.26797),
+    "RElbowRoll": (0.0349, 1.5446, 7.19407),
+    "RWristYaw": (-1.8238, 1.8238, 24.6229),
+    "RHand": (0.0, 1.0, 8.33),
+    "HipYawPitch": (-1.1453, 0.7408, 4.16174),
+    "LHipRoll": (-0.3793, 0.7904, 4.16174),
+    "LHipPitch": (-1.5358, 0.4840, 6.40239),
+    "LKneePitch": (-0.0923, 2.1125, 6.40239),
+    "LAnklePitch": (-1.1895, 0.9228, 6.40239),
+    "LAnkleRoll": (-0.3979, 0.7690, 4.16174),
+    "RHipRoll": (-0.7904, 0.3793, 4.16174),
+    "RHipPitch": (-1.5358, 0.4840, 6.40239),
+    "RKneePitch": (-0.0923, 2.1125, 6.40239),
+    "RAnklePitch": (-1.1895, 0.9228, 6.40239),
+    "RAnkleRoll": (-0.7690, 0.3979, 4.16174),
+}
+CHAINS = {
+    "Head": ["HeadYaw", "HeadPitch"],
+    "LArm": ["LShoulderPitch", "LShoulderRoll", "LElbowYaw", "LElbowRoll", "LWristYaw", "LHand"],
+    "RArm": ["RShoulderPitch", "RShoulderRoll", "RElbowYaw", "RElbowRoll", "RWristYaw", "RHand"],
+    "LLeg": ["HipYawPitch", "LHipRoll", "LHipPitch", "LKneePitch", "LAnklePitch", "LAnkleRoll"],
+    "RLeg": ["HipYawPitch", "RHipRoll", "RHipPitch", "RKneePitch", "RAnklePitch", "RAnkleRoll"],
+}
+CHAINS["Body"] = sorted(JOINTS)
+CHAINS["Arms"] = CHAINS["LArm"] + CHAINS["RArm"]
+
+POSTURES = {
+    "Stand": {"LShoulderPitch": 1.4, "RShoulderPitch": 1.4, "LShoulderRoll": 0.2, "RShoulderRoll": -0.2,
+              "LElbowRoll": -0.4, "RElbowRoll": 0.4, "LElbowYaw": -1.2, "RElbowYaw": 1.2},
+    "StandInit": {"LShoulderPitch": 1.4, "RShoulderPitch": 1.4, "LShoulderRoll": 0.2, "RShoulderRoll": -0.2,
+                  "LElbowRoll": -0.5, "RElbowRoll": 0.5, "LKneePitch": 0.7, "RKneePitch": 0.7,
+                  "LHipPitch": -0.45, "RHipPitch": -0.45, "LAnklePitch": -0.35, "RAnklePitch": -0.35},
+    "StandZero": {},
+    "Crouch": {"LKneePitch": 2.1, "RKneePitch": 2.1, "LHipPitch": -0.9, "RHipPitch": -0.9,
+               "LAnklePitch": -1.18, "RAnklePitch": -1.18},
+    "Sit": {"LHipPitch": -1.5, "RHipPitch": -1.5, "LKneePitch": 1.7, "RKneePitch": 1.7},
+}
+POSTURE_SECONDS = 2.0   # duración de goToPosture a velocidad 1.0
+HAND_SECONDS = 0.5      # openHand / closeHand
+REACHED_TOLERANCE = 0.01  # rad: objetivo alcanzado
+STEP = 0.005            # paso de integración del movimiento (s)
+TRACE_LIMIT = 100000    # registros de traza en memoria
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+CONFIG = {
+    "latency": _env_float("NAOSIM_LATENCY_MS", 2.0) / 1000.0,
+    "jitter": _env_float("NAOSIM_JITTER_MS", 0.0) / 1000.0,
+    "time_scale": _env_float("NAOSIM_TIME_SCALE", 1.0),
+    "behavior_seconds": _env_float("NAOSIM_BEHAVIOR_SECONDS", 3.0),
+    "speech_cps": _env_float("NAOSIM_SPEECH_CPS", 15.0),
+    "behaviors": [b for b in os.environ.get("NAOSIM_BEHAVIORS", "").split(",") if b],
+    "trace": os.environ.get("NAOSIM_TRACE") or None,
+}
+
+
+def configure(**kwargs):
+    """Cambia la configuración desde Python (mismas claves que CONFIG)."""
+    for key, value in kwargs.items():
+        if key not in CONFIG:
+            raise KeyError(key)
+        CONFIG[key] = value
+    robot.open_trace(CONFIG["trace"])
+
+
+def _sleep(seconds):
+    if seconds > 0:
+        time.sleep(seconds * CONFIG["time_scale"])
+
+
+def _names(names):
+    """Nombre, cadena ("LArm", "Body") o lista -> lista de articulaciones."""
+    if isinstance(names, (list, tuple)):
+        result = []
+        for name in names:
+            result.extend(_names(name))
+        return result
+    if names in CHAINS:
+        return list(CHAINS[names])
+    if names in JOINTS:
+        return [names]
+    raise RuntimeError("ALMotion: articulación desconocida '{}'".format(names))
+
+
+def _as_list(value, count):
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return [value] * count
+
+
+class Joint(object):
+    __slots__ = ("position", "target", "speed", "trajectory", "stiffness", "command_time")
+
+    def __init__(self):
+        self.position = 0.0
+        self.target = 0.0
+        self.speed = 1.0          # fracción de la velocidad máxima
+        self.trajectory = None    # [(t, ángulo)] de angleInterpolation
+        self.stiffness = 0.0
+        self.command_time = None  # hora del comando aún no alcanzado
+
+
+class SimRobot(object):
+    """Estado compartido por todos los proxies (un solo robot simulado)."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.joints = dict((name, Joint()) for name in JOINTS)
+        self.last_update = time.time()
+        self.trace = deque(maxlen=TRACE_LIMIT)
+        self.calls = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.reached_lags = deque(maxlen=TRACE_LIMIT)
+        self.trace_file = None
+        self.trace_path = None
+        self.posture = "Unknown"
+        self.life_state = "solitary"
+        self.running_behaviors = set()
+        self.generation = 0       # se incrementa con cada reinicio del broker
+        self.proxies_created = 0
+        self.open_trace(CONFIG["trace"])
+
+    def open_trace(self, path):
+        with self.lock:
+            if path == self.trace_path:
+                return
+            if self.trace_file is not None:
+                self.trace_file.close()
+            self.trace_path = path
+            self.trace_file = open(path, "a") if path else None
+
+    def record(self, entry):
+        with self.lock:
+            self.trace.append(entry)
+            if self.trace_file is not None:
+                self.trace_file.write(json.dumps(entry) + "\n")
+                self.trace_file.flush()
+
+    # --- movimiento ---
+    def advance(self, now=None):
+        """Integra el movimiento hasta `now` respetando la velocidad máxima."""
+        now = time.time() if now is None else now
+        with self.lock:
+            t = self.last_update
+            while t < now:
+                active = [(name, joint) for name, joint in self.joints.items()
+                          if joint.stiffness > 0.0 and
+                          (joint.trajectory or joint.target != joint.position)]
+                if not active:
+                    break  # todo quieto: no hace falta integrar
+                dt = min(STEP, now - t)
+                t += dt
+                for name, joint in active:
+                    self._step_joint(name, joint, t, dt)
+            self.last_update = now
+
+    def _step_joint(self, name, joint, t, dt):
+        if joint.trajectory:
+            joint.target = self._trajectory_value(joint, t)
+        error = joint.target - joint.position
+        if error == 0.0:
+            return
+        if joint.stiffness <= 0.0:
+            return  # sin rigidez el motor no mueve la articulación
+        max_step = JOINTS[name][2] * joint.speed * dt
+        if abs(error) <= max_step:
+            joint.position = joint.target
+        else:
+            joint.position += max_step if error > 0 else -max_step
+        if joint.command_time is not None and abs(joint.target - joint.position) <= REACHED_TOLERANCE \
+                and not joint.trajectory:
+            lag = t - joint.command_time
+            self.reached_lags.append(lag)
+            self.record({"t": t, "event": "reached", "joint": name, "lag": lag})
+            joint.command_time = None
+
+    def _trajectory_value(self, joint, t):
+        points = joint.trajectory
+        if t >= points[-1][0]:
+            value = points[-1][1]
+            joint.trajectory = None
+            return value
+        prev_t, prev_a = points[0]
+        for point_t, point_a in points[1:]:
+            if t <= point_t:
+                frac = (t - prev_t) / (point_t - prev_t) if point_t > prev_t else 1.0
+                return prev_a + (point_a - prev_a) * frac
+            prev_t, prev_a = point_t, point_a
+        return points[-1][1]
+
+    def set_targets(self, names, angles, speed, now):
+        with self.lock:
+            self.advance(now)
+            for name, angle in zip(names, angles):
+                lo, hi, _ = JOINTS[name]
+                joint = self.joints[name]
+                joint.trajectory = None
+                joint.target = min(max(angle, lo), hi)
+                joint.speed = min(max(speed, 0.0), 1.0)
+                joint.command_time = now
+
+    def set_trajectories(self, names, angle_lists, time_lists, absolute, now):
+        """Devuelve la duración total de la interpolación."""
+        with self.lock:
+            self.advance(now)
+            duration = 0.0
+            for name, angles, times in zip(names, angle_lists, time_lists):
+                lo, hi, _ = JOINTS[name]
+                joint = self.joints[name]
+                base = 0.0 if absolute else joint.position
+                points = [(now, joint.position)]
+                for a, dt in zip(angles, times):
+                    points.append((now + dt, min(max(base + a, lo), hi)))
+                joint.trajectory = points
+                joint.target = points[-1][1]
+                joint.speed = 1.0
+                joint.command_time = now
+                duration = max(duration, times[-1] if times else 0.0)
+            return duration
+
+    def positions(self, names):
+        with self.lock:
+            self.advance()
+            return [self.joints[name].position for name in names]
+
+    def stats(self):
+        """Resumen para load tests: llamadas por método y demora hasta la pose."""
+        lags = sorted(self.reached_lags)
+
+        def pct(q):
+            return lags[min(len(lags) - 1, int(q * len(lags)))] if lags else None
+        return {"calls": dict(self.calls), "max_in_flight": self.max_in_flight,
+                "pose_lag_p50": pct(0.5), "pose_lag_p95": pct(0.95),
+                "pose_lag_max": lags[-1] if lags else None, "reached": len(lags)}
+
+
+robot = SimRobot()
+
+
+# ======================
+# Proxies
+# ======================
+class _PostCaller(object):
+    """proxy.post.metodo(...): corre la llamada en un hilo y devuelve un id."""
+
+    def __init__(self, proxy):
+        self._proxy = proxy
+
+    def __getattr__(self, name):
+        method = getattr(self._proxy, name)
+
+        def call(*args):
+            return self._proxy._start_task(name, method, args)
+        return call
+
+
+class SimProxy(object):
+    module = "ALModule"
+
+    def __init__(self, ip=None, port=None):
+        self.ip = ip
+        self.port = port
+        self.post = _PostCaller(self)
+        self._tasks = {}
+        self._next_id = 1
+        self._task_lock = threading.Lock()
+        self._generation = robot.generation
+
+    def _rpc(self, method, args):
+        """Latencia de red + registro de la llamada."""
+        if self._generation != robot.generation:
+            raise RuntimeError("ALNetwork::call\n\tConnection lost to {}".format(self.module))
+        start = time.time()
+        with robot.lock:
+            robot.calls[method] = robot.calls.get(method, 0) + 1
+            robot.in_flight += 1
+            robot.max_in_flight = max(robot.max_in_flight, robot.in_flight)
+        # La latencia de red no se escala con time_scale
+        time.sleep(CONFIG["latency"] + random.uniform(0, CONFIG["jitter"]))
+        return start
+
+    def _done(self, method, args, start):
+        with robot.lock:
+            robot.in_flight -= 1
+        robot.record({"t": start, "end": time.time(), "module": self.module,
+                      "method": method, "args": _jsonable(args)})
+
+    def _start_task(self, name, method, args):
+        with self._task_lock:
+            task_id = self._next_id
+            self._next_id += 1
+        thread = threading.Thread(target=method, args=args)
+        thread.daemon = True
+        self._tasks[task_id] = thread
+        thread.start()
+        return task_id
+
+    def wait(self, task_id, timeout_ms=0):
+        thread = self._tasks.get(task_id)
+        if thread is not None:
+            thread.join(timeout_ms / 1000.0 if timeout_ms else None)
+        return thread is None or not thread.is_alive()
+
+    def isRunning(self, task_id):
+        thread = self._tasks.get(task_id)
+        return thread is not None and thread.is_alive()
+
+    def stop(self, task_id):
+        pass  # los hilos simulados terminan solos
+
+    def ping(self):
+        start = self._rpc("ping", ())
+        self._done("ping", (), start)
+        return True
+
+
+def _jsonable(value):
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, float):
+        return round(value, 6)
+    return value
+
+
+def _rpc_method(func):
+    """Envuelve un método con la latencia y el registro de la traza."""
+    def wrapper(self, *args):
+        start = self._rpc(func.__name__, args)
+        try:
+            return func(self, *args)
+        finally:
+            self._done(func.__name__, args, start)
+    wrapper.__name__ = func.__name__
+    wrapper.__doc__ = func.__doc__
+    return wrapper
+
+
+class ALMotion(SimProxy):
+    module = "ALMotion"
+
+    @_rpc_method
+    def setStiffnesses(self, names, stiffnesses):
+        names = _names(names)
+        values = _as_list(stiffnesses, len(names))
+        with robot.lock:
+            robot.advance()
+            for name, value in zip(names, values):
+                robot.joints[name].stiffness = float(value)
+
+    @_rpc_method
+    def getStiffnesses(self, names):
+        names = _names(names)
+        with robot.lock:
+            return [robot.joints[name].stiffness for name in names]
+
+    @_rpc_method
+    def setAngles(self, names, angles, fractionMaxSpeed):
+        """No bloqueante: fija el objetivo y vuelve."""
+        names = _names(names)
+        robot.set_targets(names, _as_list(angles, len(names)), fractionMaxSpeed, time.time())
+
+    @_rpc_method
+    def changeAngles(self, names, changes, fractionMaxSpeed):
+        names = _names(names)
+        current = robot.positions(names)
+        targets = [c + d for c, d in zip(current, _as_list(changes, len(names)))]
+        robot.set_targets(names, targets, fractionMaxSpeed, time.time())
+
+    @_rpc_method
+    def angleInterpolation(self, names, angleLists, timeLists, isAbsolute):
+        """Bloqueante: vuelve cuando termina la trayectoria."""
+        names = _names(names)
+        if len(names) == 1 and not isinstance(angleLists, (list, tuple)):
+            angleLists, timeLists = [[angleLists]], [[timeLists]]
+        elif len(names) == 1 and angleLists and not isinstance(angleLists[0], (list, tuple)):
+            angleLists, timeLists = [angleLists], [timeLists]
+        else:
+            angleLists = [a if isinstance(a, (list, tuple)) else [a] for a in angleLists]
+            timeLists = [t if isinstance(t, (list, tuple)) else [t] for t in
+                         _as_list(timeLists, len(names))]
+        duration = robot.set_trajectories(names, angleLists, timeLists, isAbsolute, time.time())
+        _sleep(duration)
+
+    @_rpc_method
+    def angleInterpolationWithSpeed(self, names, targetAngles, maxSpeedFraction):
+        """Bloqueante: vuelve cuando todas las articulaciones llegaron."""
+        names = _names(names)
+        targets = _as_list(targetAngles, len(names))
+        current = robot.positions(names)
+        robot.set_targets(names, targets, maxSpeedFraction, time.time())
+        speed = max(maxSpeedFraction, 1e-3)
+        _sleep(max([abs(t - c) / (JOINTS[n][2] * speed) for n, t, c in zip(names, targets, current)] or [0]))
+
+    @_rpc_method
+    def getAngles(self, names, useSensors):
+        return robot.positions(_names(names))
+
+    def _hand(self, name, value):
+        name = name if name in ("LHand", "RHand") else name[0] + "Hand"
+        robot.set_trajectories([name], [[value]], [[HAND_SECONDS]], True, time.time())
+        _sleep(HAND_SECONDS)
+
+    @_rpc_method
+    def openHand(self, handName):
+        self._hand(handName, 1.0)
+
+    @_rpc_method
+    def closeHand(self, handName):
+        self._hand(handName, 0.0)
+
+    @_rpc_method
+    def wakeUp(self):
+        with robot.lock:
+            for joint in robot.joints.values():
+                joint.stiffness = 1.0
+
+    @_rpc_method
+    def rest(self):
+        with robot.lock:
+            for joint in robot.joints.values():
+                joint.stiffness = 0.0
+
+    @_rpc_method
+    def robotIsWakeUp(self):
+        with robot.lock:
+            return any(j.stiffness > 0 for j in robot.joints.values())
+
+    @_rpc_method
+    def stopMove(self):
+        pass
+
+    @_rpc_method
+    def killAll(self):
+        with robot.lock:
+            robot.advance()
+            for joint in robot.joints.values():
+                joint.trajectory = None
+                joint.target = joint.position
+
+
+class ALRobotPosture(SimProxy):
+    module = "ALRobotPosture"
+
+    @_rpc_method
+    def goToPosture(self, postureName, maxSpeedFraction):
+        if postureName not in POSTURES:
+            return False
+        target = POSTURES[postureName]
+        names = sorted(JOINTS)
+        duration = POSTURE_SECONDS / max(maxSpeedFraction, 0.1)
+        robot.set_trajectories(names, [[target.get(n, 0.0)] for n in names],
+                               [[duration]] * len(names), True, time.time())
+        _sleep(duration)
+        robot.posture = postureName
+        return True
+
+    @_rpc_method
+    def getPosture(self):
+        return robot.posture
+
+    @_rpc_method
+    def getPostureList(self):
+        return sorted(POSTURES)
+
+
+class ALTextToSpeech(SimProxy):
+    module = "ALTextToSpeech"
+
+    def __init__(self, *args):
+        SimProxy.__init__(self, *args)
+        self.language = "Spanish"
+        self.volume = 1.0
+
+    @_rpc_method
+    def say(self, text):
+        _sleep(len(text) / max(CONFIG["speech_cps"], 1.0))
+
+    @_rpc_method
+    def setLanguage(self, language):
+        self.language = language
+
+    @_rpc_method
+    def getLanguage(self):
+        return self.language
+
+    @_rpc_method
+    def setVolume(self, volume):
+        self.volume = volume
+
+
+class ALBehaviorManager(SimProxy):
+    module = "ALBehaviorManager"
+
+    @_rpc_method
+    def getInstalledBehaviors(self):
+        return list(CONFIG["behaviors"])
+
+    @_rpc_method
+    def isBehaviorInstalled(self, name):
+        return not CONFIG["behaviors"] or name in CONFIG["behaviors"]
+
+    @_rpc_method
+    def isBehaviorRunning(self, name):
+        with robot.lock:
+            return name in robot.running_behaviors
+
+    @_rpc_method
+    def getRunningBehaviors(self):
+        with robot.lock:
+            return sorted(robot.running_behaviors)
+
+    def _run(self, name):
+        with robot.lock:
+            robot.running_behaviors.add(name)
+        deadline = time.time() + CONFIG["behavior_seconds"] * CONFIG["time_scale"]
+        while time.time() < deadline:
+            with robot.lock:
+                if name not in robot.running_behaviors:
+                    return  # stopBehavior
+            time.sleep(0.02)
+        with robot.lock:
+            robot.running_behaviors.discard(name)
+
+    @_rpc_method
+    def runBehavior(self, name):
+        """Bloqueante: vuelve cuando termina el comportamiento."""
+        if CONFIG["behaviors"] and name not in CONFIG["behaviors"]:
+            raise RuntimeError("ALBehaviorManager: comportamiento no instalado '{}'".format(name))
+        self._run(name)
+
+    @_rpc_method
+    def startBehavior(self, name):
+        thread = threading.Thread(target=self._run, args=(name,))
+        thread.daemon = True
+        thread.start()
+
+    @_rpc_method
+    def stopBehavior(self, name):
+        with robot.lock:
+            robot.running_behaviors.discard(name)
+
+    @_rpc_method
+    def stopAllBehaviors(self):
+        with robot.lock:
+            robot.running_behaviors.clear()
+
+
+class ALAutonomousLife(SimProxy):
+    module = "ALAutonomousLife"
+
+    @_rpc_method
+    def setState(self, state):
+        robot.life_state = state
+
+    @_rpc_method
+    def getState(self):
+        return robot.life_state
+
+
+MODULES = dict((cls.module, cls) for cls in
+               (ALMotion, ALRobotPosture, ALTextToSpeech, ALBehaviorManager, ALAutonomousLife))
+
+
+def restart_broker():
+    """Simula un reinicio de NAOqi: los proxies existentes dejan de funcionar."""
+    with robot.lock:
+        robot.generation += 1
+
+
+def ALProxy(name, ip=None, port=None):
+    """Misma firma que naoqi.ALProxy; devuelve el módulo simulado."""
+    cls = MODULES.get(name)
+    if cls is None:
+        raise RuntimeError("ALProxy::ALProxy\n\tCan't find service: {}".format(name))
+    time.sleep(CONFIG["latency"])
+    with robot.lock:
+        robot.proxies_created += 1
+    return cls(ip, port)
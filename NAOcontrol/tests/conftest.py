@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Los scripts del robot se importan entre sí por nombre (from wire_protocol import ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Script manual contra un NAO real, no una prueba
+collect_ignore = ["test_modelo.py"]
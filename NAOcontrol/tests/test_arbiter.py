@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+import main
+from main import Arbiter, ClientConnection, STALE_AFTER
+from wire_protocol import Frame, FLAG_PREDICTED, JOINT_ORDER
+
+FULL = dict((j, 10.0) for j in JOINT_ORDER)
+
+
+def client(client_id, priority=0, host=None, synced=False):
+    host = host or "10.0.0.%d" % client_id  # remotos: desfase estimado
+    return ClientConnection(None, (host, 5000), client_id, priority, synced)
+
+
+def frame(seq, timestamp, angles=None, changed=None, flags=0):
+    angles = FULL if angles is None else angles
+    return Frame(1, flags, seq, timestamp, angles, tuple(angles) if changed is None else changed)
+
+
+def deliver(arbiter, c, f, clients, now):
+    c.update(f, now)
+    return arbiter.select(c, f, clients, now)
+
+
+# ======================
+# priority
+# ======================
+def test_priority_prefers_best_and_fails_over():
+    main_cam, backup = client(1, priority=0), client(2, priority=1)
+    clients = [main_cam, backup]
+    arbiter = Arbiter("priority")
+    assert deliver(arbiter, main_cam, frame(1, 100.0), clients, 100.0) is not None
+    assert deliver(arbiter, backup, frame(1, 100.01), clients, 100.01) is None
+    # La principal se calla: pasado STALE_AFTER manda la de respaldo
+    later = 100.0 + STALE_AFTER + 0.01
+    assert deliver(arbiter, backup, frame(2, later), clients, later) is not None
+    # Vuelve la principal y recupera el control
+    assert deliver(arbiter, main_cam, frame(2, later + 0.01), clients, later + 0.01) is not None
+    assert deliver(arbiter, backup, frame(3, later + 0.02), clients, later + 0.02) is None
+
+
+def test_priority_ties_go_to_first_connected():
+    a, b = client(1), client(2)
+    arbiter = Arbiter("priority")
+    deliver(arbiter, a, frame(1, 0.0), [a, b], 0.0)
+    assert deliver(arbiter, b, frame(1, 0.0), [a, b], 0.01) is None
+
+
+def test_empty_delta_only_on_source_change():
+    a, b = client(1, priority=0), client(2, priority=1)
+    arbiter = Arbiter("priority")
+    assert deliver(arbiter, a, frame(1, 0.0), [a, b], 0.0) is not None
+    assert deliver(arbiter, a, frame(2, 0.03, changed=()), [a, b], 0.03) is None
+    later = 0.03 + STALE_AFTER + 0.01
+    assert deliver(arbiter, b, frame(1, later, changed=()), [a, b], later) is not None
+
+
+# ======================
+# freshest
+# ======================
+def test_freshest_drops_older_captures():
+    a, b = client(1), client(2)
+    arbiter = Arbiter("freshest")
+    # Primera trama de cada uno: fija el desfase de su reloj
+    assert deliver(arbiter, a, frame(1, 10.00), [a, b], 10.005) is not None
+    assert deliver(arbiter, b, frame(1, 10.01), [a, b], 10.015) is not None
+    # a llega después pero con una captura más vieja que la de b
+    assert deliver(arbiter, a, frame(2, 10.02), [a, b], 10.040) is not None
+    assert deliver(arbiter, b, frame(2, 10.015), [a, b], 10.045) is None
+
+
+@pytest.mark.parametrize("skew", [-30.0, 30.0])
+def test_freshest_is_immune_to_clock_skew(skew):
+    a, b = client(1), client(2)
+    arbiter = Arbiter("freshest")
+    won = {1: 0, 2: 0}
+    for i in range(200):
+        now = 1000.0 + i * 0.01
+        c, offset = (a, 0.0) if i % 2 == 0 else (b, skew)
+        if deliver(arbiter, c, frame(i, now - 0.005 + offset), [a, b], now) is not None:
+            won[c.id] += 1
+    assert won == {1: 100, 2: 100}
+
+
+def test_clock_offset_local_and_synced():
+    local = client(1, host="127.0.0.1")
+    synced = client(2, synced=True)
+    remote = client(3)
+    for c in (local, synced, remote):
+        c.update(frame(1, 99.0), 100.0)
+        c.update(frame(2, 99.5), 100.6)
+    assert local.clock_offset == 0.0 and synced.clock_offset == 0.0
+    assert remote.clock_offset == pytest.approx(1.0)
+    assert remote.local_capture(frame(3, 99.7)) == pytest.approx(100.7)
+
+
+# ======================
+# confidence
+# ======================
+def test_confidence_blends_by_weight():
+    a, b = client(1), client(2)
+    arbiter = Arbiter("confidence")
+    for i in range(40):
+        now = i * 0.03
+        deliver(arbiter, a, frame(i, now, dict(FULL, HeadYaw=0.0, LHand=1.0)), [a, b], now)
+        out = deliver(arbiter, b, frame(i, now, dict(FULL, HeadYaw=30.0, LHand=0.0),
+                                        flags=FLAG_PREDICTED), [a, b], now + 0.001)
+    # b extrapola (confianza PREDICTED_CONFIDENCE): pesa la mitad que a
+    expected = 30.0 * main.PREDICTED_CONFIDENCE / (1 + main.PREDICTED_CONFIDENCE)
+    assert out.angles["HeadYaw"] == pytest.approx(expected, abs=0.5)
+    assert out.angles["LHand"] == 1.0  # manos del cliente más confiable
+
+
+def test_confidence_single_client_passes_through():
+    a = client(1)
+    arbiter = Arbiter("confidence")
+    f = frame(1, 0.0)
+    assert deliver(arbiter, a, f, [a], 0.0) is f
+    assert deliver(arbiter, a, frame(2, 0.03, changed=()), [a], 0.03) is None
+
+
+def test_stale_client_leaves_the_blend():
+    a, b = client(1), client(2)
+    arbiter = Arbiter("confidence")
+    deliver(arbiter, b, frame(1, 0.0, dict(FULL, HeadYaw=50.0)), [a, b], 0.0)
+    later = STALE_AFTER + 0.1
+    out = deliver(arbiter, a, frame(1, later, dict(FULL, HeadYaw=0.0)), [a, b], later)
+    assert out.angles["HeadYaw"] == 0.0
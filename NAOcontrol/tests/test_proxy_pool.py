@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+import proxy_pool
+from proxy_pool import ProxyPool
+
+
+class Broker(object):
+    """NAOqi falso: al reiniciarse, los proxies creados antes dejan de andar."""
+
+    def __init__(self):
+        self.generation = 0
+        self.created = []
+
+    def factory(self, service, ip, port):
+        proxy = FakeProxy(self, service, ip)
+        self.created.append(proxy)
+        return proxy
+
+    def restart(self):
+        self.generation += 1
+
+
+class FakeProxy(object):
+    def __init__(self, broker, service, ip):
+        self.broker = broker
+        self.generation = broker.generation
+        self.service = service
+        self.ip = ip
+        self.calls = []
+        self.post = self
+
+    def _check(self):
+        if self.generation != self.broker.generation:
+            raise RuntimeError("broker reiniciado")
+
+    def ping(self):
+        self._check()
+        return True
+
+    def setAngles(self, *args):
+        self._check()
+        self.calls.append(args)
+        return "ok"
+
+    def badMethod(self):
+        self._check()
+        raise ValueError("argumento inválido")
+
+
+def test_proxies_are_reused_per_key():
+    broker = Broker()
+    pool = ProxyPool(broker.factory)
+    a = pool.get("ALMotion", "nao", 9559)
+    b = pool.get("ALMotion", "nao", "9559")
+    pool.get("ALTextToSpeech", "nao", 9559)
+    a.setAngles("HeadYaw", 0.1, 0.2)
+    b.setAngles("HeadYaw", 0.2, 0.2)
+    assert len(broker.created) == 2
+    stats = pool.stats()
+    assert (stats["created"], stats["reused"]) == (2, 1)
+    assert stats["reuse_ratio"] == pytest.approx(1 / 3.0)
+
+
+def test_reconnects_and_retries_after_broker_restart():
+    broker = Broker()
+    pool = ProxyPool(broker.factory)
+    motion = pool.get("ALMotion", "nao", 9559)
+    tts = pool.get("ALTextToSpeech", "nao", 9559)
+    broker.restart()
+    assert motion.setAngles("HeadYaw", 0.0, 0.2) == "ok"
+    assert pool.reconnects == 1 and pool.failures == 1
+    # El reinicio invalida todos los proxies de ese robot, no solo el que falló
+    assert ("ALTextToSpeech", "nao", 9559) not in pool.entries
+    tts.ping()
+    assert len(broker.created) == 4
+
+
+def test_post_calls_go_through_the_pool():
+    broker = Broker()
+    pool = ProxyPool(broker.factory)
+    motion = pool.get("ALMotion", "nao", 9559)
+    broker.restart()
+    assert motion.post.setAngles("HeadYaw", 0.0, 0.2) == "ok"
+    assert pool.reconnects == 1
+
+
+def test_method_errors_propagate_without_reconnect():
+    broker = Broker()
+    pool = ProxyPool(broker.factory)
+    motion = pool.get("ALMotion", "nao", 9559)
+    with pytest.raises(ValueError):
+        motion.badMethod()
+    assert pool.reconnects == 0 and pool.failures == 1
+    assert len(broker.created) == 1
+
+
+def test_gives_up_after_retries():
+    class DeadBroker(Broker):
+        def factory(self, service, ip, port):
+            proxy = Broker.factory(self, service, ip, port)
+            proxy.generation = -1  # nunca responde
+            return proxy
+    pool = ProxyPool(DeadBroker().factory)
+    motion = pool.get("ALMotion", "nao", 9559)
+    with pytest.raises(RuntimeError):
+        motion.setAngles("HeadYaw", 0.0, 0.2)
+    assert pool.failures == proxy_pool.RETRIES + 1
+
+
+def test_idle_proxy_is_checked_on_get(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(proxy_pool, "clock", lambda: now[0])
+    broker = Broker()
+    pool = ProxyPool(broker.factory, health_interval=5.0)
+    pool.get("ALMotion", "nao", 9559)
+    now[0] = 1.0
+    pool.get("ALMotion", "nao", 9559)
+    assert pool.health_checks == 0  # usado hace poco: sin ping
+    now[0] = 10.0
+    broker.restart()
+    pool.get("ALMotion", "nao", 9559)
+    assert pool.health_checks == 1 and pool.reconnects == 1
+    assert len(broker.created) == 2
+
+
+def test_other_robots_are_untouched():
+    broker = Broker()
+    pool = ProxyPool(broker.factory)
+    pool.get("ALMotion", "nao1", 9559)
+    pool.get("ALMotion", "nao2", 9559)
+    pool._invalidate_robot("nao1", 9559)
+    assert list(pool.entries) == [("ALMotion", "nao2", 9559)]
+
+
+def test_dunder_lookups_are_not_proxied():
+    pool = ProxyPool(Broker().factory)
+    motion = pool.get("ALMotion", "nao", 9559)
+    assert not hasattr(motion, "__len__")
+    assert "ALMotion" in repr(motion)
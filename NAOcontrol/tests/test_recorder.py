@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+
+from recorder import Recorder, iter_chunks, iter_rows, to_csv
+
+
+def rows_in(files):
+    return [(ts, row) for ts, row in iter_rows(files)]
+
+
+def test_roundtrip_and_missing_values(tmp_path):
+    rec = Recorder(prefix=str(tmp_path / "s"), columns=["HeadYaw", "LHand"])
+    rec.log({"HeadYaw": 1.5, "LHand": 1.0}, 10.0)
+    rec.log({"HeadYaw": -2.0}, 10.1)
+    files = rec.close()
+    rows = rows_in(files)
+    assert [ts for ts, _ in rows] == [10.0, 10.1]
+    assert rows[0][1] == {"HeadYaw": 1.5, "LHand": 1.0}
+    assert rows[1][1] == {"HeadYaw": -2.0, "LHand": None}
+
+
+def test_full_chunks_are_handed_off(tmp_path):
+    rec = Recorder(prefix=str(tmp_path / "s"), chunk_rows=16, flush_interval=1e9)
+    for i in range(100):
+        rec.log({"HeadYaw": float(i)}, float(i) / 1000)
+    files = rec.close()
+    sizes = [len(ts) for ts, _ in iter_chunks(files[0])]
+    assert sizes == [16] * 6 + [4]
+    assert [row["HeadYaw"] for _, row in rows_in(files)] == [float(i) for i in range(100)]
+
+
+def test_rotation_by_size(tmp_path):
+    rec = Recorder(prefix=str(tmp_path / "s"), chunk_rows=10, flush_interval=1e9, max_bytes=200)
+    for i in range(50):
+        rec.log({"HeadYaw": float(i)}, float(i))
+    files = rec.close()
+    assert len(files) == 5  # un bloque de 10 filas ya supera 200 bytes
+    assert len(set(files)) == len(files)
+    assert [row["HeadYaw"] for _, row in rows_in(files)] == [float(i) for i in range(50)]
+
+
+def test_rotation_by_duration(tmp_path):
+    rec = Recorder(prefix=str(tmp_path / "s"), chunk_rows=4, flush_interval=1e9, max_seconds=0.05)
+    for i in range(12):
+        rec.log({"HeadYaw": float(i)}, float(i))
+        if i % 4 == 3:
+            time.sleep(0.1)
+    files = rec.close()
+    assert len(files) >= 2
+    assert len(rows_in(files)) == 12
+
+
+def test_stale_partial_chunk_is_claimed(tmp_path):
+    rec = Recorder(prefix=str(tmp_path / "s"), chunk_rows=1024, flush_interval=0.2)
+    for i in range(5):
+        rec.log({"HeadYaw": float(i)})
+    # El flujo se pausa: el escritor reclama el bloque sin esperar a log()
+    deadline = time.time() + 2.0
+    while rec.chunks == 0 and time.time() < deadline:
+        time.sleep(0.01)
+    assert rec.chunks == 1
+    assert len(rows_in(rec.files)) == 5
+    rec.log({"HeadYaw": 5.0})
+    files = rec.close()
+    assert len(rows_in(files)) == 6
+
+
+def test_rows_dropped_when_writer_is_stuck(tmp_path, monkeypatch):
+    release = threading.Event()
+    original = Recorder._write_chunk
+
+    def slow_write(self, chunk):
+        release.wait(5)
+        original(self, chunk)
+    monkeypatch.setattr(Recorder, "_write_chunk", slow_write)
+    rec = Recorder(prefix=str(tmp_path / "s"), chunk_rows=4, pool_chunks=2, flush_interval=1e9)
+    for i in range(20):
+        rec.log({"HeadYaw": float(i)}, float(i))
+    assert rec.dropped > 0
+    release.set()
+    files = rec.close()
+    assert len(rows_in(files)) == 20 - rec.dropped
+
+
+def test_truncated_last_chunk_is_ignored(tmp_path):
+    rec = Recorder(prefix=str(tmp_path / "s"), chunk_rows=8, flush_interval=1e9)
+    for i in range(16):
+        rec.log({"HeadYaw": float(i)}, float(i))
+    path = rec.close()[0]
+    with open(path, "rb+") as f:
+        f.seek(-10, 2)
+        f.truncate()
+    assert len(rows_in([path])) == 8
+
+
+def test_to_csv(tmp_path):
+    rec = Recorder(prefix=str(tmp_path / "s"), columns=["HeadYaw", "LHand"])
+    rec.log({"HeadYaw": 1.25}, 1.0)
+    rec.log({"LHand": 0.0}, 2.0)
+    out = tmp_path / "s.csv"
+    assert to_csv(rec.close(), str(out)) == 2
+    lines = out.read_text().splitlines()
+    assert lines == ["timestamp,HeadYaw,LHand", "1.000,1.25,", "2.000,,0"]
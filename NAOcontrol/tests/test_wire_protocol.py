@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+import math
+
+from wire_protocol import (encode_frame, encode_delta, FrameDecoder, DeltaEncoder, HEADER, MAGIC,
+                           MAX_PAYLOAD, VERSION, JOINT_ORDER, FLAG_DELTA)
+
+POSE = {"HeadYaw": 10.0, "HeadPitch": -5.0, "LShoulderPitch": 45.0, "LHand": 1.0}
+
+
+def frames_for(n, start=0):
+    return [encode_frame(dict(POSE, HeadYaw=float(i)), i, 100.0 + i) for i in range(start, start + n)]
+
+
+def test_roundtrip():
+    frames = FrameDecoder().feed(encode_frame(POSE, 7, 123.5))
+    assert len(frames) == 1
+    frame = frames[0]
+    assert (frame.seq, frame.timestamp) == (7, 123.5)
+    assert frame.angles == POSE
+    assert set(frame.changed) == set(POSE)
+
+
+def test_json_roundtrip():
+    frame, = FrameDecoder().feed(encode_frame(POSE, 1, 0.0, use_json=True))
+    assert frame.angles == POSE
+
+
+def test_frame_split_across_feeds():
+    data = b"".join(frames_for(3))
+    decoder = FrameDecoder()
+    out = []
+    for i in range(len(data)):
+        out.extend(decoder.feed(data[i:i + 1]))
+    assert [f.seq for f in out] == [0, 1, 2]
+    assert decoder.errors == 0
+    assert len(decoder.buffer) == 0
+
+
+def test_frames_merged_in_one_feed():
+    decoder = FrameDecoder()
+    data = b"".join(frames_for(5))
+    # Dos tramas y media, luego el resto
+    cut = 2 * len(data) // 5 + 3
+    first = decoder.feed(data[:cut])
+    rest = decoder.feed(data[cut:])
+    assert [f.seq for f in first] == [0, 1]
+    assert [f.seq for f in rest] == [2, 3, 4]
+
+
+def test_garbage_before_magic():
+    decoder = FrameDecoder()
+    out = decoder.feed(b"\x00\xffbasura N" + encode_frame(POSE, 1, 0.0))
+    assert [f.seq for f in out] == [1]
+    assert decoder.errors >= 1
+
+
+def test_garbage_ending_in_half_magic():
+    decoder = FrameDecoder()
+    frame = encode_frame(POSE, 3, 0.0)
+    assert decoder.feed(b"xxxxxxxxxxxxxxxxxxxxxxxx" + frame[:1]) == []
+    out = decoder.feed(frame[1:])
+    assert [f.seq for f in out] == [3]
+
+
+def test_oversized_length_is_skipped():
+    decoder = FrameDecoder()
+    bogus = HEADER.pack(MAGIC, VERSION, 0, 9, 0.0, MAX_PAYLOAD + 1)
+    out = decoder.feed(bogus + encode_frame(POSE, 10, 0.0))
+    assert [f.seq for f in out] == [10]
+    assert decoder.errors >= 1
+
+
+def test_wrong_version_is_dropped():
+    decoder = FrameDecoder()
+    good = encode_frame(POSE, 1, 0.0)
+    bad = good[:2] + bytearray([VERSION + 1]) + good[3:]
+    out = decoder.feed(bytes(bad) + encode_frame(POSE, 2, 0.0))
+    assert [f.seq for f in out] == [2]
+    assert decoder.errors == 1
+
+
+def test_missing_joints_are_not_reported():
+    frame, = FrameDecoder().feed(encode_frame({"HeadYaw": float("nan"), "LHand": 0.0}, 1, 0.0))
+    assert frame.angles == {"LHand": 0.0}
+    assert set(frame.changed) <= set(JOINT_ORDER)
+
+
+def test_lost_counts_sequence_gaps():
+    decoder = FrameDecoder()
+    data = [encode_frame(POSE, seq, 0.0) for seq in (1, 2, 5, 6, 10)]
+    out = decoder.feed(b"".join(data))
+    assert [f.seq for f in out] == [1, 2, 5, 6, 10]
+    assert decoder.lost == 2 + 3
+
+
+def test_reset_forgets_sequence():
+    decoder = FrameDecoder()
+    decoder.feed(encode_frame(POSE, 50, 0.0))
+    decoder.reset()
+    decoder.feed(encode_frame(POSE, 1, 0.0))
+    assert decoder.lost == 0
+
+
+def test_float32_precision():
+    frame, = FrameDecoder().feed(encode_frame({"HeadYaw": 1.0 / 3}, 1, 0.0))
+    assert math.isclose(frame.angles["HeadYaw"], 1.0 / 3, rel_tol=1e-6)
+
+
+# ======================
+# Modo delta
+# ======================
+def test_delta_before_first_keyframe_is_unsynced():
+    decoder = FrameDecoder()
+    out = decoder.feed(encode_delta({"HeadYaw": 3.0}, 1, 0.0))
+    assert out == []
+    assert decoder.unsynced == 1
+    frame, = decoder.feed(encode_frame(POSE, 2, 0.0))
+    assert frame.angles == POSE
+
+
+def test_delta_rebuilds_full_pose():
+    decoder = FrameDecoder()
+    decoder.feed(encode_frame(POSE, 1, 0.0))
+    frame, = decoder.feed(encode_delta({"HeadYaw": 20.0}, 2, 0.0))
+    assert frame.flags & FLAG_DELTA
+    assert frame.changed == ("HeadYaw",)
+    assert frame.angles == dict(POSE, HeadYaw=20.0)
+
+
+def test_delta_joint_lost_as_none_and_nan():
+    for use_json in (False, True):
+        decoder = FrameDecoder()
+        decoder.feed(encode_frame(POSE, 1, 0.0))
+        frame, = decoder.feed(encode_delta({"LHand": None}, 2, 0.0, use_json=use_json))
+        assert "LHand" not in frame.angles
+        assert frame.changed == ("LHand",)
+    # NaN explícito en el payload binario
+    decoder = FrameDecoder()
+    decoder.feed(encode_frame(POSE, 1, 0.0))
+    frame, = decoder.feed(encode_delta({"HeadYaw": float("nan")}, 2, 0.0))
+    assert "HeadYaw" not in frame.angles
+
+
+def test_empty_delta_keeps_pose():
+    decoder = FrameDecoder()
+    decoder.feed(encode_frame(POSE, 1, 0.0))
+    frame, = decoder.feed(encode_delta({}, 2, 0.0))
+    assert frame.changed == ()
+    assert frame.angles == POSE
+
+
+def test_frames_do_not_share_the_pose():
+    decoder = FrameDecoder()
+    first, = decoder.feed(encode_frame(POSE, 1, 0.0))
+    decoder.feed(encode_delta({"HeadYaw": 99.0}, 2, 0.0))
+    assert first.angles["HeadYaw"] == POSE["HeadYaw"]
+
+
+def test_encoder_sends_only_changes_over_threshold():
+    encoder = DeltaEncoder(keyframe_interval=100)
+    decoder = FrameDecoder()
+    decoder.feed(encoder.encode(POSE, 1, 0.0))
+    small = dict(POSE, HeadYaw=POSE["HeadYaw"] + 0.2)
+    frame, = decoder.feed(encoder.encode(small, 2, 0.0))
+    assert frame.changed == ()
+    big = dict(POSE, HeadYaw=POSE["HeadYaw"] + 2.0, LHand=0.0)
+    frame, = decoder.feed(encoder.encode(big, 3, 0.0))
+    assert set(frame.changed) == {"HeadYaw", "LHand"}
+    assert frame.angles == big
+
+
+def test_encoder_error_bounded_by_threshold():
+    encoder = DeltaEncoder(keyframe_interval=1000)
+    decoder = FrameDecoder()
+    for i in range(300):
+        pose = dict(POSE, HeadYaw=30 * math.sin(i / 20.0), LShoulderPitch=0.05 * i)
+        frame, = decoder.feed(encoder.encode(pose, i, 0.0))
+        for joint, value in pose.items():
+            assert abs(frame.angles[joint] - value) <= 0.5 + 1e-4
+
+
+def test_encoder_lost_joint_and_keyframes():
+    encoder = DeltaEncoder(keyframe_interval=3)
+    decoder = FrameDecoder()
+    decoder.feed(encoder.encode(POSE, 1, 0.0))
+    partial = dict(POSE)
+    del partial["LHand"]
+    frame, = decoder.feed(encoder.encode(partial, 2, 0.0))
+    assert frame.changed == ("LHand",) and "LHand" not in frame.angles
+    decoder.feed(encoder.encode(partial, 3, 0.0))
+    frame, = decoder.feed(encoder.encode(partial, 4, 0.0))
+    assert not frame.flags & FLAG_DELTA  # keyframe cada 3
+    assert encoder.keyframes == 2 and encoder.deltas == 2
+
+
+def test_force_keyframe_after_reconnect():
+    encoder = DeltaEncoder(keyframe_interval=100)
+    encoder.encode(POSE, 1, 0.0)
+    encoder.force_keyframe()
+    # Un receptor nuevo se sincroniza con la primera trama
+    frame, = FrameDecoder().feed(encoder.encode(POSE, 2, 0.0))
+    assert frame.angles == POSE
@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+"""
+wire_protocol.py
+
+Protocolo de tramas con longitud prefijada entre Vision_comp.py (Python 3)
+y los receptores del NAO (Python 2.7). Compatible con ambas versiones.
+
+Cada trama es:
+  cabecera  "<2sBBIdH": magic "NA", versión, flags, número de secuencia,
+            timestamp de captura (time.time() del emisor), largo del payload
+  payload   float32 little-endian en el orden de JOINT_ORDER (NaN = sin dato),
+            o JSON utf-8 si flags & FLAG_JSON (modo depuración)
+
+Con flags & FLAG_DELTA la trama lleva solo las articulaciones que cambiaron
+respecto de la anterior: máscara "<H" (bit i = JOINT_ORDER[i]) seguida de un
+float32 por bit encendido (NaN = la articulación dejó de detectarse). En
+JSON es un dict parcial con null para las que se perdieron. Las tramas sin
+FLAG_DELTA son keyframes: el receptor reemplaza la pose completa.
+"""
+import json
+import struct
+import time
+from collections import namedtuple
+
+MAGIC = b"NA"
+VERSION = 1
+
+FLAG_JSON = 0x01       # payload en JSON en lugar de floats empaquetados
+FLAG_PREDICTED = 0x02  # ángulos extrapolados entre keyframes, sin inferencia
+FLAG_DELTA = 0x04      # solo las articulaciones que cambiaron (ver DeltaEncoder)
+
+# Orden fijo de las articulaciones en el payload binario (grados, manos 0/1)
+JOINT_ORDER = [
+    "HeadYaw", "HeadPitch",
+    "LShoulderPitch", "LShoulderRoll",
+    "RShoulderPitch", "RShoulderRoll",
+    "LElbowRoll", "RElbowRoll",
+    "LHand", "RHand"
+]
+
+HEADER = struct.Struct("<2sBBIdH")
+JOINTS_STRUCT = struct.Struct("<%df" % len(JOINT_ORDER))
+MASK_STRUCT = struct.Struct("<H")
+MAX_PAYLOAD = 8192
+
+# Cambio mínimo para reenviar una articulación en modo delta (grados; las
+# manos van como 0/1, así que cualquier cambio de estado supera 0.5)
+DELTA_THRESHOLD = 0.5
+DELTA_THRESHOLDS = {"LHand": 0.5, "RHand": 0.5}
+DELTA_KEYFRAME_INTERVAL = 30  # una trama completa cada N
+
+# angles es siempre la pose completa; changed, las articulaciones que trajo
+# esta trama (todas en un keyframe, ninguna en un delta sin cambios)
+Frame = namedtuple("Frame", ["version", "flags", "seq", "timestamp", "angles", "changed"])
+
+
+def encode_frame(angles, seq, timestamp=None, use_json=False, flags=0):
+    """Empaqueta un dict de ángulos en una trama lista para sendall()."""
+    if timestamp is None:
+        timestamp = time.time()
+    if use_json:
+        flags |= FLAG_JSON
+        payload = json.dumps(angles).encode("utf-8")
+    else:
+        nan = float("nan")
+        payload = JOINTS_STRUCT.pack(*[float(angles.get(j, nan)) for j in JOINT_ORDER])
+    header = HEADER.pack(MAGIC, VERSION, flags, seq & 0xFFFFFFFF, timestamp, len(payload))
+    return header + payload
+
+
+def encode_delta(changes, seq, timestamp=None, use_json=False, flags=0):
+    """Trama con solo las articulaciones de changes (None = perdida)."""
+    if timestamp is None:
+        timestamp = time.time()
+    flags |= FLAG_DELTA
+    if use_json:
+        flags |= FLAG_JSON
+        payload = json.dumps(changes).encode("utf-8")
+    else:
+        mask = 0
+        values = []
+        for i, joint in enumerate(JOINT_ORDER):
+            if joint in changes:
+                mask |= 1 << i
+                value = changes[joint]
+                values.append(float("nan") if value is None else float(value))
+        payload = MASK_STRUCT.pack(mask) + struct.pack("<%df" % len(values), *values)
+    header = HEADER.pack(MAGIC, VERSION, flags, seq & 0xFFFFFFFF, timestamp, len(payload))
+    return header + payload
+
+
+def decode_payload(flags, payload):
+    if flags & FLAG_DELTA:
+        return decode_delta(flags, payload)
+    if flags & FLAG_JSON:
+        return json.loads(bytes(payload).decode("utf-8"))
+    values = JOINTS_STRUCT.unpack(bytes(payload))
+    # NaN != NaN: se descartan las articulaciones sin dato
+    return dict((j, v) for j, v in zip(JOINT_ORDER, values) if v == v)
+
+
+def decode_delta(flags, payload):
+    """Cambios de una trama FLAG_DELTA; None marca una articulación perdida."""
+    if flags & FLAG_JSON:
+        return json.loads(bytes(payload).decode("utf-8"))
+    payload = bytes(payload)
+    mask, = MASK_STRUCT.unpack_from(payload)
+    joints = [j for i, j in enumerate(JOINT_ORDER) if mask & (1 << i)]
+    values = struct.unpack("<%df" % len(joints), payload[MASK_STRUCT.size:])
+    return dict((j, v if v == v else None) for j, v in zip(joints, values))
+
+
+class DeltaEncoder(object):
+    """
+    Emisor en modo delta: reenvía una articulación solo si se apartó más que
+    su umbral del último valor enviado (así el error en el receptor queda
+    acotado por el umbral) y manda un keyframe cada keyframe_interval tramas
+    o después de force_keyframe() (p. ej. al reconectar).
+    """
+
+    def __init__(self, keyframe_interval=DELTA_KEYFRAME_INTERVAL, thresholds=None,
+                 default_threshold=DELTA_THRESHOLD):
+        self.keyframe_interval = max(1, int(keyframe_interval))
+        self.thresholds = dict(DELTA_THRESHOLDS)
+        if thresholds:
+            self.thresholds.update(thresholds)
+        self.default_threshold = default_threshold
+        self.reference = None  # pose tal como la conoce el receptor
+        self.since_keyframe = 0
+        self.keyframes = 0
+        self.deltas = 0
+        self.bytes = 0
+
+    def force_keyframe(self):
+        self.reference = None
+
+    def changes(self, angles):
+        """Articulaciones que hay que reenviar respecto de la referencia."""
+        out = {}
+        reference = self.reference
+        for joint, value in angles.items():
+            previous = reference.get(joint)
+            threshold = self.thresholds.get(joint, self.default_threshold)
+            if previous is None or abs(value - previous) > threshold:
+                out[joint] = value
+        for joint in reference:
+            if joint not in angles:
+                out[joint] = None
+        return out
+
+    def encode(self, angles, seq, timestamp=None, use_json=False, flags=0):
+        if self.reference is None or self.since_keyframe >= self.keyframe_interval:
+            payload = encode_frame(angles, seq, timestamp, use_json, flags)
+            self.reference = dict(angles)
+            self.since_keyframe = 1
+            self.keyframes += 1
+        else:
+            changes = self.changes(angles)
+            payload = encode_delta(changes, seq, timestamp, use_json, flags)
+            for joint, value in changes.items():
+                if value is None:
+                    del self.reference[joint]
+                else:
+                    self.reference[joint] = value
+            self.since_keyframe += 1
+            self.deltas += 1
+        self.bytes += len(payload)
+        return payload
+
+
+class FrameDecoder(object):
+    """
+    Decodificador incremental: se le pasan los bytes tal como llegan de
+    recv() y devuelve todas las tramas completas, sin importar si el TCP
+    las juntó o las partió. Ante bytes corruptos se resincroniza con MAGIC.
+
+    Reconstruye la pose completa a partir de keyframes y deltas; los deltas
+    que llegan antes del primer keyframe se descartan (unsynced).
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.frames = 0
+        self.errors = 0
+        self.lost = 0  # tramas faltantes según los saltos de secuencia
+        self.last_seq = None
+        self.pose = None
+        self.keyframes = 0
+        self.deltas = 0
+        self.unsynced = 0
+
+    def feed(self, data):
+        self.buffer.extend(data)
+        frames = []
+        pos = 0
+        buf = self.buffer
+        while True:
+            if len(buf) - pos < HEADER.size:
+                break
+            if buf[pos:pos + 2] != MAGIC:
+                nxt = buf.find(MAGIC, pos + 1)
+                self.errors += 1
+                if nxt < 0:
+                    # Conserva el último byte por si es la mitad de MAGIC
+                    pos = len(buf) - 1
+                    break
+                pos = nxt
+                continue
+
+            magic, version, flags, seq, timestamp, length = HEADER.unpack_from(buf, pos)
+            if length > MAX_PAYLOAD:
+                self.errors += 1
+                pos += 1
+                continue
+            end = pos + HEADER.size + length
+            if len(buf) < end:
+                break
+            payload = buf[pos + HEADER.size:end]
+            pos = end
+
+            if version != VERSION:
+                self.errors += 1
+                continue
+            try:
+                angles = decode_payload(flags, payload)
+            except (ValueError, struct.error):
+                self.errors += 1
+                continue
+
+            if flags & FLAG_DELTA:
+                if self.pose is None:
+                    self.unsynced += 1
+                    continue
+                for joint, value in angles.items():
+                    if value is None:
+                        self.pose.pop(joint, None)
+                    else:
+                        self.pose[joint] = value
+                changed = tuple(angles)
+                self.deltas += 1
+            else:
+                self.pose = dict(angles)
+                changed = tuple(angles)
+                self.keyframes += 1
+            # Copia: el receptor puede guardar la trama mientras llegan otras
+            angles = dict(self.pose)
+
+            if self.last_seq is not None and seq > self.last_seq + 1:
+                self.lost += seq - self.last_seq - 1
+            self.last_seq = seq
+            self.frames += 1
+            frames.append(Frame(version, flags, seq, timestamp, angles, changed))
+
+        if pos:
+            del buf[:pos]
+        return frames
+
+    def reset(self):
+        """Para una nueva conexión: descarta bytes pendientes, la secuencia y la pose."""
+        del self.buffer[:]
+        self.last_seq = None
+        self.pose = None
@@ -1,176 +1,534 @@
 import cv2
 import mediapipe as mp
 import socket
-import json
 import time
-from holistic_data import HolisticData, JointType
-from body_angles import getBodyAngles
-from elbows_angles import Elbows
-import threading
-import queue
+import argparse
+from holistic_data import HolisticData
+from head_angles import HeadPoseEstimator
+from hand_status import HandStateClassifier
+from retargeting import clamp_angles_for_nao, is_body_fully_detected, get_hand_states, retarget_angles
+from frame_sources import open_source
+from pipeline import LatestQueue, Pipeline
+from roi_tracker import RoiTracker, LatencyBudget, map_results
+from keyframe_scheduler import KeyframeScheduler, AnglePredictor
+from filters import FilterBank
+from overlay import OverlayRenderer, RateLimiter
+from NAOcontrol.wire_protocol import encode_frame, DeltaEncoder, FLAG_PREDICTED
+from NAOcontrol.metrics import Registry, SnapshotWriter
+from NAOcontrol.fanout import FanOut, DROP_POLICY
 import tkinter as tk
-import hand_status
-
-angle_queue = queue.Queue()
-elbows = Elbows()
-
-# Función para limitar valores
-def clamp(val, min_val, max_val):
-    return max(min(val, max_val), min_val)
-
-def clamp_angles_for_nao(angles):
-    clamped = {}
-    for key, value in angles.items():
-        if key.endswith("KNEE_PITCH"):
-            clamped[key] = clamp(value, 0, 120)
-        elif key.endswith("HIP_PITCH"):
-            clamped[key] = clamp(value, -45, 30)
-        elif key == "LElbowRoll":
-            clamped[key] = clamp(value, -88.5, -2)
-        elif key == "RElbowRoll":
-            clamped[key] = clamp(value, 2, 88.5)
-        elif key.endswith("SHOULDER_PITCH"):
-            clamped[key] = clamp(value, -90, 90)
-        elif key.endswith("SHOULDER_ROLL"):  # 
-            if key.startswith("R"):
-                clamped[key] = clamp(value, -18, 76)
-            else:
-                clamped[key] = clamp(value, -76, 18)
-        elif key == "HEAD_PITCH":
-            clamped[key] = clamp(value, -40, 30)
-        elif key == "HEAD_YAW":
-            clamped[key] = clamp(value, -120, 120)
-        elif key == "VAREPSILON":
-            clamped[key] = clamp(value, -60, 40)
-        else:
-            clamped[key] = value
-    return clamped
-
-
-# Suavizado exponencial
-class AngleSmoother:
-    def __init__(self, alpha=0.2):
-        self.previous = {}
-        self.alpha = alpha
-
-    def smooth(self, angles):
-        smoothed = {}
-        for key, new_val in angles.items():
-            if key in ["LHand", "RHand"]:
-                smoothed[key] = float(new_val)
-                continue
-
-            if key in self.previous:
-                prev_val = self.previous[key]
-                smoothed_val = self.alpha * new_val + (1 - self.alpha) * prev_val
-            else:
-                smoothed_val = new_val
-            smoothed[key] = smoothed_val
-            self.previous[key] = smoothed_val
-        return smoothed
-
-# Validación
-
-def is_body_fully_detected(data):
-    joints = data.bodyJointsArray
-    required = [
-        JointType.LeftShoulder, JointType.LeftElbow, JointType.LeftWrist,
-        JointType.RightShoulder, JointType.RightElbow, JointType.RightWrist,
-        JointType.LeftHip, JointType.LeftKnee, JointType.LeftAnkle,
-        JointType.RightHip, JointType.RightKnee, JointType.RightAnkle,
-        JointType.SpineMid, JointType.SpineShoulder, JointType.nose
-    ]
-    return all(j in joints for j in required)
-
-# Conexión al socket del NAO
-sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-sock.connect(("127.0.0.1", 6000))
-
-mp_drawing = mp.solutions.drawing_utils
+
+# ======================
+# Configuración
+# ======================
+NAO_SOCKET_IP = "127.0.0.1"
+NAO_SOCKET_PORT = 6000
+CAMERA_INDEX = 0  # usar 0 para la camara web (o --source con un video)
+WARMUP_SECONDS = 2  # segundos iniciales sin enviar ángulos
+WINDOW_NAME = "NAO Tracker"
+
+# "threaded": captura, inferencia, ángulos y envío en hilos separados,
+#             unidos por colas acotadas donde siempre gana el frame más reciente
+# "sync":     bucle secuencial original (un solo hilo)
+PIPELINE_MODE = "threaded"
+QUEUE_SIZE = 1  # capacidad de cada cola entre etapas
+
+# Fuente de la pose de la cabeza:
+# "holistic": usa las landmarks de cara de Holistic (un solo modelo por frame)
+# "facemesh": corre además un FaceMesh aparte (camino original, para comparar)
+HEAD_POSE_SOURCE = "holistic"
+
+# Recorte alrededor de la persona y resolución de inferencia
+ROI_TRACKING = True
+ROI_MARGIN = 0.25        # margen alrededor de la caja de la pose (relativo)
+INFERENCE_WIDTH = 480    # ancho máximo de la imagen que recibe MediaPipe
+MODEL_COMPLEXITY = 1
+# Presupuesto de latencia de inferencia por frame (ms); None = sin ajuste
+# automático de resolución y model_complexity
+LATENCY_BUDGET_MS = None
+
+# Inferencia solo en keyframes: con la persona quieta se infiere uno de cada
+# KEYFRAME_MAX_INTERVAL frames y en los demás se extrapolan los ángulos
+# (1 = inferir siempre)
+KEYFRAME_MAX_INTERVAL = 3
+
+# Filtro de ángulos: "kalman" (velocidad constante), "one_euro" o "ema"
+FILTER_KIND = "kalman"
+# Segundos que se proyectan los ángulos hacia adelante; "auto" usa la
+# latencia medida del pipeline más ROBOT_LATENCY (red + actuación del NAO)
+PREDICTION_HORIZON = "auto"
+ROBOT_LATENCY = 0.08
+MAX_HORIZON = 0.3
+
+# Ventana de visualización: se redibuja a lo sumo DISPLAY_MAX_FPS veces por
+# segundo con el último resultado; HEADLESS = True no abre ventana ni dibuja
+DISPLAY_MAX_FPS = 15
+HEADLESS = False
+
+# Métricas de latencia por etapa: snapshot periódico en JSON (o texto de
+# Prometheus si el archivo termina en .prom); None = solo en memoria
+METRICS_FILE = None
+METRICS_INTERVAL = 5.0
+METRICS_OVERLAY = False
+metrics = Registry()  # registro de latencias del proceso
+
+# Formato en el cable (ver NAOcontrol/wire_protocol.py):
+# "binary": floats empaquetados; "json": payload JSON legible, para depurar
+WIRE_FORMAT = "binary"
+
+# Modo delta: solo se envían las articulaciones que cambiaron más que su
+# umbral (wire_protocol.DELTA_THRESHOLDS), con una trama completa cada
+# DELTA_KEYFRAME_INTERVAL; el receptor reconstruye la pose
+DELTA_ENCODING = False
+DELTA_KEYFRAME_INTERVAL = 30
+
+# Varios robots a la vez ("[nombre=]host:puerto" por robot): cada uno con su
+# hilo emisor y su cola, ver NAOcontrol/fanout.py. Vacío = solo
+# NAO_SOCKET_IP:NAO_SOCKET_PORT por el socket directo
+ROBOT_ENDPOINTS = []
+
 mp_holistic = mp.solutions.holistic
 mp_face_mesh = mp.solutions.face_mesh
 
-cap = cv2.VideoCapture(0) #usar 0 para la camara web
-smoother = AngleSmoother(alpha=0.2)
-start_time = time.time()
 
-with mp_holistic.Holistic(static_image_mode=False, model_complexity=1) as holistic, \
-     mp_face_mesh.FaceMesh(static_image_mode=False, max_num_faces=1, refine_landmarks=True) as face_mesh:
-    
-    cv2.namedWindow("NAO Tracker", cv2.WINDOW_NORMAL)
-    cv2.resizeWindow("NAO Tracker", 960, 540)
+# ======================
+# Etapas del procesamiento
+# ======================
+class FramePacket:
+    """Datos de un frame a su paso por las etapas del pipeline."""
+    __slots__ = ("seq", "capture_time", "frame", "holistic_results",
+                 "face_mesh_results", "fused_landmarks", "angles", "predicted", "created",
+                 "hand_states", "head_pose", "status")
 
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
+    def __init__(self, seq, capture_time, frame):
+        self.seq = seq
+        self.capture_time = capture_time
+        self.frame = frame
+        self.holistic_results = None
+        self.face_mesh_results = None
+        self.fused_landmarks = None  # pose triangulada en modo estéreo
+        self.angles = None
+        self.predicted = False  # True si no hubo inferencia en este frame
+        self.created = time.time()  # reloj local, para medir la latencia
+        # Solo para el overlay
+        self.hand_states = None
+        self.head_pose = None
+        self.status = None
 
-        image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-        holistic_results = holistic.process(image_rgb)
-        face_mesh_results = face_mesh.process(image_rgb)
-        multi_hand_landmarks, multi_handedness = hand_status.create_multi_hand_structures(holistic_results)
-
-        annotated = frame.copy()
-        mp_drawing.draw_landmarks(annotated, holistic_results.pose_landmarks, mp_holistic.POSE_CONNECTIONS)
-        if holistic_results.left_hand_landmarks:
-            mp_drawing.draw_landmarks(annotated, holistic_results.left_hand_landmarks, mp.solutions.hands.HAND_CONNECTIONS)
-        if holistic_results.right_hand_landmarks:
-            mp_drawing.draw_landmarks(annotated, holistic_results.right_hand_landmarks, mp.solutions.hands.HAND_CONNECTIONS)
-
-        results_wrapper = hand_status.ResultsWrapper()
-        results_wrapper.multi_hand_landmarks = multi_hand_landmarks
-        results_wrapper.multi_handedness = multi_handedness
-        status = hand_status.get_hand_status(frame, results_wrapper, show_text=True)
-        lhand_state = status.get("Left", {}).get("is_open")
-        rhand_state = status.get("Right", {}).get("is_open")
-
-        if holistic_results.pose_landmarks and face_mesh_results.multi_face_landmarks:
-            data = HolisticData(holistic_results, face_mesh_results, frame)
-
-            if is_body_fully_detected(data) and time.time() - start_time > 2:
-                angles = getBodyAngles(data.bodyJointsArray)
-                if not angles:  # Verifica si es None o dict vacío
-                    print("No se pudieron calcular los ángulos del cuerpo.")
-                    continue  # Salta este frame y no intenta enviar nada
-                elbow_angles = elbows.get_elbow_angles_for_nao(data.bodyJointsArray)
-                angles.update(elbow_angles)
-                angles = clamp_angles_for_nao(angles)
-                #print("ÁNGULOS DE LOS CODOS (GRADOS):")
-                #print("  LElbowRoll:", elbow_angles.get("LElbowRoll"))
-                #print("  RElbowRoll:", elbow_angles.get("RElbowRoll"))
-
-     
-                body_landmarks_list = {idx: [jp.x, jp.y, jp.z] for idx, jp in data.bodyJointsArray.items()}
-
-                angles["HeadPitch"] = -(data.headRotationAngle["Pitch"]["Degree"] if data.headRotationAngle["Pitch"]["Degree"] is not None else 0)
-                angles["HeadYaw"] = data.headRotationAngle["Yaw"]["Degree"] if data.headRotationAngle["Pitch"]["Degree"] is not None else 0
-                angles["LHand"] = 1.0 if lhand_state == 1 else 0.0
-                angles["RHand"] = 1.0 if rhand_state == 1 else 0.0
-
-                angles = smoother.smooth(angles)
-
-
-
-
-                try:
-                    payload = json.dumps(angles)
-                    #print("Enviando al NAO:", payload)
-                    sock.sendall(payload.encode("utf-8"))
-                    #print("-->>> Ángulos enviados.")
-                except Exception as e:
-                    print("Error al enviar ángulos:", e)
-            else:
-                cv2.putText(annotated, "Cuerpo no detectado", (20, 40),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+
+class TrackerState:
+    """Opciones de la sesión y objetos que guardan memoria entre frames."""
+
+    def __init__(self, head_source=HEAD_POSE_SOURCE, wire_format=WIRE_FORMAT,
+                 filter_kind=FILTER_KIND, horizon=PREDICTION_HORIZON,
+                 delta=DELTA_ENCODING, delta_keyframe_interval=DELTA_KEYFRAME_INTERVAL):
+        self.head_source = head_source
+        self.wire_format = wire_format
+        self.encoder = DeltaEncoder(delta_keyframe_interval) if delta else None
+        self.filters = FilterBank(filter_kind)
+        self.horizon = horizon
+        self.latency = None  # promedio de captura -> cálculo de ángulos
+        self.head_estimator = HeadPoseEstimator()
+        self.hand_classifier = HandStateClassifier()
+        self.predictor = AnglePredictor()
+        self.start_time = time.time()
+
+    def smooth(self, packet, angles):
+        """Filtra los ángulos y los proyecta según la latencia hasta el robot."""
+        if self.horizon == "auto":
+            elapsed = time.time() - packet.created
+            self.latency = elapsed if self.latency is None else 0.1 * elapsed + 0.9 * self.latency
+            horizon = min(self.latency + ROBOT_LATENCY, MAX_HORIZON)
         else:
-            cv2.putText(annotated, "No se detecta cuerpo", (20, 40),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+            horizon = float(self.horizon)
+        return self.filters.smooth(angles, packet.capture_time, horizon)
+
+    def reset(self):
+        """Sin cuerpo: el filtro y el predictor arrancan de cero al volver."""
+        self.filters.reset()
+        self.predictor.reset()
+
+
+class InferenceEngine:
+    """
+    Modelos de MediaPipe más el recorte de la ROI y el ajuste de resolución
+    según el presupuesto de latencia. Los resultados siempre quedan en
+    coordenadas del frame completo.
+    """
+
+    def __init__(self, head_source=HEAD_POSE_SOURCE, model_complexity=MODEL_COMPLEXITY,
+                 roi_tracking=ROI_TRACKING, inference_width=INFERENCE_WIDTH,
+                 latency_budget_ms=LATENCY_BUDGET_MS, keyframe_max_interval=KEYFRAME_MAX_INTERVAL):
+        self.model_complexity = model_complexity
+        self.scheduler = KeyframeScheduler(keyframe_max_interval)
+        # Sin seguimiento de ROI se infiere el frame completo, solo reducido
+        self.roi = RoiTracker(margin=ROI_MARGIN, inference_width=inference_width)
+        self.roi_tracking = roi_tracking
+        self.budget = None
+        if latency_budget_ms:
+            self.budget = LatencyBudget(latency_budget_ms, inference_width, model_complexity)
+        self.holistic = self._build_holistic(model_complexity)
+        # En modo "holistic" el grafo de FaceMesh nunca se construye
+        self.face_mesh = None
+        if head_source == "facemesh":
+            self.face_mesh = mp_face_mesh.FaceMesh(static_image_mode=False, max_num_faces=1, refine_landmarks=True)
+
+    def _build_holistic(self, model_complexity):
+        return mp_holistic.Holistic(static_image_mode=False, model_complexity=model_complexity)
+
+    def _apply_budget(self, elapsed):
+        if not self.budget.record(elapsed):
+            return
+        self.roi.inference_width = self.budget.width
+        if self.budget.complexity != self.model_complexity:
+            try:
+                holistic = self._build_holistic(self.budget.complexity)
+            except Exception as e:
+                # p. ej. el modelo "lite" no está descargado y no hay red
+                print("No se pudo cargar model_complexity {}: {}".format(self.budget.complexity, e))
+                self.budget.pin_complexity(self.model_complexity)
+                return
+            self.holistic.close()
+            self.holistic = holistic
+            self.model_complexity = self.budget.complexity
+        print("Presupuesto de latencia: ancho {}, model_complexity {}".format(
+            self.budget.width, self.model_complexity))
+
+    def process(self, packet):
+        if not self.scheduler.should_infer():
+            packet.predicted = True
+            return packet
+
+        start = time.time()
+        frame = packet.frame
+        with metrics.timer("recorte"):
+            image, roi = self.roi.crop(frame)
+            image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        with metrics.timer("holistic"):
+            packet.holistic_results = self.holistic.process(image_rgb)
+        if self.face_mesh is not None:
+            with metrics.timer("facemesh"):
+                packet.face_mesh_results = self.face_mesh.process(image_rgb)
+
+        map_results(packet.holistic_results, packet.face_mesh_results, roi, frame.shape)
+        if self.roi_tracking:
+            self.roi.update(packet.holistic_results.pose_landmarks, frame.shape)
+        self.scheduler.observe(packet.holistic_results.pose_landmarks, packet.capture_time)
+        if self.budget is not None:
+            self._apply_budget(time.time() - start)
+        return packet
+
+    def close(self):
+        self.holistic.close()
+        if self.face_mesh is not None:
+            self.face_mesh.close()
+
+
+def run_inference(packet, engine):
+    with metrics.timer("inferencia"):
+        return engine.process(packet)
+
+
+def compute_angles(packet, state):
+    with metrics.timer("angulos"):
+        return _compute_angles(packet, state)
+
+
+def _compute_angles(packet, state):
+    """
+    Calcula los ángulos del NAO a partir de la inferencia. No dibuja nada:
+    deja en el paquete lo que necesita el overlay (estado de manos, pose de
+    la cabeza y estado del seguimiento).
+    """
+    head_source = state.head_source
+    frame = packet.frame
+    if packet.predicted:
+        return predict_angles(packet, state)
+    holistic_results = packet.holistic_results
+    face_mesh_results = packet.face_mesh_results
+
+    lhand_state, rhand_state = get_hand_states(holistic_results, state.hand_classifier)
+    packet.hand_states = (lhand_state, rhand_state)
+
+    if head_source == "holistic":
+        face_detected = True  # con solo Pose se estima la cabeza igualmente
+    else:
+        face_detected = face_mesh_results is not None and face_mesh_results.multi_face_landmarks
+
+    if holistic_results.pose_landmarks and face_detected:
+        data = HolisticData(holistic_results, face_mesh_results, frame, head_source=head_source,
+                            head_estimator=state.head_estimator, landmarks=packet.fused_landmarks)
+        packet.head_pose = data.headRotationAngle
 
-        cv2.imshow("NAO Tracker", cv2.cvtColor(annotated, cv2.COLOR_RGB2BGR))
-        if cv2.waitKey(1) & 0xFF == 27:
+        if is_body_fully_detected(data) and time.time() - state.start_time > WARMUP_SECONDS:
+            angles = retarget_angles(data, lhand_state, rhand_state)
+            if not angles:
+                print("No se pudieron calcular los ángulos del cuerpo.")
+                return packet  # Salta este frame y no intenta enviar nada
+
+            state.predictor.update(angles, packet.capture_time)
+            packet.angles = state.smooth(packet, angles)
+            return packet
+        else:
+            packet.status = "Cuerpo no detectado"
+    else:
+        packet.status = "No se detecta cuerpo"
+    state.reset()
+    return packet
+
+
+def predict_angles(packet, state):
+    """Frame sin inferencia: extrapola los ángulos desde los últimos keyframes."""
+    packet.status = "Prediccion"
+    angles = state.predictor.predict(packet.capture_time)
+    if angles:
+        packet.angles = state.smooth(packet, clamp_angles_for_nao(angles))
+    return packet
+
+
+def send_angles(sock, packet, wire_format=WIRE_FORMAT, encoder=None):
+    if isinstance(sock, FanOut):
+        # Cada robot codifica y envía en su propio hilo; aquí solo se encola
+        sock.publish(packet.angles, packet.seq, packet.created,
+                     FLAG_PREDICTED if packet.predicted else 0)
+        metrics.mark("envio")
+        return
+    try:
+        # El timestamp de la trama es la hora local de captura, para que el
+        # receptor mida la latencia de punta a punta
+        with metrics.timer("serializacion"):
+            encode = encoder.encode if encoder is not None else encode_frame
+            payload = encode(packet.angles, packet.seq, packet.created,
+                             use_json=(wire_format == "json"),
+                             flags=FLAG_PREDICTED if packet.predicted else 0)
+        #print("Enviando al NAO:", packet.angles)
+        with metrics.timer("envio"):
+            sock.sendall(payload)
+        metrics.observe("captura_a_envio", time.time() - packet.created)
+        metrics.mark("envio")
+        #print("-->>> Ángulos enviados.")
+    except Exception as e:
+        print("Error al enviar ángulos:", e)
+
+
+def read_frame(source_iter, seq):
+    """Siguiente frame de la fuente como FramePacket (None al terminar)."""
+    with metrics.timer("captura"):
+        item = next(source_iter, None)
+    if item is None:
+        return None
+    metrics.mark("captura")
+    capture_time, frame = item
+    return FramePacket(seq, capture_time, frame)
+
+
+class DisplayWindow:
+    """
+    Ventana de OpenCV. Dibuja el overlay del paquete más reciente como máximo
+    a `max_fps`; el resto de los frames solo atiende los eventos de la ventana.
+    """
+
+    def __init__(self, max_fps=DISPLAY_MAX_FPS, show_metrics=METRICS_OVERLAY):
+        self.renderer = OverlayRenderer(metrics=metrics if show_metrics else None)
+        self.limiter = RateLimiter(max_fps)
+        cv2.namedWindow(WINDOW_NAME, cv2.WINDOW_NORMAL)
+        cv2.resizeWindow(WINDOW_NAME, 960, 540)
+
+    def update(self, packet):
+        """Devuelve False si el usuario pulsó ESC."""
+        if packet is not None and self.limiter.ready():
+            cv2.imshow(WINDOW_NAME, self.renderer.render(packet))
+        return not (cv2.waitKey(1) & 0xFF == 27)
+
+    def close(self):
+        cv2.destroyAllWindows()
+
+
+# ======================
+# Modos de ejecución
+# ======================
+def run_sync(source, sock, engine, state, window=None):
+    source_iter = iter(source)
+    seq = 0
+    while True:
+        packet = read_frame(source_iter, seq)
+        if packet is None:
+            break
+        seq += 1
+
+        run_inference(packet, engine)
+        compute_angles(packet, state)
+        if packet.angles:
+            send_angles(sock, packet, state.wire_format, state.encoder)
+
+        if window is not None and not window.update(packet):
             break
 
-cap.release()
-cv2.destroyAllWindows()
-sock.close()
+
+def run_threaded(source, sock, engine, state, window=None):
+    frames = LatestQueue(QUEUE_SIZE)
+    inferred = LatestQueue(QUEUE_SIZE)
+    outgoing = LatestQueue(QUEUE_SIZE)
+    display = LatestQueue(QUEUE_SIZE) if window is not None else None
+    source_iter = iter(source)
+    counter = {"seq": 0}
+
+    def capture():
+        packet = read_frame(source_iter, counter["seq"])
+        if packet is None:
+            return StopIteration
+        counter["seq"] += 1
+        return packet
+
+    def angles_stage(packet):
+        compute_angles(packet, state)
+        if display is not None:
+            display.put(packet)  # nunca bloquea: el control no espera a la ventana
+        return packet if packet.angles else None
+
+    def sender(packet):
+        send_angles(sock, packet, state.wire_format, state.encoder)
+
+    metrics.gauge("cola_frames", lambda: len(frames))
+    metrics.gauge("cola_inferidos", lambda: len(inferred))
+    metrics.gauge("cola_envio", lambda: len(outgoing))
+    metrics.gauge("descartados_captura", lambda: frames.dropped)
+    metrics.gauge("descartados_inferencia", lambda: inferred.dropped)
+    metrics.gauge("descartados_envio", lambda: outgoing.dropped)
+
+    pipeline = Pipeline()
+    pipeline.add_stage("captura", capture, outbox=frames)
+    pipeline.add_stage("inferencia", lambda p: run_inference(p, engine), frames, inferred)
+    pipeline.add_stage("angulos", angles_stage, inferred, outgoing)
+    pipeline.add_stage("envio", sender, outgoing)
+    pipeline.start()
+
+    # La ventana de OpenCV se atiende desde el hilo principal
+    try:
+        while pipeline.running:
+            if window is None:
+                time.sleep(0.1)
+            elif not window.update(display.get(timeout=0.05)):
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pipeline.stop()
+        if frames.dropped or inferred.dropped or outgoing.dropped:
+            print("Frames descartados por etapa -> captura: {}, inferencia: {}, envío: {}".format(
+                frames.dropped, inferred.dropped, outgoing.dropped))
+
+
+def horizon_arg(value):
+    """--horizon: "auto" o un número de segundos."""
+    if value == "auto":
+        return value
+    try:
+        return float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("se esperaba 'auto' o segundos, no {!r}".format(value))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seguimiento de postura para controlar al NAO")
+    parser.add_argument("--mode", choices=["threaded", "sync"], default=PIPELINE_MODE,
+                        help="threaded: etapas en hilos separados; sync: bucle secuencial")
+    parser.add_argument("--source", default=str(CAMERA_INDEX),
+                        help="índice de cámara, archivo de video, carpeta de imágenes o synthetic[:N]")
+    parser.add_argument("--source2", default=None,
+                        help="segunda cámara (índice, video o carpeta) para el modo estéreo")
+    parser.add_argument("--stereo", metavar="CALIB", default=None,
+                        help="calibración estéreo (.npz de stereo_fusion.py); requiere --source2")
+    parser.add_argument("--head-source", choices=["holistic", "facemesh"], default=HEAD_POSE_SOURCE,
+                        help="holistic: cabeza desde Holistic (un modelo); facemesh: FaceMesh aparte")
+    parser.add_argument("--wire", choices=["binary", "json"], default=WIRE_FORMAT,
+                        help="formato del payload enviado al NAO (json para depurar)")
+    parser.add_argument("--delta", action="store_true", default=DELTA_ENCODING,
+                        help="enviar solo las articulaciones que cambiaron, con tramas completas periódicas")
+    parser.add_argument("--delta-keyframe-interval", type=int, default=DELTA_KEYFRAME_INTERVAL,
+                        help="en modo delta, una trama completa cada N")
+    parser.add_argument("--robot", action="append", default=list(ROBOT_ENDPOINTS), metavar="[NOMBRE=]HOST:PUERTO",
+                        help="enviar a este robot (repetir por cada uno); cada robot tiene su propio hilo emisor")
+    parser.add_argument("--robot-drop", choices=["oldest", "newest"], default=DROP_POLICY,
+                        help="con --robot: qué descartar cuando la cola de un robot está llena")
+    parser.add_argument("--no-roi", dest="roi", action="store_false", default=ROI_TRACKING,
+                        help="inferir siempre sobre el frame completo")
+    parser.add_argument("--inference-width", type=int, default=INFERENCE_WIDTH,
+                        help="ancho máximo de la imagen que recibe MediaPipe (0 = sin reducir)")
+    parser.add_argument("--model-complexity", type=int, choices=[0, 1, 2], default=MODEL_COMPLEXITY)
+    parser.add_argument("--latency-budget-ms", type=float, default=LATENCY_BUDGET_MS,
+                        help="ajusta resolución y model_complexity para cumplir este presupuesto")
+    parser.add_argument("--keyframe-max-interval", type=int, default=KEYFRAME_MAX_INTERVAL,
+                        help="inferir como mínimo uno de cada N frames con la persona quieta (1 = siempre)")
+    parser.add_argument("--filter", choices=["kalman", "one_euro", "ema"], default=FILTER_KIND,
+                        help="filtro aplicado a los ángulos antes de enviarlos")
+    parser.add_argument("--horizon", type=horizon_arg, default=PREDICTION_HORIZON,
+                        help="segundos de proyección hacia adelante, o auto (latencia medida)")
+    parser.add_argument("--headless", action="store_true", default=HEADLESS,
+                        help="sin ventana ni dibujo (Ctrl+C para terminar)")
+    parser.add_argument("--display-fps", type=float, default=DISPLAY_MAX_FPS,
+                        help="máximo de redibujos por segundo de la ventana (0 = sin límite)")
+    parser.add_argument("--metrics-file", default=METRICS_FILE,
+                        help="escribe latencias por etapa en este archivo (.json o .prom)")
+    parser.add_argument("--metrics-overlay", action="store_true", default=METRICS_OVERLAY,
+                        help="muestra p50/p95/p99 por etapa y FPS sobre la imagen")
+    args = parser.parse_args()
+    if bool(args.stereo) != bool(args.source2):
+        parser.error("--stereo y --source2 van juntos")
+    if args.stereo:
+        # Cada proceso de cámara corre un solo Holistic: la cabeza sale de ahí
+        args.head_source = "holistic"
+
+    if args.robot:
+        # Un emisor por robot; el modo delta lo maneja cada emisor
+        sock = FanOut(args.robot, args.delta, args.delta_keyframe_interval, args.wire == "json",
+                      drop_policy=args.robot_drop, registry=metrics).start()
+    else:
+        # Conexión al socket del NAO
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.connect((NAO_SOCKET_IP, NAO_SOCKET_PORT))
+
+    state = TrackerState(args.head_source, args.wire, args.filter, args.horizon,
+                         args.delta and not args.robot, args.delta_keyframe_interval)
+    if args.stereo:
+        from stereo_fusion import StereoCapture, StereoEngine
+        source = StereoCapture(args.source, args.source2, args.stereo, args.model_complexity,
+                               send_frames=not args.headless, metrics=metrics)
+        engine = StereoEngine()
+    else:
+        source = open_source(args.source)
+        engine = InferenceEngine(args.head_source, args.model_complexity, args.roi,
+                                 args.inference_width, args.latency_budget_ms, args.keyframe_max_interval)
+    window = None if args.headless else DisplayWindow(args.display_fps, args.metrics_overlay)
+    writer = None
+    if args.metrics_file:
+        writer = SnapshotWriter(metrics, args.metrics_file, METRICS_INTERVAL)
+        writer.start()
+    try:
+        if args.mode == "threaded":
+            run_threaded(source, sock, engine, state, window)
+        else:
+            run_sync(source, sock, engine, state, window)
+    finally:
+        engine.close()
+        if writer is not None:
+            writer.stop()
+        for line in metrics.summary_lines():
+            print(line)
+        if state.encoder is not None:
+            print("Modo delta: {} tramas completas, {} deltas, {} bytes".format(
+                state.encoder.keyframes, state.encoder.deltas, state.encoder.bytes))
+
+    source.close()
+    if window is not None:
+        window.close()
+    if isinstance(sock, FanOut):
+        sock.stop()
+        for line in sock.stats_lines():
+            print(line)
+    else:
+        sock.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Procesamiento por lotes (sin ventana ni socket) de sesiones grabadas.
+
+Corre el mismo pipeline de ángulos que Vision_comp.py sobre videos o carpetas
+de imágenes, repartiendo las grabaciones entre varios procesos (cada uno con
+su propia instancia de MediaPipe), y guarda un CSV por grabación con el
+mismo formato que los registros del robot (timestamp + articulaciones).
+
+    python batch_retarget.py sesiones/*.mp4 --out resultados --workers 4
+"""
+import argparse
+import csv
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+import mediapipe as mp
+
+from frame_sources import open_source
+from holistic_data import HolisticData
+from head_angles import HeadPoseEstimator
+from hand_status import HandStateClassifier
+from filters import FilterBank
+from retargeting import NAO_JOINTS, is_body_fully_detected, get_hand_states, retarget_angles
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv")
+
+# Modelos de MediaPipe del proceso trabajador (uno por proceso)
+_worker = {}
+
+
+def _init_worker(model_complexity, head_source):
+    _worker["head_source"] = head_source
+    _worker["holistic"] = mp.solutions.holistic.Holistic(static_image_mode=False, model_complexity=model_complexity)
+    _worker["face_mesh"] = None
+    if head_source == "facemesh":
+        _worker["face_mesh"] = mp.solutions.face_mesh.FaceMesh(
+            static_image_mode=False, max_num_faces=1, refine_landmarks=True)
+
+
+def process_recording(spec, out_path, filter_kind="kalman"):
+    """Procesa una grabación completa; devuelve un resumen para el reporte."""
+    holistic = _worker["holistic"]
+    face_mesh = _worker["face_mesh"]
+    head_source = _worker["head_source"]
+    # El seguimiento entre frames no debe arrastrarse de una grabación a otra
+    holistic.reset()
+    if face_mesh is not None:
+        face_mesh.reset()
+
+    # Sin robot no hay latencia que compensar: horizonte 0
+    filters = FilterBank(filter_kind)
+    head_estimator = HeadPoseEstimator()
+    hand_classifier = HandStateClassifier()
+    start = time.time()
+    frames = rows = 0
+    with open_source(spec) as source:
+        with open(out_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["timestamp"] + NAO_JOINTS)
+            for ts, frame in source:
+                frames += 1
+                image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                holistic_results = holistic.process(image_rgb)
+                face_mesh_results = face_mesh.process(image_rgb) if face_mesh is not None else None
+                if not holistic_results.pose_landmarks:
+                    filters.reset()
+                    continue
+                if head_source == "facemesh" and not face_mesh_results.multi_face_landmarks:
+                    continue
+
+                data = HolisticData(holistic_results, face_mesh_results, frame, head_source=head_source,
+                                    head_estimator=head_estimator)
+                if not is_body_fully_detected(data):
+                    continue
+                lhand_state, rhand_state = get_hand_states(holistic_results, hand_classifier)
+                angles = retarget_angles(data, lhand_state, rhand_state)
+                if not angles:
+                    continue
+                angles = filters.smooth(angles, ts)
+                writer.writerow(["{:.3f}".format(ts)] + [angles.get(j) for j in NAO_JOINTS])
+                rows += 1
+
+    return {"source": spec, "output": out_path, "frames": frames, "rows": rows,
+            "seconds": time.time() - start}
+
+
+def expand_inputs(inputs):
+    """Acepta archivos, patrones glob y carpetas (de videos o de imágenes)."""
+    specs = []
+    for item in inputs:
+        matches = glob.glob(item) or [item]
+        for path in sorted(matches):
+            if os.path.isdir(path):
+                videos = sorted(os.path.join(path, f) for f in os.listdir(path)
+                                if f.lower().endswith(VIDEO_EXTENSIONS))
+                # Una carpeta sin videos se trata como secuencia de imágenes
+                specs.extend(videos or [path])
+            else:
+                specs.append(path)
+    return specs
+
+
+def output_paths(specs, out_dir):
+    """
+    CSV de salida por grabación: <nombre>_angles.csv. Si dos entradas tienen
+    el mismo nombre (p1/sesion.mp4, p2/sesion.mp4) se antepone la carpeta, y
+    si aun así chocan, un índice.
+    """
+    def base(spec):
+        return os.path.splitext(os.path.basename(os.path.normpath(spec)))[0]
+
+    def parent(spec):
+        return os.path.basename(os.path.dirname(os.path.abspath(os.path.normpath(spec))))
+
+    names = [base(s) for s in specs]
+    counts = {}
+    for name in names:
+        counts[name] = counts.get(name, 0) + 1
+    names = [n if counts[n] == 1 else "{}_{}".format(parent(s), n) for s, n in zip(specs, names)]
+    used = set()
+    paths = []
+    for name in names:
+        unique, index = name, 1
+        while unique in used:
+            index += 1
+            unique = "{}_{}".format(name, index)
+        used.add(unique)
+        paths.append(os.path.join(out_dir, "{}_angles.csv".format(unique)))
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calcula ángulos del NAO sobre grabaciones, en paralelo")
+    parser.add_argument("inputs", nargs="+", help="videos, carpetas o patrones glob")
+    parser.add_argument("--out", default="angulos_lote", help="carpeta de salida")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--model-complexity", type=int, choices=[0, 1, 2], default=1)
+    parser.add_argument("--head-source", choices=["holistic", "facemesh"], default="holistic")
+    parser.add_argument("--filter", choices=["kalman", "one_euro", "ema"], default="kalman",
+                        help="filtro aplicado a los ángulos")
+    args = parser.parse_args()
+
+    specs = expand_inputs(args.inputs)
+    if not specs:
+        parser.error("no se encontraron grabaciones")
+    os.makedirs(args.out, exist_ok=True)
+
+    start = time.time()
+    total_frames = 0
+    workers = max(1, min(args.workers, len(specs)))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(args.model_complexity, args.head_source)) as pool:
+        futures = {pool.submit(process_recording, spec, out_path, args.filter): spec
+                   for spec, out_path in zip(specs, output_paths(specs, args.out))}
+        for future in as_completed(futures):
+            try:
+                summary = future.result()
+            except Exception as e:
+                print("[!] Error procesando {}: {}".format(futures[future], e))
+                continue
+            total_frames += summary["frames"]
+            print("[+] {source}: {frames} frames, {rows} filas en {seconds:.1f}s -> {output}".format(**summary))
+
+    elapsed = time.time() - start
+    print("Total: {} grabaciones, {} frames en {:.1f}s ({:.1f} FPS)".format(
+        len(specs), total_frames, elapsed, total_frames / elapsed if elapsed else 0))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+fixtures.py
+
+Landmarks de prueba para los benchmarks, sin cámara ni robot:
+  synthetic  movimiento de brazos, cabeza y manos generado con ruido
+  record     landmarks reales de un video o carpeta de imágenes (Holistic)
+
+Se guardan en un .npz con arreglos por frame:
+  pose (N, 33, 4)   face (N, 478, 3)   left_hand / right_hand (N, 21, 3)
+  has_face / has_left / has_right (N,)   image_shape (3,)
+
+Uso:
+  python benchmarks/fixtures.py synthetic --frames 300 --out sintetico.npz
+  python benchmarks/fixtures.py record sesion.mp4 --out sesion.npz
+"""
+import os
+import sys
+import argparse
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+NUM_FACE_LANDMARKS = 478
+NUM_HAND_LANDMARKS = 21
+IMAGE_SHAPE = (480, 640, 3)
+
+# Pose de pie aproximada (x, y, z) en coordenadas normalizadas
+BASE_POSE = {
+    0: (.5, .2, -.3), 2: (.52, .18, -.3), 5: (.48, .18, -.3), 3: (.54, .18, -.28), 6: (.46, .18, -.28),
+    7: (.56, .19, -.2), 8: (.44, .19, -.2), 9: (.52, .24, -.29), 10: (.48, .24, -.29),
+    11: (.6, .35, -.1), 12: (.4, .35, -.1), 13: (.65, .5, -.1), 14: (.35, .5, -.1),
+    15: (.67, .63, -.15), 16: (.33, .63, -.15), 23: (.56, .65, 0), 24: (.44, .65, 0),
+    25: (.56, .8, 0), 26: (.44, .8, 0), 27: (.56, .95, 0), 28: (.44, .95, 0),
+}
+# Puntos de la cara que usa la pose de la cabeza, relativos a la nariz
+FACE_KEYPOINTS = {
+    33: (-.03, -.02, .02), 263: (.03, -.02, .02), 1: (0, 0, -.03),
+    61: (-.02, .04, .01), 291: (.02, .04, .01), 199: (0, .08, .01),
+}
+
+
+def _hand(center, openness, rng, noise):
+    """Mano de 21 puntos: openness 1 = dedos extendidos, 0 = puño."""
+    cx, cy = center
+    pts = np.zeros((NUM_HAND_LANDMARKS, 3))
+    pts[0] = (cx, cy, 0)
+    for f, base in enumerate((5, 9, 13, 17)):
+        dx = (f - 1.5) * .01
+        pts[base] = (cx + dx, cy - .04, 0)
+        pts[base + 1] = (cx + dx, cy - .06, 0)
+        pts[base + 2] = (cx + dx, cy - (.03 + .04 * openness), 0)
+        pts[base + 3] = (cx + dx, cy - (.02 + .06 * openness), 0)
+    for i in range(1, 5):
+        pts[i] = (cx - .02 * i, cy - .01 * i, 0)
+    pts[:, :2] += rng.normal(0, noise, (NUM_HAND_LANDMARKS, 2))
+    return pts
+
+
+def synthetic_fixture(frames=300, fps=30.0, seed=0, noise=0.003):
+    """Brazos que suben y bajan, cabeza que gira y manos que se abren y cierran."""
+    rng = np.random.default_rng(seed)
+    pose = np.zeros((frames, 33, 4), dtype=np.float32)
+    face = np.zeros((frames, NUM_FACE_LANDMARKS, 3), dtype=np.float32)
+    left = np.zeros((frames, NUM_HAND_LANDMARKS, 3), dtype=np.float32)
+    right = np.zeros((frames, NUM_HAND_LANDMARKS, 3), dtype=np.float32)
+    face_cloud = rng.normal(0, .04, (NUM_FACE_LANDMARKS, 3))
+
+    base = np.zeros((33, 3))
+    for idx, point in BASE_POSE.items():
+        base[idx] = point
+    for idx in range(33):
+        if idx not in BASE_POSE:
+            base[idx] = BASE_POSE[0]
+
+    for i in range(frames):
+        t = i / fps
+        p = base.copy()
+        lift = np.sin(2 * np.pi * 0.4 * t)
+        # Codo y muñeca giran alrededor del hombro
+        for shoulder, elbow, wrist, sign in ((11, 13, 15, 1), (12, 14, 16, -1)):
+            angle = 0.9 * lift
+            for joint, length in ((elbow, .16), (wrist, .29)):
+                p[joint, 0] = p[shoulder, 0] + sign * length * np.sin(angle + 0.3)
+                p[joint, 1] = p[shoulder, 1] + length * np.cos(angle + 0.3)
+        p[:, :2] += rng.normal(0, noise, (33, 2))
+        pose[i, :, :3] = p
+        pose[i, :, 3] = 0.99
+
+        nose = p[0] + (.01 * np.sin(2 * np.pi * 0.2 * t), 0, 0)
+        f = nose + face_cloud
+        yaw = 0.3 * np.sin(2 * np.pi * 0.2 * t)
+        for idx, (dx, dy, dz) in FACE_KEYPOINTS.items():
+            f[idx] = nose + (dx * np.cos(yaw) + dz * np.sin(yaw), dy, dz)
+        face[i] = f
+
+        openness = 0.5 + 0.5 * np.sign(np.sin(2 * np.pi * 0.25 * t))
+        left[i] = _hand(p[15, :2], openness, rng, noise)
+        right[i] = _hand(p[16, :2], 1 - openness, rng, noise)
+
+    # Algunos frames sin mano o sin cara, como en una sesión real
+    return {
+        "pose": pose, "face": face, "left_hand": left, "right_hand": right,
+        "has_face": rng.random(frames) > 0.02,
+        "has_left": rng.random(frames) > 0.1,
+        "has_right": rng.random(frames) > 0.1,
+        "image_shape": np.array(IMAGE_SHAPE),
+    }
+
+
+def _landmarks_to_array(landmark_list, count, columns=3):
+    out = np.zeros((count, columns), dtype=np.float32)
+    if landmark_list:
+        for i, lm in enumerate(landmark_list.landmark):
+            out[i, :3] = (lm.x, lm.y, lm.z)
+            if columns == 4:
+                out[i, 3] = lm.visibility
+    return out
+
+
+def record_fixture(spec, max_frames=None, model_complexity=1):
+    """Corre Holistic sobre una grabación y guarda solo las landmarks."""
+    import cv2
+    import mediapipe as mp
+    from frame_sources import open_source
+
+    keys = ("pose", "face", "left_hand", "right_hand", "has_face", "has_left", "has_right")
+    data = dict((key, []) for key in keys)
+    shape = IMAGE_SHAPE
+    with mp.solutions.holistic.Holistic(static_image_mode=False, model_complexity=model_complexity) as holistic:
+        with open_source(spec) as source:
+            for _, frame in source:
+                results = holistic.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+                if not results.pose_landmarks:
+                    continue
+                shape = frame.shape
+                data["pose"].append(_landmarks_to_array(results.pose_landmarks, 33, 4))
+                data["face"].append(_landmarks_to_array(results.face_landmarks, NUM_FACE_LANDMARKS))
+                data["left_hand"].append(_landmarks_to_array(results.left_hand_landmarks, NUM_HAND_LANDMARKS))
+                data["right_hand"].append(_landmarks_to_array(results.right_hand_landmarks, NUM_HAND_LANDMARKS))
+                data["has_face"].append(bool(results.face_landmarks))
+                data["has_left"].append(bool(results.left_hand_landmarks))
+                data["has_right"].append(bool(results.right_hand_landmarks))
+                if max_frames and len(data["pose"]) >= max_frames:
+                    break
+    if not data["pose"]:
+        raise ValueError("No se detectó ninguna pose en {}".format(spec))
+    fixture = dict((key, np.array(value)) for key, value in data.items())
+    fixture["image_shape"] = np.array(shape)
+    return fixture
+
+
+def save_fixture(path, fixture):
+    np.savez_compressed(path, **fixture)
+
+
+def load_fixture(path):
+    with np.load(path) as data:
+        return dict((key, data[key]) for key in data.files)
+
+
+def to_holistic_results(fixture):
+    """Arma objetos con la forma de la salida de Holistic (listas de landmarks protobuf)."""
+    from types import SimpleNamespace
+    from mediapipe.framework.formats import landmark_pb2
+
+    def landmark_list(points):
+        out = landmark_pb2.NormalizedLandmarkList()
+        for p in points:
+            lm = out.landmark.add(x=float(p[0]), y=float(p[1]), z=float(p[2]))
+            if len(p) > 3:
+                lm.visibility = float(p[3])
+        return out
+
+    results = []
+    for i in range(len(fixture["pose"])):
+        results.append(SimpleNamespace(
+            pose_landmarks=landmark_list(fixture["pose"][i]),
+            face_landmarks=landmark_list(fixture["face"][i]) if fixture["has_face"][i] else None,
+            left_hand_landmarks=landmark_list(fixture["left_hand"][i]) if fixture["has_left"][i] else None,
+            right_hand_landmarks=landmark_list(fixture["right_hand"][i]) if fixture["has_right"][i] else None,
+            segmentation_mask=None))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera fixtures de landmarks para los benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+    synth = sub.add_parser("synthetic", help="landmarks generados")
+    synth.add_argument("--frames", type=int, default=300)
+    synth.add_argument("--seed", type=int, default=0)
+    synth.add_argument("--out", required=True)
+    rec = sub.add_parser("record", help="landmarks de una grabación (video o carpeta)")
+    rec.add_argument("source")
+    rec.add_argument("--max-frames", type=int, default=None)
+    rec.add_argument("--model-complexity", type=int, choices=[0, 1, 2], default=1)
+    rec.add_argument("--out", required=True)
+    args = parser.parse_args()
+
+    if args.command == "synthetic":
+        fixture = synthetic_fixture(args.frames, seed=args.seed)
+    else:
+        fixture = record_fixture(args.source, args.max_frames, args.model_complexity)
+    save_fixture(args.out, fixture)
+    print("Fixture con {} frames -> {}".format(len(fixture["pose"]), args.out))
+
+
+if __name__ == "__main__":
+    main()
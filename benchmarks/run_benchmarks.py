@@ -0,0 +1,271 @@
+"""
+run_benchmarks.py
+
+Benchmarks del camino caliente visión -> robot, sin cámara ni robot. Cada
+caso corre sobre los frames de un fixture de landmarks (sintético por
+defecto) y reporta operaciones por segundo y latencia p50/p95/p99.
+
+Cada caso se mide --repeats veces, intercalando los casos entre repeticiones
+para que una racha de ruido de la máquina no caiga entera sobre uno; se
+reporta la mediana y la dispersión de las repeticiones.
+
+Con --baseline compara contra un resultado guardado y termina con código 1
+si algún caso empeora más que el umbral, para usarlo como control antes de
+aceptar cambios de rendimiento. El umbral de cada caso sale de la
+dispersión medida (NOISE_FACTOR veces la de la corrida y la línea base
+combinadas), con --tolerance como mínimo:
+
+  python benchmarks/run_benchmarks.py --save-baseline benchmarks/baseline.json
+  python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json
+"""
+import os
+import sys
+import json
+import gc
+import time
+import argparse
+import platform
+from types import SimpleNamespace
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, "NAOcontrol")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from fixtures import synthetic_fixture, load_fixture, to_holistic_results  # noqa: E402
+from holistic_data import HolisticData  # noqa: E402
+from body_angles import getBodyAngles  # noqa: E402
+from elbows_angles import Elbows  # noqa: E402
+from retargeting import clamp_angles_for_nao, retarget_angles, get_hand_states  # noqa: E402
+from filters import FilterBank  # noqa: E402
+from head_angles import HeadPoseEstimator, get_head_positions  # noqa: E402
+import hand_status  # noqa: E402
+from wire_protocol import encode_frame, DeltaEncoder, FrameDecoder  # noqa: E402
+import main as receiver  # noqa: E402  (NAOcontrol/main.py, sin importar naoqi)
+
+DEFAULT_MIN_TIME = 0.2    # segundos mínimos por repetición de cada caso
+DEFAULT_REPEATS = 5
+DEFAULT_TOLERANCE = 0.10  # caída mínima de ops/s que se considera regresión
+DEFAULT_P95_TOLERANCE = 0.5
+NOISE_FACTOR = 3.0        # desvíos (robustos) de diferencia que se toleran
+
+
+class FakeMotion:
+    """ALMotion que solo cuenta llamadas, para medir el bucle del receptor."""
+
+    def __init__(self):
+        self.post = self
+        self.calls = 0
+
+    def setAngles(self, names, angles, speed):
+        self.calls += 1
+
+    def openHand(self, name):
+        self.calls += 1
+
+    def closeHand(self, name):
+        self.calls += 1
+
+
+def measure(func, items, min_time=DEFAULT_MIN_TIME, warmup=20):
+    """Llama func(item) en ciclo hasta cubrir min_time; tiempos en microsegundos."""
+    for item in items[:warmup]:
+        func(item)
+    gc.collect()
+    clock = time.perf_counter
+    samples = []
+    deadline = clock() + min_time
+    n_items = len(items)
+    i = 0
+    while True:
+        item = items[i % n_items]
+        start = clock()
+        func(item)
+        samples.append(clock() - start)
+        i += 1
+        if i >= n_items and clock() >= deadline:
+            break
+    samples = np.array(samples) * 1e6
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {"n": int(len(samples)), "ops_per_sec": float(len(samples) / (samples.sum() / 1e6)),
+            "p50_us": float(p50), "p95_us": float(p95), "p99_us": float(p99)}
+
+
+def _rel_spread(values):
+    """Desvío robusto (MAD escalado) relativo a la mediana."""
+    values = np.asarray(values, dtype=float)
+    median = np.median(values)
+    if len(values) < 2 or median == 0:
+        return 0.0
+    return float(1.4826 * np.median(np.abs(values - median)) / median)
+
+
+def summarize(runs):
+    """Mediana de las repeticiones de un caso, con su dispersión relativa."""
+    ops = [r["ops_per_sec"] for r in runs]
+    p95 = [r["p95_us"] for r in runs]
+    return {
+        "n": int(sum(r["n"] for r in runs)), "repeats": len(runs),
+        "ops_per_sec": float(np.median(ops)), "ops_spread": _rel_spread(ops),
+        "p50_us": float(np.median([r["p50_us"] for r in runs])),
+        "p95_us": float(np.median(p95)), "p95_spread": _rel_spread(p95),
+        "p99_us": float(np.median([r["p99_us"] for r in runs])),
+        "runs_ops_per_sec": ops,
+    }
+
+
+def build_cases(fixture):
+    """Lista de (nombre, función, items) preparados fuera de la medición."""
+    results = to_holistic_results(fixture)
+    shape = tuple(int(v) for v in fixture["image_shape"])
+    image = np.zeros(shape, dtype=np.uint8)
+    estimator = HeadPoseEstimator()
+    datas = [HolisticData(r, None, image, head_source="holistic", head_estimator=estimator) for r in results]
+    views = [d.bodyJointsArray for d in datas]
+    legacy = [dict(v.items()) for v in views]
+    classifier = hand_status.HandStateClassifier()
+    angles = []
+    for d, r in zip(datas, results):
+        lhand, rhand = get_hand_states(r, classifier)
+        angles.append(retarget_angles(d, lhand, rhand))
+    angles = [a for a in angles if a]
+    faces = [r.face_landmarks for r in results if r.face_landmarks]
+    elbows = Elbows()
+
+    cases = [
+        ("holistic_data", lambda r: HolisticData(r), results),
+        ("getBodyAngles", getBodyAngles, views),
+        ("getBodyAngles_legacy", getBodyAngles, legacy),
+        ("elbows", elbows.get_elbow_angles_for_nao, views),
+        ("elbows_legacy", elbows.get_elbow_angles_for_nao, legacy),
+        ("clamp_angles_for_nao", clamp_angles_for_nao, angles),
+    ]
+
+    for kind in ("kalman", "one_euro", "ema"):
+        bank = FilterBank(kind, horizon=0.1)
+        clock = {"t": 0.0}
+
+        def smooth(a, bank=bank, clock=clock):
+            clock["t"] += 1 / 30.0
+            return bank.smooth(a, clock["t"])
+        cases.append(("filter_" + kind, smooth, angles))
+
+    face_results = [SimpleNamespace(multi_face_landmarks=[f]) for f in faces]
+    cases += [
+        ("head_pose_legacy", lambda f: get_head_positions(image, f, "Degree", show_text=False), face_results),
+        ("head_pose_estimator", lambda f: estimator.from_face(shape, f), faces),
+    ]
+
+    wrappers = []
+    for r in results:
+        multi_hand_landmarks, multi_handedness = hand_status.create_multi_hand_structures(r)
+        w = hand_status.ResultsWrapper()
+        w.multi_hand_landmarks = multi_hand_landmarks
+        w.multi_handedness = multi_handedness
+        wrappers.append(w)
+    cases += [
+        ("hand_status_legacy", lambda w: hand_status.get_hand_status(image, w, show_text=False), wrappers),
+        ("hand_classifier", lambda r: get_hand_states(r, classifier), results),
+    ]
+
+    payloads = [encode_frame(a, i, 0.0) for i, a in enumerate(angles)]
+    # Un decodificador por caso: el estado de uno no afecta al otro
+    decoder = FrameDecoder()
+    receive_decoder = FrameDecoder()
+    motion = FakeMotion()
+    hand_state = {"LHand": None, "RHand": None}
+
+    def receive(payload):
+        for frame in receive_decoder.feed(payload):
+            receiver.apply_angles(motion, frame.angles, hand_state)
+
+    delta_encoder = DeltaEncoder()
+    cases += [
+        ("encode_binary", lambda a: encode_frame(a, 0, 0.0), angles),
+        ("encode_json", lambda a: encode_frame(a, 0, 0.0, use_json=True), angles),
+        ("encode_delta", lambda a: delta_encoder.encode(a, 0, 0.0), angles),
+        ("decode_binary", decoder.feed, payloads),
+        ("receiver_loop", receive, payloads),
+    ]
+    return cases
+
+
+def threshold(current, ref, key, minimum, noise_factor=NOISE_FACTOR):
+    """Cambio relativo tolerado: el mayor entre minimum y el ruido medido."""
+    noise = np.hypot(current.get(key, 0.0), ref.get(key, 0.0))
+    return max(minimum, noise_factor * noise)
+
+
+def compare(results, baseline, tolerance, p95_tolerance, noise_factor=NOISE_FACTOR):
+    """Devuelve la lista de regresiones frente a la línea base (medianas)."""
+    regressions = []
+    for name, current in results.items():
+        ref = baseline.get(name)
+        if ref is None:
+            continue
+        limit = threshold(current, ref, "ops_spread", tolerance, noise_factor)
+        p95_limit = threshold(current, ref, "p95_spread", p95_tolerance, noise_factor)
+        if current["ops_per_sec"] < ref["ops_per_sec"] * (1 - limit):
+            regressions.append("{}: {:.0f} ops/s (línea base {:.0f}, umbral -{:.0%})".format(
+                name, current["ops_per_sec"], ref["ops_per_sec"], limit))
+        elif current["p95_us"] > ref["p95_us"] * (1 + p95_limit):
+            regressions.append("{}: p95 {:.1f} µs (línea base {:.1f}, umbral +{:.0%})".format(
+                name, current["p95_us"], ref["p95_us"], p95_limit))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks del camino visión -> robot")
+    parser.add_argument("--fixture", help="fixture .npz (por defecto, sintético)")
+    parser.add_argument("--frames", type=int, default=300, help="frames del fixture sintético")
+    parser.add_argument("--only", default="", help="solo los casos cuyo nombre contenga este texto")
+    parser.add_argument("--min-time", type=float, default=DEFAULT_MIN_TIME,
+                        help="segundos mínimos por repetición")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS,
+                        help="repeticiones por caso; se compara la mediana")
+    parser.add_argument("--out", help="guarda los resultados en JSON")
+    parser.add_argument("--baseline", help="compara contra este JSON de resultados")
+    parser.add_argument("--save-baseline", help="guarda estos resultados como línea base")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="caída relativa mínima de ops/s que se considera regresión")
+    parser.add_argument("--p95-tolerance", type=float, default=DEFAULT_P95_TOLERANCE,
+                        help="aumento relativo mínimo del p95 que se considera regresión")
+    args = parser.parse_args()
+
+    fixture = load_fixture(args.fixture) if args.fixture else synthetic_fixture(args.frames)
+    cases = [c for c in build_cases(fixture) if args.only in c[0]]
+
+    runs = dict((name, []) for name, _, _ in cases)
+    for _ in range(max(args.repeats, 1)):
+        for name, func, items in cases:
+            runs[name].append(measure(func, items, args.min_time))
+
+    results = {}
+    print("{:<22} {:>12} {:>7} {:>10} {:>10} {:>10}".format("caso", "ops/s", "±", "p50 µs", "p95 µs", "p99 µs"))
+    for name, _, _ in cases:
+        r = results[name] = summarize(runs[name])
+        print("{:<22} {:>12.0f} {:>6.1%} {:>10.1f} {:>10.1f} {:>10.1f}".format(
+            name, r["ops_per_sec"], r["ops_spread"], r["p50_us"], r["p95_us"], r["p99_us"]))
+
+    report = {"python": platform.python_version(), "machine": platform.machine(),
+              "fixture": args.fixture or "synthetic:{}".format(args.frames), "results": results}
+    for path in (args.out, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance, args.p95_tolerance)
+        if regressions:
+            print("\nREGRESIONES:")
+            for line in regressions:
+                print("  " + line)
+            sys.exit(1)
+        print("\nSin regresiones respecto de {}".format(args.baseline))
+
+
+if __name__ == "__main__":
+    main()
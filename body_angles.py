@@ -1,5 +1,6 @@
 import numpy as np
 import math
+from math import acos, atan2, degrees, sqrt
 from holistic_data import JointType
 
 # --- Utilidades ---
@@ -54,6 +55,74 @@ def correct_pitch(pitch_angle, point_elbow, point_shoulder):
 def clamp_deg(val, lo, hi):
     return max(lo, min(hi, val))
 
+# --- Versiones vectorizadas sobre arreglos (..., 33, 4) ---
+
+def _angle_between(a, b, c):
+    """Ángulo en b (grados) entre los segmentos b->a y b->c; puntos (..., 2)."""
+    ba = a - b
+    bc = c - b
+    cosine_angle = np.sum(ba * bc, axis=-1) / (np.linalg.norm(ba, axis=-1) * np.linalg.norm(bc, axis=-1) + 1e-6)
+    return np.degrees(np.arccos(np.clip(cosine_angle, -1.0, 1.0)))
+
+def shoulder_angles_from_array(landmarks):
+    """
+    Mismo cálculo que get_shoulder_angles, en una sola pasada sobre un frame
+    (33, 4) o una grabación completa (T, 33, 4). Devuelve escalares o
+    arreglos (T,) por articulación.
+    """
+    lm = np.asarray(landmarks, dtype=np.float64)
+    # Índice 0 = lado derecho, 1 = lado izquierdo
+    E = lm[..., [JointType.RightElbow, JointType.LeftElbow], :]
+    S = lm[..., [JointType.RightShoulder, JointType.LeftShoulder], :]
+    H = lm[..., [JointType.RightHip, JointType.LeftHip], :]
+
+    pitch = _angle_between(E[..., 1:3], S[..., 1:3], H[..., 1:3])  # plano YZ
+    roll = np.degrees(np.arctan2(E[..., 0] - S[..., 0], E[..., 2] - S[..., 2]))
+
+    # Mismas correcciones que correct_pitch / correct_roll
+    dx = np.abs(E[..., 0] - S[..., 0])
+    pitch = np.where((dx > 0.15) & (pitch > 40), 20, pitch)
+    roll = np.where((dx < 0.08) & (pitch > 70), 10, roll)
+
+    return {
+        "RShoulderPitch": (-pitch[..., 0] + 90)[()],
+        "LShoulderPitch": (-pitch[..., 1] + 90)[()],
+        "RShoulderRoll": roll[..., 0][()],
+        "LShoulderRoll": roll[..., 1][()],
+    }
+
+_SHOULDER_ROWS = [JointType.RightElbow, JointType.RightShoulder, JointType.RightHip,
+                  JointType.LeftElbow, JointType.LeftShoulder, JointType.LeftHip]
+
+def _shoulder_side(E, S, H):
+    """Pitch y roll de un lado con floats de Python (filas x, y, z, vis)."""
+    bay, baz = E[1] - S[1], E[2] - S[2]
+    bcy, bcz = H[1] - S[1], H[2] - S[2]
+    cosine = (bay * bcy + baz * bcz) / (sqrt(bay * bay + baz * baz) * sqrt(bcy * bcy + bcz * bcz) + 1e-6)
+    pitch = degrees(acos(max(-1.0, min(1.0, cosine))))
+    roll = degrees(atan2(E[0] - S[0], E[2] - S[2]))
+    dx = abs(E[0] - S[0])
+    if dx > 0.15 and pitch > 40:
+        pitch = 20
+    if dx < 0.08 and pitch > 70:
+        roll = 10
+    return pitch, roll
+
+def shoulder_angles_single(landmarks):
+    """
+    Camino de un solo frame (33, 4) para el bucle en vivo: con seis puntos,
+    la aritmética escalar es más rápida que armar arreglos de NumPy.
+    """
+    rE, rS, rH, lE, lS, lH = landmarks[_SHOULDER_ROWS].tolist()
+    pitch_r, roll_r = _shoulder_side(rE, rS, rH)
+    pitch_l, roll_l = _shoulder_side(lE, lS, lH)
+    return {
+        "RShoulderPitch": -pitch_r + 90,
+        "LShoulderPitch": -pitch_l + 90,
+        "RShoulderRoll": roll_r,
+        "LShoulderRoll": roll_l,
+    }
+
 # --- Cálculo de ángulos principales ---
 
 def get_shoulder_angles(joints):
@@ -93,4 +162,11 @@ def get_shoulder_angles(joints):
 # --- Función pública ---
 
 def getBodyAngles(joints):
+    # Las vistas de HolisticData traen el arreglo: un frame por el camino
+    # escalar, grabaciones (T, 33, 4) por el vectorizado
+    landmarks = getattr(joints, "landmarks", None)
+    if landmarks is not None:
+        if landmarks.ndim == 2:
+            return shoulder_angles_single(landmarks)
+        return shoulder_angles_from_array(landmarks)
     return get_shoulder_angles(joints)
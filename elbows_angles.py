@@ -1,6 +1,22 @@
 import numpy as np
+from math import acos, degrees, sqrt
 from holistic_data import JointType
 
+_ELBOW_ROWS = [JointType.LeftShoulder, JointType.LeftElbow, JointType.LeftWrist,
+               JointType.RightShoulder, JointType.RightElbow, JointType.RightWrist]
+
+
+def _flexion(S, E, W):
+    """Flexión en el plano YZ con floats de Python (filas x, y, z, vis)."""
+    v1y, v1z = S[1] - E[1], S[2] - E[2]
+    v2y, v2z = W[1] - E[1], W[2] - E[2]
+    n1 = sqrt(v1y * v1y + v1z * v1z)
+    n2 = sqrt(v2y * v2y + v2z * v2z)
+    if n1 == 0 or n2 == 0:
+        return 180.0  # por defecto brazo extendido
+    dot = max(-1.0, min(1.0, (v1y / n1) * (v2y / n2) + (v1z / n1) * (v2z / n2)))
+    return degrees(acos(dot))
+
 class Elbows:
     def __init__(self):
         # Rangos articulares del NAO en GRADOS
@@ -32,7 +48,52 @@ class Elbows:
         elif side == "Right":
             return np.interp(flex_angle_deg, [180, 0], self.RIGHT_RANGE_DEG)
 
+    def elbow_angles_from_array(self, landmarks):
+        """
+        Flexión de ambos codos en el plano YZ para un frame (33, 4) o una
+        grabación (T, 33, 4), ya mapeada al rango del NAO.
+        """
+        lm = np.asarray(landmarks, dtype=np.float64)
+        # Índice 0 = lado izquierdo, 1 = lado derecho; columnas y, z
+        S = lm[..., [JointType.LeftShoulder, JointType.RightShoulder], 1:3]
+        E = lm[..., [JointType.LeftElbow, JointType.RightElbow], 1:3]
+        W = lm[..., [JointType.LeftWrist, JointType.RightWrist], 1:3]
+
+        v1 = S - E
+        v2 = W - E
+        norm_v1 = np.linalg.norm(v1, axis=-1)
+        norm_v2 = np.linalg.norm(v2, axis=-1)
+        valid = (norm_v1 != 0) & (norm_v2 != 0)
+        safe_v1 = np.where(valid, norm_v1, 1.0)[..., None]
+        safe_v2 = np.where(valid, norm_v2, 1.0)[..., None]
+        dot = np.clip(np.sum((v1 / safe_v1) * (v2 / safe_v2), axis=-1), -1.0, 1.0)
+        flex = np.where(valid, np.degrees(np.arccos(dot)), 180.0)  # por defecto brazo extendido
+
+        flex = np.clip(flex, 0, 180)
+        return {
+            "LElbowRoll": np.interp(flex[..., 0], [180, 0], self.LEFT_RANGE_DEG)[()],
+            "RElbowRoll": np.interp(flex[..., 1], [180, 0], self.RIGHT_RANGE_DEG)[()]
+        }
+
+    def elbow_angles_single(self, landmarks):
+        """
+        Camino de un solo frame (33, 4) para el bucle en vivo: aritmética
+        escalar sobre los seis puntos, sin arreglos intermedios.
+        """
+        ls, le, lw, rs, re, rw = landmarks[_ELBOW_ROWS].tolist()
+        return {
+            "LElbowRoll": self.map_to_nao_deg(_flexion(ls, le, lw), "Left"),
+            "RElbowRoll": self.map_to_nao_deg(_flexion(rs, re, rw), "Right")
+        }
+
     def get_elbow_angles_for_nao(self, bodyJointsArray):
+        # Las vistas de HolisticData traen el arreglo: un frame por el camino
+        # escalar, grabaciones (T, 33, 4) por el vectorizado
+        landmarks = getattr(bodyJointsArray, "landmarks", None)
+        if landmarks is not None:
+            if landmarks.ndim == 2:
+                return self.elbow_angles_single(landmarks)
+            return self.elbow_angles_from_array(landmarks)
         try:
             ls = bodyJointsArray[JointType.LeftShoulder]
             le = bodyJointsArray[JointType.LeftElbow]
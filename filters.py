@@ -0,0 +1,144 @@
+import math
+import numpy as np
+from retargeting import NAO_JOINTS
+
+# Articulaciones que se filtran; las manos (0/1) pasan sin tocar
+FILTERED_JOINTS = [j for j in NAO_JOINTS if j not in ("LHand", "RHand")]
+
+# Parámetros por articulación ("default" aplica a las que no aparecen).
+# One-Euro: min_cutoff [Hz] fija el suavizado en reposo, beta cuánto se abre
+# el filtro con la velocidad [Hz por grado/s] y d_cutoff filtra la derivada.
+ONE_EURO_PARAMS = {
+    "default": {"min_cutoff": 1.0, "beta": 0.02, "d_cutoff": 1.0},
+    "HeadYaw": {"min_cutoff": 0.7, "beta": 0.01, "d_cutoff": 1.0},
+    "HeadPitch": {"min_cutoff": 0.7, "beta": 0.01, "d_cutoff": 1.0},
+}
+# Kalman de velocidad constante: q es la densidad de ruido de la aceleración
+# [(grados/s²)² · s] y r la varianza de la medición [grados²]
+KALMAN_PARAMS = {
+    "default": {"q": 1000.0, "r": 8.0},
+    "HeadYaw": {"q": 500.0, "r": 8.0},
+    "HeadPitch": {"q": 500.0, "r": 8.0},
+}
+EMA_PARAMS = {
+    "default": {"alpha": 0.2},
+}
+FILTER_PARAMS = {"one_euro": ONE_EURO_PARAMS, "kalman": KALMAN_PARAMS, "ema": EMA_PARAMS}
+
+
+def joint_params(table, joints, overrides=None):
+    """Arma un arreglo por parámetro en el orden de `joints`."""
+    table = dict(table)
+    for joint, values in (overrides or {}).items():
+        table[joint] = dict(table.get(joint, table["default"]), **values)
+    names = table["default"].keys()
+    return dict((name, np.array([table.get(j, table["default"]).get(name, table["default"][name])
+                                 for j in joints], dtype=np.float64))
+                for name in names)
+
+
+class FilterBank:
+    """
+    Filtra todas las articulaciones a la vez con arreglos de numpy. Cada
+    llamada a smooth() recibe el timestamp de captura, así el filtro se
+    adapta a frames perdidos o saltados. Con `horizon` (segundos) la salida
+    se proyecta hacia adelante con la velocidad estimada, para compensar la
+    latencia entre la cámara y el robot (el EMA no estima velocidad y la ignora).
+    """
+
+    def __init__(self, kind="one_euro", joints=FILTERED_JOINTS, params=None, horizon=0.0):
+        if kind not in FILTER_PARAMS:
+            raise ValueError("Filtro desconocido: {}".format(kind))
+        self.kind = kind
+        self.joints = list(joints)
+        self.index = dict((j, i) for i, j in enumerate(self.joints))
+        self.params = joint_params(FILTER_PARAMS[kind], self.joints, params)
+        self.horizon = horizon
+        self.reset()
+
+    def reset(self):
+        """Olvida el estado (p. ej. al perder el cuerpo)."""
+        n = len(self.joints)
+        self.x = np.zeros(n)
+        self.v = np.zeros(n)
+        self.ready = np.zeros(n, dtype=bool)
+        self.last_time = np.zeros(n)
+        self.last_z = np.zeros(n)  # última medición cruda
+        # Covarianza 2x2 simétrica del Kalman, por articulación
+        self.p00 = np.zeros(n)
+        self.p01 = np.zeros(n)
+        self.p11 = np.zeros(n)
+
+    def smooth(self, angles, timestamp, horizon=None):
+        horizon = self.horizon if horizon is None else horizon
+        z = np.full(len(self.joints), np.nan)
+        for joint, value in angles.items():
+            idx = self.index.get(joint)
+            if idx is not None and value is not None:
+                z[idx] = value
+        present = ~np.isnan(z)
+
+        # Primera medición (o tras un reset): se toma tal cual
+        fresh = present & ~self.ready
+        self.x[fresh] = z[fresh]
+        self.v[fresh] = 0.0
+        self.p00[fresh] = self.params["r"][fresh] if self.kind == "kalman" else 0.0
+        self.p01[fresh] = 0.0
+        self.p11[fresh] = 1e4 if self.kind == "kalman" else 0.0
+
+        update = present & self.ready
+        dt = timestamp - self.last_time
+        update &= dt > 0
+        if update.any():
+            getattr(self, "_step_" + self.kind)(update, z, dt)
+
+        self.ready |= present
+        self.last_time[present] = timestamp
+        self.last_z[present] = z[present]
+
+        out = self.x if self.kind == "ema" or not horizon else self.x + self.v * horizon
+        smoothed = dict((j, float(out[i])) for i, j in enumerate(self.joints) if present[i])
+        for joint, value in angles.items():
+            if joint not in self.index:
+                smoothed[joint] = float(value)
+        return smoothed
+
+    def _step_ema(self, m, z, dt):
+        a = self.params["alpha"][m]
+        self.x[m] = a * z[m] + (1 - a) * self.x[m]
+
+    def _step_one_euro(self, m, z, dt):
+        dt = dt[m]
+        d_alpha = _smoothing_factor(dt, self.params["d_cutoff"][m])
+        # Derivada de las mediciones: contra la salida filtrada (que va
+        # atrasada) sobreestima la velocidad y la proyección se pasa
+        dx = (z[m] - self.last_z[m]) / dt
+        self.v[m] = d_alpha * dx + (1 - d_alpha) * self.v[m]
+        cutoff = self.params["min_cutoff"][m] + self.params["beta"][m] * np.abs(self.v[m])
+        alpha = _smoothing_factor(dt, cutoff)
+        self.x[m] = alpha * z[m] + (1 - alpha) * self.x[m]
+
+    def _step_kalman(self, m, z, dt):
+        dt = dt[m]
+        q = self.params["q"][m]
+        r = self.params["r"][m]
+        # Predicción con velocidad constante
+        x = self.x[m] + self.v[m] * dt
+        p00 = self.p00[m] + dt * (2 * self.p01[m] + dt * self.p11[m]) + q * dt ** 3 / 3
+        p01 = self.p01[m] + dt * self.p11[m] + q * dt ** 2 / 2
+        p11 = self.p11[m] + q * dt
+        # Corrección con la medición
+        s = p00 + r
+        k0 = p00 / s
+        k1 = p01 / s
+        y = z[m] - x
+        self.x[m] = x + k0 * y
+        self.v[m] = self.v[m] + k1 * y
+        self.p00[m] = (1 - k0) * p00
+        self.p01[m] = (1 - k0) * p01
+        self.p11[m] = p11 - k1 * p01
+
+
+def _smoothing_factor(dt, cutoff):
+    tau = 1.0 / (2 * math.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
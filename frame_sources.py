@@ -0,0 +1,128 @@
+import os
+import time
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+
+class FrameSource:
+    """
+    Fuente de frames BGR. Al iterarla devuelve tuplas (timestamp, frame), con
+    el timestamp en segundos: hora de captura para la cámara y tiempo dentro
+    de la grabación para videos, carpetas de imágenes y frames sintéticos.
+    """
+
+    def frames(self):
+        raise NotImplementedError
+
+    def __iter__(self):
+        return self.frames()
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CameraSource(FrameSource):
+    def __init__(self, index=0):
+        self.name = "camara{}".format(index)
+        self.cap = cv2.VideoCapture(index)
+        # Evita que el driver acumule frames viejos en su buffer interno
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+    def frames(self):
+        while self.cap.isOpened():
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+            yield time.time(), frame
+
+    def close(self):
+        self.cap.release()
+
+
+class VideoFileSource(FrameSource):
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.splitext(os.path.basename(path))[0]
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise IOError("No se pudo abrir el video: {}".format(path))
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+    def frames(self):
+        idx = 0
+        while True:
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+            pos_ms = self.cap.get(cv2.CAP_PROP_POS_MSEC)
+            yield (pos_ms / 1000.0 if pos_ms > 0 else idx / self.fps), frame
+            idx += 1
+
+    def close(self):
+        self.cap.release()
+
+
+class ImageDirectorySource(FrameSource):
+    """Imágenes de una carpeta en orden alfabético, a `fps` fijos."""
+
+    def __init__(self, path, fps=30.0):
+        self.path = path
+        self.name = os.path.basename(os.path.normpath(path))
+        self.fps = fps
+        self.files = sorted(f for f in os.listdir(path) if f.lower().endswith(IMAGE_EXTENSIONS))
+
+    def frames(self):
+        for idx, filename in enumerate(self.files):
+            frame = cv2.imread(os.path.join(self.path, filename))
+            if frame is None:
+                print("Imagen ilegible, se omite:", filename)
+                continue
+            yield idx / self.fps, frame
+
+
+class SyntheticSource(FrameSource):
+    """
+    Frames generados (un círculo que se mueve sobre fondo gris), para medir
+    el rendimiento del pipeline sin cámara ni grabaciones.
+    """
+
+    def __init__(self, count=300, width=640, height=480, fps=30.0):
+        self.name = "sintetico"
+        self.count = count
+        self.width = width
+        self.height = height
+        self.fps = fps
+
+    def frames(self):
+        for idx in range(self.count):
+            frame = np.full((self.height, self.width, 3), 128, dtype=np.uint8)
+            cx = int(self.width / 2 + self.width / 4 * np.sin(idx / self.fps * 2 * np.pi))
+            cv2.circle(frame, (cx, self.height // 2), self.height // 8, (255, 255, 255), -1)
+            yield idx / self.fps, frame
+
+
+def open_source(spec):
+    """
+    Abre una fuente a partir de un texto:
+      "0", "1"...        cámara con ese índice
+      "synthetic[:N]"    N frames sintéticos
+      carpeta            imágenes de la carpeta
+      cualquier otro     archivo de video
+    """
+    spec = str(spec)
+    if spec.isdigit():
+        return CameraSource(int(spec))
+    if spec.startswith("synthetic"):
+        _, _, count = spec.partition(":")
+        return SyntheticSource(int(count) if count else 300)
+    if os.path.isdir(spec):
+        return ImageDirectorySource(spec)
+    return VideoFileSource(spec)
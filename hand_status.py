@@ -30,6 +30,82 @@ def create_multi_hand_structures(holistic_results):
 # Lista de joints para ángulos (dedos)
 joint_list = [[8,5,0], [12,9,0], [16,13,0], [20,17,0]]
 
+# Mismos joints como slices (vistas, sin copiar) para el clasificador vectorizado
+FINGER_TIPS = slice(8, 21, 4)    # 8, 12, 16, 20
+FINGER_BASES = slice(5, 18, 4)   # 5, 9, 13, 17
+WRIST = slice(0, 1)
+NUM_HAND_LANDMARKS = 21
+
+
+class HandStateClassifier:
+    """
+    Estado abierta (1) / cerrada (0) de ambas manos a partir de las landmarks
+    de Holistic, con los cuatro ángulos de los dedos de las dos manos en una
+    sola pasada de numpy sobre buffers reservados una vez. Con histéresis:
+    una mano cerrada se abre recién cuando todos los dedos superan
+    `open_angle` y una abierta se cierra cuando alguno baja de `close_angle`.
+    Una mano no detectada devuelve None y olvida su estado anterior.
+    """
+
+    def __init__(self, open_angle=90.0, close_angle=70.0, initial_angle=80.0):
+        self.open_angle = open_angle
+        self.close_angle = close_angle
+        self.initial_angle = initial_angle  # umbral sin estado previo (el original)
+        self.points = np.zeros((2, NUM_HAND_LANDMARKS, 2))
+        self._tips = np.zeros((2, 4, 2))
+        self._bases = np.zeros((2, 4, 2))
+        self._a = np.zeros((2, 4))
+        self._c = np.zeros((2, 4))
+        self.states = [None, None]
+
+    def reset(self):
+        self.states = [None, None]
+
+    def _load(self, side, hand_landmarks):
+        points = self.points[side]
+        for i, lm in enumerate(hand_landmarks.landmark):
+            points[i, 0] = lm.x
+            points[i, 1] = lm.y
+
+    def finger_angles(self):
+        """Ángulo (grados) en la base de cada dedo entre la punta y la muñeca: (2, 4)."""
+        np.subtract(self.points[:, FINGER_TIPS], self.points[:, FINGER_BASES], out=self._tips)
+        np.subtract(self.points[:, WRIST], self.points[:, FINGER_BASES], out=self._bases)
+        np.arctan2(self._bases[..., 1], self._bases[..., 0], out=self._c)
+        np.arctan2(self._tips[..., 1], self._tips[..., 0], out=self._a)
+        np.subtract(self._c, self._a, out=self._a)
+        np.abs(self._a, out=self._a)
+        np.degrees(self._a, out=self._a)
+        # Ángulo interior: 360 - a cuando pasa de 180
+        np.minimum(self._a, 360.0 - self._a, out=self._a)
+        return self._a
+
+    def classify(self, left_landmarks, right_landmarks):
+        """Devuelve (izquierda, derecha): 1 abierta, 0 cerrada, None sin mano."""
+        present = (bool(left_landmarks), bool(right_landmarks))
+        if present[0]:
+            self._load(0, left_landmarks)
+        if present[1]:
+            self._load(1, right_landmarks)
+        if not any(present):
+            self.reset()
+            return None, None
+
+        min_angles = self.finger_angles().min(axis=1)
+        for side in (0, 1):
+            if not present[side]:
+                self.states[side] = None
+                continue
+            previous = self.states[side]
+            if previous is None:
+                state = 1 if min_angles[side] > self.initial_angle else 0
+            elif previous == 1:
+                state = 0 if min_angles[side] < self.close_angle else 1
+            else:
+                state = 1 if min_angles[side] > self.open_angle else 0
+            self.states[side] = state
+        return self.states[0], self.states[1]
+
 def get_angles(image, hand, joint_combinations):
     angle_list = []
     for joint in joint_combinations:
@@ -51,7 +127,6 @@ def get_hand_status(image, results, show_text=True):
     }
 
     original_image = image
-    image = cv2.flip(image, 1)
 
     if results.multi_hand_landmarks is not None:
         number_of_hands = len(results.multi_hand_landmarks)
@@ -17,8 +17,25 @@ def scale_angle(value, axis): # scaling for the degree of freedom of human head.
         return round(degree), round(radian,4)
 
 
-def get_head_positions(image, face_mesh_results, angle_type, show_text=True):
-    output = {
+# Landmarks de FaceMesh usados para resolver la pose de la cabeza
+HEAD_POSE_LANDMARKS = (33, 263, 1, 61, 291, 199)
+
+# Equivalentes aproximados en los puntos de la cara del modelo Pose:
+# ojo der. exterior, ojo izq. exterior, nariz, boca der., boca izq.
+# (el mentón, 199, no existe en Pose y se extrapola desde ojos y boca)
+POSE_FACE_LANDMARKS = (6, 3, 0, 10, 9)
+CHIN_FROM_MOUTH = 0.6  # distancia mentón-boca relativa a la distancia boca-ojos
+
+
+class _Point:
+    def __init__(self, x, y, z):
+        self.x = x
+        self.y = y
+        self.z = z
+
+
+def empty_head_output():
+    return {
         "Pitch" : {
             "Degree" : None ,
             "Radian" : None
@@ -28,53 +45,147 @@ def get_head_positions(image, face_mesh_results, angle_type, show_text=True):
             "Radian" : None
         }
     }
-    img_h , img_w , img_c = image.shape
-    face_3d = []
-    face_2d = []
 
-    if face_mesh_results.multi_face_landmarks :
-        for face_landmarks in face_mesh_results.multi_face_landmarks :
-            drawing_spec = drawing_mp.DrawingSpec(thickness=1, circle_radius=1)
 
-            for idx , landmark in enumerate(face_landmarks.landmark) :
-                # borders of head mesh
-                if idx == 33 or idx == 263 or idx == 1 or idx == 61 or idx == 291 or idx == 199:
-                    x, y = int(landmark.x * img_w) , int(landmark.y * img_h)
-                    face_2d.append([x , y]) # 2D Coordinates
-                    face_3d.append([x , y , landmark.z]) # 3D Coordinates
+class HeadPoseEstimator:
+    """
+    Resuelve la pose de la cabeza frame a frame reutilizando trabajo:
+    intrínsecos cacheados por tamaño de imagen, los seis landmarks tomados
+    por índice directo, solvePnP arrancando desde el rvec/tvec anterior
+    (useExtrinsicGuess) y pitch/yaw calculados directamente de la matriz de
+    rotación. No dibuja nada; para eso está draw_head_pose().
+    """
 
-            face_2d = np.array(face_2d , dtype=np.float64)
-            face_3d = np.array(face_3d , dtype=np.float64)
+    def __init__(self, warm_start=True):
+        self.warm_start = warm_start
+        self._intrinsics = {}
+        self._rvec = None
+        self._tvec = None
+        self._face_2d = np.empty((len(HEAD_POSE_LANDMARKS), 2), dtype=np.float64)
+        self._face_3d = np.empty((len(HEAD_POSE_LANDMARKS), 3), dtype=np.float64)
 
+    def reset(self):
+        """Olvida la solución anterior (al perder la cara o cambiar de video)."""
+        self._rvec = None
+        self._tvec = None
 
+    def _camera(self, img_h, img_w):
+        intrinsics = self._intrinsics.get((img_h, img_w))
+        if intrinsics is None:
             focal_length = 1 * img_w # default calibration
-            camera_matrix = np.array([[focal_length, 0, img_h / 2], [0, focal_length, img_w / 2], [0 , 0 , 1]])
+            camera_matrix = np.array([[focal_length, 0, img_h / 2], [0, focal_length, img_w / 2], [0 , 0 , 1]], dtype=np.float64)
             # The distortion parameters
             distortion_matrix = np.zeros((4 , 1) , dtype=np.float64)
-            # PnP Problem
-            success , rotational_vector , trans_vec = cv2.solvePnP(face_3d , face_2d , camera_matrix , distortion_matrix)
-            # Get rotational matrix
-            rotational_matrix , jacobian = cv2.Rodrigues(rotational_vector)
-            # Get angles
-            angles , matrixR , matrixQ , QX , QY , QZ = cv2.RQDecomp3x3(rotational_matrix)
-
-            head_pitch_degree, head_pitch_radian = scale_angle(angles[0],"x")
-            head_yaw_degree, head_yaw_radian = scale_angle(angles[1],"y")
-
-            drawing_mp.draw_landmarks(
-                image=image,
-                landmark_list=face_landmarks,
-                connections=face_mesh_mp.FACEMESH_CONTOURS,
-                landmark_drawing_spec=drawing_spec,
-                connection_drawing_spec=drawing_spec)
-
-            if show_text:
-                if angle_type == "Degree":
-                    cv2.putText(image,"HeadPitch: " + str(head_pitch_degree) + "        HeadYaw: " + str(head_yaw_degree), (image.shape[1]//2-290,100), cv2.FONT_HERSHEY_SIMPLEX , 1 , (255 , 255 , 255) , 2)
-
-            output["Pitch"]["Degree"] = head_pitch_degree
-            output["Pitch"]["Radian"] = head_pitch_radian
-            output["Yaw"]["Degree"] = head_yaw_degree
-            output["Yaw"]["Radian"] = head_yaw_radian
-
-    return output
\ No newline at end of file
+            intrinsics = self._intrinsics[(img_h, img_w)] = (camera_matrix, distortion_matrix)
+        return intrinsics
+
+    def solve(self, image_shape, points):
+        """
+        Seis puntos con x, y, z normalizados -> (pitch_grados, pitch_rad,
+        yaw_grados, yaw_rad), o None si el PnP no converge.
+        """
+        img_h , img_w = image_shape[:2]
+        face_2d = self._face_2d
+        face_3d = self._face_3d
+        for i, landmark in enumerate(points):
+            face_2d[i, 0] = face_3d[i, 0] = int(landmark.x * img_w)
+            face_2d[i, 1] = face_3d[i, 1] = int(landmark.y * img_h)
+            face_3d[i, 2] = landmark.z
+
+        camera_matrix, distortion_matrix = self._camera(img_h, img_w)
+        if self.warm_start and self._rvec is not None:
+            success, rvec, tvec = cv2.solvePnP(face_3d, face_2d, camera_matrix, distortion_matrix,
+                                               self._rvec, self._tvec, useExtrinsicGuess=True)
+        else:
+            success, rvec, tvec = cv2.solvePnP(face_3d, face_2d, camera_matrix, distortion_matrix)
+        if not success:
+            self.reset()
+            return None
+        if self.warm_start:
+            self._rvec, self._tvec = rvec, tvec
+
+        rotational_matrix, _ = cv2.Rodrigues(rvec)
+        # Ángulos de Euler (mismo resultado que RQDecomp3x3 para una rotación)
+        angle_x = np.degrees(np.arctan2(rotational_matrix[2, 1], rotational_matrix[2, 2]))
+        angle_y = np.degrees(np.arctan2(-rotational_matrix[2, 0],
+                                        np.hypot(rotational_matrix[2, 1], rotational_matrix[2, 2])))
+
+        head_pitch_degree, head_pitch_radian = scale_angle(angle_x,"x")
+        head_yaw_degree, head_yaw_radian = scale_angle(angle_y,"y")
+        return head_pitch_degree, head_pitch_radian, head_yaw_degree, head_yaw_radian
+
+    def _to_output(self, angles):
+        output = empty_head_output()
+        if angles is not None:
+            output["Pitch"]["Degree"], output["Pitch"]["Radian"], \
+                output["Yaw"]["Degree"], output["Yaw"]["Radian"] = angles
+        return output
+
+    def from_face(self, image_shape, face_landmarks):
+        """Pose de la cabeza desde landmarks de cara (FaceMesh u Holistic)."""
+        landmarks = face_landmarks.landmark
+        return self._to_output(self.solve(image_shape, [landmarks[idx] for idx in HEAD_POSE_LANDMARKS]))
+
+    def from_face_mesh(self, image_shape, face_mesh_results):
+        if not face_mesh_results.multi_face_landmarks:
+            self.reset()
+            return empty_head_output()
+        return self.from_face(image_shape, face_mesh_results.multi_face_landmarks[-1])
+
+    def from_pose(self, image_shape, pose_landmarks):
+        """
+        Pose aproximada de la cabeza usando solo los puntos de la cara del
+        modelo Pose, para cuando Holistic no entrega face_landmarks.
+        """
+        lm = pose_landmarks.landmark
+        r_eye, l_eye, nose, r_mouth, l_mouth = [lm[idx] for idx in POSE_FACE_LANDMARKS]
+
+        eye_mid = [(r_eye.x + l_eye.x) / 2, (r_eye.y + l_eye.y) / 2, (r_eye.z + l_eye.z) / 2]
+        mouth_mid = [(r_mouth.x + l_mouth.x) / 2, (r_mouth.y + l_mouth.y) / 2, (r_mouth.z + l_mouth.z) / 2]
+        chin = _Point(*[m + (m - e) * CHIN_FROM_MOUTH for m, e in zip(mouth_mid, eye_mid)])
+
+        return self._to_output(self.solve(image_shape, [r_eye, l_eye, nose, r_mouth, l_mouth, chin]))
+
+
+def draw_head_pose(image, face_landmarks=None, output=None, show_text=True):
+    """Dibujo opcional: contorno de la cara y texto con los ángulos."""
+    if face_landmarks is not None:
+        drawing_spec = drawing_mp.DrawingSpec(thickness=1, circle_radius=1)
+        drawing_mp.draw_landmarks(
+            image=image,
+            landmark_list=face_landmarks,
+            connections=face_mesh_mp.FACEMESH_CONTOURS,
+            landmark_drawing_spec=drawing_spec,
+            connection_drawing_spec=drawing_spec)
+
+    if show_text and output is not None and output["Pitch"]["Degree"] is not None:
+        cv2.putText(image,"HeadPitch: " + str(output["Pitch"]["Degree"]) + "        HeadYaw: " + str(output["Yaw"]["Degree"]), (image.shape[1]//2-290,100), cv2.FONT_HERSHEY_SIMPLEX , 1 , (255 , 255 , 255) , 2)
+
+
+# Funciones sin estado entre frames (cada llamada resuelve el PnP en frío)
+_cold_estimator = HeadPoseEstimator(warm_start=False)
+
+
+def get_head_positions_from_face(image, face_landmarks, angle_type, show_text=True):
+    """Pose de la cabeza a partir de una lista de landmarks de cara (FaceMesh u Holistic)."""
+    output = _cold_estimator.from_face(image.shape, face_landmarks)
+    draw_head_pose(image, face_landmarks, output, show_text and angle_type == "Degree")
+    return output
+
+
+def get_head_positions_from_pose(image, pose_landmarks, angle_type, show_text=True):
+    """
+    Pose aproximada de la cabeza usando solo los puntos de la cara del modelo
+    Pose, para cuando Holistic no entrega face_landmarks.
+    """
+    output = _cold_estimator.from_pose(image.shape, pose_landmarks)
+    draw_head_pose(image, None, output, show_text and angle_type == "Degree")
+    return output
+
+
+def get_head_positions(image, face_mesh_results, angle_type, show_text=True):
+    output = empty_head_output()
+    if face_mesh_results.multi_face_landmarks :
+        for face_landmarks in face_mesh_results.multi_face_landmarks :
+            output = get_head_positions_from_face(image, face_landmarks, angle_type, show_text)
+    return output
@@ -1,6 +1,10 @@
 import numpy as np
 import mediapipe as mp
-from head_angles import get_head_positions
+from head_angles import get_head_positions, get_head_positions_from_face, get_head_positions_from_pose
+
+# Filas del arreglo de landmarks: x, y, z, visibilidad
+NUM_POSE_LANDMARKS = 33
+X, Y, Z, VISIBILITY = range(4)
 
 class JointPoint:
     def __init__(self, x=0, y=0, z=0):
@@ -39,9 +43,82 @@ class JointType:
     SpineMid = 0    # Se calcula como promedio
     SpineShoulder = 100  # Se calcula como promedio
 
+
+def pose_landmarks_to_array(pose_landmarks):
+    """Landmarks de Pose a un arreglo contiguo (33, 4) float32: x, y, z, visibilidad."""
+    return np.array([(lm.x, lm.y, lm.z, lm.visibility) for lm in pose_landmarks.landmark],
+                    dtype=np.float32)
+
+
+def spine_points(landmarks):
+    """
+    Puntos derivados de la columna para uno o varios frames (..., 33, 4):
+    devuelve (SpineShoulder, SpineMid), cada uno (..., 4).
+    """
+    landmarks = np.asarray(landmarks)
+    spine_shoulder = (landmarks[..., JointType.LeftShoulder, :] + landmarks[..., JointType.RightShoulder, :]) / 2
+    spine_mid = (landmarks[..., JointType.LeftHip, :] + landmarks[..., JointType.RightHip, :]) / 2
+    return spine_shoulder, spine_mid
+
+
+class JointsView:
+    """
+    Vista tipo dict {índice: JointPoint} sobre el arreglo (33, 4), para el
+    código que todavía indexa bodyJointsArray por JointType. Igual que antes,
+    el índice 0 (SpineMid) devuelve el promedio de caderas y 100 el de hombros.
+    """
+    def __init__(self, landmarks):
+        self.landmarks = landmarks
+        spine_shoulder, spine_mid = spine_points(landmarks)
+        self._derived = {JointType.SpineShoulder: spine_shoulder, JointType.SpineMid: spine_mid}
+
+    def _row(self, idx):
+        if idx in self._derived:
+            return self._derived[idx]
+        if isinstance(idx, int) and 0 <= idx < NUM_POSE_LANDMARKS:
+            return self.landmarks[idx]
+        raise KeyError(idx)
+
+    def __getitem__(self, idx):
+        row = self._row(idx)
+        return JointPoint(float(row[X]), float(row[Y]), float(row[Z]))
+
+    def get(self, idx, default=None):
+        try:
+            return self[idx]
+        except KeyError:
+            return default
+
+    def __contains__(self, idx):
+        return idx in self._derived or (isinstance(idx, int) and 0 <= idx < NUM_POSE_LANDMARKS)
+
+    def keys(self):
+        return list(range(NUM_POSE_LANDMARKS)) + [JointType.SpineShoulder]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return NUM_POSE_LANDMARKS + 1
+
+    def items(self):
+        return [(idx, self[idx]) for idx in self.keys()]
+
 class HolisticData:
-    def __init__(self, holistic_result, face_mesh_results=None, image=None):
+    """
+    head_source:
+      "facemesh": pose de la cabeza con los resultados de un FaceMesh aparte
+      "holistic": usa holistic_result.face_landmarks (o, si faltan, los puntos
+                  de la cara del modelo Pose), sin necesitar un segundo modelo
+    head_estimator: HeadPoseEstimator opcional que conserva la solución entre
+                    frames (arranque en caliente); sin él se resuelve en frío
+    landmarks: arreglo (33, 4) que reemplaza a la pose de holistic_result
+               (p. ej. triangulada con dos cámaras en stereo_fusion.py)
+    """
+    def __init__(self, holistic_result, face_mesh_results=None, image=None, head_source="facemesh",
+                 head_estimator=None, landmarks=None):
         self.bodyJointsArray = {}
+        self.landmarks = None  # arreglo (33, 4) float32 con la pose
         #self.handState = {"LEFT_HAND": False, "RIGHT_HAND": False}
         self.headRotationAngle = {
             "Pitch": {"Degree": None, "Radian": None},
@@ -50,14 +127,29 @@ class HolisticData:
 
         pose = holistic_result.pose_landmarks
         if pose:
-            self._load_pose_data(pose)
-            self._estimate_spine_points()
+            self.landmarks = pose_landmarks_to_array(pose) if landmarks is None else landmarks
+            self.bodyJointsArray = JointsView(self.landmarks)
 
         #self.handState["LEFT_HAND"] = self._is_hand_open(holistic_result.left_hand_landmarks)
         #self.handState["RIGHT_HAND"] = self._is_hand_open(holistic_result.right_hand_landmarks)
 
         # Si tenemos FaceMesh y la imagen, calcular rotación de cabeza
-        if face_mesh_results is not None and image is not None:
+        if head_estimator is not None and image is not None:
+            if head_source == "holistic":
+                if holistic_result.face_landmarks:
+                    self.headRotationAngle = head_estimator.from_face(image.shape, holistic_result.face_landmarks)
+                elif pose:
+                    self.headRotationAngle = head_estimator.from_pose(image.shape, pose)
+                else:
+                    head_estimator.reset()
+            elif face_mesh_results is not None:
+                self.headRotationAngle = head_estimator.from_face_mesh(image.shape, face_mesh_results)
+        elif head_source == "holistic" and image is not None:
+            if holistic_result.face_landmarks:
+                self.headRotationAngle = get_head_positions_from_face(image, holistic_result.face_landmarks, angle_type="Degree", show_text=False)
+            elif pose:
+                self.headRotationAngle = get_head_positions_from_pose(image, pose, angle_type="Degree", show_text=False)
+        elif face_mesh_results is not None and image is not None:
             self.headRotationAngle = get_head_positions(image, face_mesh_results, angle_type="Degree", show_text=False)
         else:
             self.headRotationAngle = {
@@ -66,29 +158,6 @@ class HolisticData:
             }
 
 
-    def _load_pose_data(self, pose_landmarks):
-        for idx, lm in enumerate(pose_landmarks.landmark):
-            self.bodyJointsArray[idx] = JointPoint(lm.x, lm.y, lm.z)
-
-    def _estimate_spine_points(self):
-        # Promedio de hombros para SpineShoulder
-        ls = self.bodyJointsArray.get(JointType.LeftShoulder)
-        rs = self.bodyJointsArray.get(JointType.RightShoulder)
-        if ls and rs:
-            self.bodyJointsArray[JointType.SpineShoulder] = self._average_points([ls, rs])
-        
-        # Promedio de caderas para SpineMid
-        lh = self.bodyJointsArray.get(JointType.LeftHip)
-        rh = self.bodyJointsArray.get(JointType.RightHip)
-        if lh and rh:
-            self.bodyJointsArray[JointType.SpineMid] = self._average_points([lh, rh])
-
-    def _average_points(self, points):
-        x = sum(p.x for p in points) / len(points)
-        y = sum(p.y for p in points) / len(points)
-        z = sum(p.z for p in points) / len(points)
-        return JointPoint(x, y, z)
-
     """def _is_hand_open(self, hand_landmarks):
         if not hand_landmarks:
             return False
@@ -0,0 +1,107 @@
+import numpy as np
+from holistic_data import JointType
+
+# Articulaciones cuya velocidad decide el intervalo entre keyframes
+MOTION_JOINTS = [
+    JointType.nose,
+    JointType.LeftShoulder, JointType.RightShoulder,
+    JointType.LeftElbow, JointType.RightElbow,
+    JointType.LeftWrist, JointType.RightWrist,
+]
+
+
+class KeyframeScheduler:
+    """
+    Decide en qué frames correr la inferencia completa. El intervalo entre
+    keyframes se adapta a la velocidad de las landmarks (en unidades
+    normalizadas por segundo): con movimiento rápido se infiere cada frame y
+    con la persona quieta, uno de cada `max_interval`.
+    """
+
+    def __init__(self, max_interval=3, fast_speed=0.5, still_speed=0.05):
+        self.max_interval = max(1, max_interval)
+        self.fast_speed = fast_speed
+        self.still_speed = still_speed
+        self.interval = 1
+        self.speed = None
+        self.inferred = 0
+        self.predicted = 0
+        self._since_key = 0
+        self._last = None  # (timestamp, landmarks de MOTION_JOINTS)
+
+    def reset(self):
+        """Sin pose: vuelve a inferir en todos los frames."""
+        self.interval = 1
+        self._since_key = 0
+        self._last = None
+
+    def should_infer(self):
+        if self._last is None or self._since_key + 1 >= self.interval:
+            self._since_key = 0
+            self.inferred += 1
+            return True
+        self._since_key += 1
+        self.predicted += 1
+        return False
+
+    def observe(self, pose_landmarks, timestamp):
+        """Registra el resultado de un keyframe (landmarks de Pose o None)."""
+        if not pose_landmarks:
+            self.reset()
+            return
+        lm = pose_landmarks.landmark
+        points = np.array([(lm[idx].x, lm[idx].y) for idx in MOTION_JOINTS])
+        if self._last is not None:
+            dt = timestamp - self._last[0]
+            if dt > 0:
+                self.speed = float(np.max(np.linalg.norm(points - self._last[1], axis=1)) / dt)
+                self.interval = self._interval_for(self.speed)
+        self._last = (timestamp, points)
+
+    def _interval_for(self, speed):
+        if speed >= self.fast_speed:
+            return 1
+        if speed <= self.still_speed:
+            return self.max_interval
+        # Interpolación lineal entre quieto (máximo intervalo) y rápido (1)
+        frac = (self.fast_speed - speed) / (self.fast_speed - self.still_speed)
+        return max(1, int(round(1 + frac * (self.max_interval - 1))))
+
+
+class AnglePredictor:
+    """
+    Extrapola los ángulos entre keyframes con velocidad constante a partir de
+    los dos últimos keyframes. Las manos (estados 0/1) se mantienen.
+    """
+
+    HOLD = ("LHand", "RHand")
+
+    def __init__(self, max_horizon=0.25):
+        self.max_horizon = max_horizon  # segundos máximos de extrapolación
+        self._prev = None
+        self._last = None
+
+    def reset(self):
+        self._prev = None
+        self._last = None
+
+    def update(self, angles, timestamp):
+        self._prev = self._last
+        self._last = (timestamp, dict(angles))
+
+    def predict(self, timestamp):
+        if self._last is None:
+            return None
+        t1, last = self._last
+        if self._prev is None:
+            return dict(last)
+        t0, prev = self._prev
+        dt = t1 - t0
+        horizon = min(max(timestamp - t1, 0.0), self.max_horizon)
+        predicted = {}
+        for key, value in last.items():
+            if key in self.HOLD or key not in prev or dt <= 0:
+                predicted[key] = value
+            else:
+                predicted[key] = value + (value - prev[key]) / dt * horizon
+        return predicted
@@ -0,0 +1,72 @@
+import time
+import cv2
+import mediapipe as mp
+from head_angles import draw_head_pose
+
+mp_drawing = mp.solutions.drawing_utils
+mp_holistic = mp.solutions.holistic
+HAND_CONNECTIONS = mp.solutions.hands.HAND_CONNECTIONS
+
+HAND_TEXTS = {1: "open", 0: "closed", None: "No Hand"}
+STATUS_COLORS = {"Prediccion": (0, 255, 255)}
+
+
+class OverlayRenderer:
+    """
+    Dibuja sobre una copia del frame los resultados ya calculados de un
+    paquete (landmarks, estado de las manos, pose de la cabeza y estado del
+    seguimiento). No participa del cálculo de ángulos: corre aparte, solo
+    con los frames que realmente se muestran.
+    """
+
+    def __init__(self, draw_face=True, metrics=None):
+        self.draw_face = draw_face
+        self.metrics = metrics  # Registry de NAOcontrol.metrics, opcional
+
+    def render(self, packet):
+        image = packet.frame.copy()
+        results = packet.holistic_results
+        if results is not None:
+            mp_drawing.draw_landmarks(image, results.pose_landmarks, mp_holistic.POSE_CONNECTIONS)
+            if results.left_hand_landmarks:
+                mp_drawing.draw_landmarks(image, results.left_hand_landmarks, HAND_CONNECTIONS)
+            if results.right_hand_landmarks:
+                mp_drawing.draw_landmarks(image, results.right_hand_landmarks, HAND_CONNECTIONS)
+            face = results.face_landmarks if self.draw_face else None
+            draw_head_pose(image, face, packet.head_pose)
+
+        if packet.hand_states is not None:
+            left, right = packet.hand_states
+            h, w = image.shape[:2]
+            cv2.putText(image, "Left Hand: {}".format(HAND_TEXTS.get(left, "Unknown")), (w - 220, h // 2),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+            cv2.putText(image, "Right Hand: {}".format(HAND_TEXTS.get(right, "Unknown")), (20, h // 2),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+
+        if packet.status:
+            cv2.putText(image, packet.status, (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 0.7,
+                        STATUS_COLORS.get(packet.status, (0, 0, 255)), 2)
+
+        if self.metrics is not None:
+            y = image.shape[0] - 10
+            for line in reversed(self.metrics.summary_lines()):
+                cv2.putText(image, line, (10, y), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (0, 255, 0), 1)
+                y -= 16
+        return image
+
+
+class RateLimiter:
+    """Deja pasar como máximo `max_fps` eventos por segundo (0 = sin límite)."""
+
+    def __init__(self, max_fps):
+        self.interval = 1.0 / max_fps if max_fps else 0.0
+        self.next_time = 0.0
+        self.skipped = 0
+
+    def ready(self):
+        now = time.time()
+        if now < self.next_time:
+            self.skipped += 1
+            return False
+        self.next_time = now + self.interval
+        return True
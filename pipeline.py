@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import deque
+
+
+class LatestQueue:
+    """
+    Cola acotada en la que gana el dato más reciente: si está llena, descarta
+    el elemento más antiguo en lugar de bloquear al productor.
+    """
+
+    def __init__(self, maxsize=1):
+        self._items = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self._closed = False
+        self.maxsize = maxsize
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) == self.maxsize:
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Devuelve el siguiente elemento, o None si se cerró o venció el timeout."""
+        with self._cond:
+            if not self._items and not self._closed:
+                self._cond.wait(timeout)
+            if self._items:
+                return self._items.popleft()
+            return None
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def __len__(self):
+        return len(self._items)
+
+
+class Stage(threading.Thread):
+    """
+    Etapa del pipeline: toma elementos de `inbox`, aplica `func` y publica el
+    resultado en `outbox`. Si `func` devuelve None no se publica nada.
+    Sin `inbox` la etapa es una fuente y `func` se llama sin argumentos.
+    """
+
+    def __init__(self, name, func, inbox=None, outbox=None, stop_event=None, poll=0.1):
+        super().__init__(name=name, daemon=True)
+        self.func = func
+        self.inbox = inbox
+        self.outbox = outbox
+        self.stop_event = stop_event or threading.Event()
+        self.poll = poll
+        self.processed = 0
+        self.error = None
+
+    def run(self):
+        try:
+            while not self.stop_event.is_set():
+                if self.inbox is None:
+                    result = self.func()
+                else:
+                    item = self.inbox.get(timeout=self.poll)
+                    if item is None:
+                        if self.inbox.closed:
+                            break
+                        continue
+                    result = self.func(item)
+                if result is StopIteration:
+                    break
+                self.processed += 1
+                if result is not None and self.outbox is not None:
+                    self.outbox.put(result)
+        except Exception as e:
+            self.error = e
+            print("Error en la etapa {}: {}".format(self.name, e))
+            self.stop_event.set()
+        finally:
+            # Propaga el cierre aguas abajo para que las demás etapas terminen
+            if self.outbox is not None:
+                self.outbox.close()
+
+
+class Pipeline:
+    """Conjunto de etapas que comparten un mismo evento de parada."""
+
+    def __init__(self):
+        self.stop_event = threading.Event()
+        self.stages = []
+
+    def add_stage(self, name, func, inbox=None, outbox=None):
+        stage = Stage(name, func, inbox, outbox, self.stop_event)
+        self.stages.append(stage)
+        return stage
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+
+    def stop(self, timeout=2.0):
+        self.stop_event.set()
+        for stage in self.stages:
+            if stage.inbox is not None:
+                stage.inbox.close()
+        deadline = time.time() + timeout
+        for stage in self.stages:
+            stage.join(max(0.0, deadline - time.time()))
+
+    @property
+    def running(self):
+        return not self.stop_event.is_set() and any(s.is_alive() for s in self.stages)
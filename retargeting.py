@@ -0,0 +1,84 @@
+from holistic_data import JointType
+from body_angles import getBodyAngles
+from elbows_angles import Elbows
+
+# Articulaciones que se envían / registran, en el orden de los CSV del robot
+NAO_JOINTS = [
+    "HeadYaw", "HeadPitch",
+    "LShoulderPitch", "LShoulderRoll",
+    "RShoulderPitch", "RShoulderRoll",
+    "LElbowRoll", "RElbowRoll",
+    "LHand", "RHand"
+]
+
+elbows = Elbows()
+
+# Función para limitar valores
+def clamp(val, min_val, max_val):
+    return max(min(val, max_val), min_val)
+
+def clamp_angles_for_nao(angles):
+    clamped = {}
+    for key, value in angles.items():
+        if key.endswith("KNEE_PITCH"):
+            clamped[key] = clamp(value, 0, 120)
+        elif key.endswith("HIP_PITCH"):
+            clamped[key] = clamp(value, -45, 30)
+        elif key == "LElbowRoll":
+            clamped[key] = clamp(value, -88.5, -2)
+        elif key == "RElbowRoll":
+            clamped[key] = clamp(value, 2, 88.5)
+        elif key.endswith("SHOULDER_PITCH"):
+            clamped[key] = clamp(value, -90, 90)
+        elif key.endswith("SHOULDER_ROLL"):  #
+            if key.startswith("R"):
+                clamped[key] = clamp(value, -18, 76)
+            else:
+                clamped[key] = clamp(value, -76, 18)
+        elif key == "HEAD_PITCH":
+            clamped[key] = clamp(value, -40, 30)
+        elif key == "HEAD_YAW":
+            clamped[key] = clamp(value, -120, 120)
+        elif key == "VAREPSILON":
+            clamped[key] = clamp(value, -60, 40)
+        else:
+            clamped[key] = value
+    return clamped
+
+
+# Validación
+
+def is_body_fully_detected(data):
+    joints = data.bodyJointsArray
+    required = [
+        JointType.LeftShoulder, JointType.LeftElbow, JointType.LeftWrist,
+        JointType.RightShoulder, JointType.RightElbow, JointType.RightWrist,
+        JointType.LeftHip, JointType.LeftKnee, JointType.LeftAnkle,
+        JointType.RightHip, JointType.RightKnee, JointType.RightAnkle,
+        JointType.SpineMid, JointType.SpineShoulder, JointType.nose
+    ]
+    return all(j in joints for j in required)
+
+
+def get_hand_states(holistic_results, classifier):
+    """Devuelve (izquierda, derecha) con 1 si la mano está abierta (None si no se ve)."""
+    return classifier.classify(holistic_results.left_hand_landmarks, holistic_results.right_hand_landmarks)
+
+
+def retarget_angles(data, lhand_state, rhand_state):
+    """
+    Ángulos del NAO (en grados, sin suavizar) a partir de un HolisticData con
+    el cuerpo completo. Devuelve None si no se pudieron calcular.
+    """
+    angles = getBodyAngles(data.bodyJointsArray)
+    if not angles:  # Verifica si es None o dict vacío
+        return None
+    elbow_angles = elbows.get_elbow_angles_for_nao(data.bodyJointsArray)
+    angles.update(elbow_angles)
+    angles = clamp_angles_for_nao(angles)
+
+    angles["HeadPitch"] = -(data.headRotationAngle["Pitch"]["Degree"] if data.headRotationAngle["Pitch"]["Degree"] is not None else 0)
+    angles["HeadYaw"] = data.headRotationAngle["Yaw"]["Degree"] if data.headRotationAngle["Pitch"]["Degree"] is not None else 0
+    angles["LHand"] = 1.0 if lhand_state == 1 else 0.0
+    angles["RHand"] = 1.0 if rhand_state == 1 else 0.0
+    return angles
@@ -0,0 +1,161 @@
+import cv2
+import numpy as np
+
+
+class RoiTracker:
+    """
+    Recorta el frame alrededor de la persona usando la caja de la pose del
+    frame anterior (más un margen) y lo reduce a un ancho de inferencia.
+    Si se pierde la pose vuelve al frame completo. Las landmarks obtenidas
+    sobre el recorte se devuelven a coordenadas del frame con map_results().
+    """
+
+    def __init__(self, margin=0.25, inference_width=480, min_visibility=0.5, min_size=0.2):
+        self.margin = margin
+        self.inference_width = inference_width
+        self.min_visibility = min_visibility
+        self.min_size = min_size  # lado mínimo del recorte, relativo al frame
+        self.roi = None  # (x0, y0, x1, y1) en píxeles del frame completo
+        self.lost = 0
+
+    def reset(self):
+        self.roi = None
+
+    def crop(self, frame):
+        """Devuelve (imagen para inferir, roi usada o None si es el frame completo)."""
+        roi = self.roi
+        image = frame if roi is None else frame[roi[1]:roi[3], roi[0]:roi[2]]
+        h, w = image.shape[:2]
+        if self.inference_width and w > self.inference_width:
+            scale = self.inference_width / float(w)
+            image = cv2.resize(image, (self.inference_width, max(1, int(round(h * scale)))),
+                               interpolation=cv2.INTER_AREA)
+        return image, roi
+
+    def update(self, pose_landmarks, frame_shape):
+        """Ajusta la ROI del próximo frame con la pose ya mapeada al frame completo."""
+        if not pose_landmarks:
+            self.roi = None
+            self.lost += 1
+            return
+        H, W = frame_shape[:2]
+        pts = np.array([(lm.x, lm.y) for lm in pose_landmarks.landmark
+                        if lm.visibility >= self.min_visibility], dtype=np.float32)
+        if len(pts) < 4:
+            self.roi = None
+            self.lost += 1
+            return
+
+        x0, y0 = pts.min(axis=0)
+        x1, y1 = pts.max(axis=0)
+        mx = max((x1 - x0) * self.margin, self.min_size / 2 - (x1 - x0) / 2, 0)
+        my = max((y1 - y0) * self.margin, self.min_size / 2 - (y1 - y0) / 2, 0)
+        new_roi = (int(max(0, (x0 - mx) * W)), int(max(0, (y0 - my) * H)),
+                   int(min(W, (x1 + mx) * W)), int(min(H, (y1 + my) * H)))
+        if new_roi[2] - new_roi[0] < 2 or new_roi[3] - new_roi[1] < 2:
+            self.roi = None
+            return
+
+        # Mantiene la ROI actual mientras la persona siga dentro y no se haya
+        # achicado mucho: un recorte estable ayuda al seguimiento de MediaPipe
+        old = self.roi
+        if old is not None:
+            inside = (new_roi[0] >= old[0] and new_roi[1] >= old[1] and
+                      new_roi[2] <= old[2] and new_roi[3] <= old[3])
+            old_area = float((old[2] - old[0]) * (old[3] - old[1]))
+            new_area = (new_roi[2] - new_roi[0]) * (new_roi[3] - new_roi[1])
+            if inside and new_area / old_area > 0.6:
+                return
+        self.roi = new_roi
+
+
+def _map_landmark_list(landmark_list, x0, y0, sx, sy):
+    for lm in landmark_list.landmark:
+        lm.x = lm.x * sx + x0
+        lm.y = lm.y * sy + y0
+        lm.z = lm.z * sx  # z de MediaPipe está en la escala del ancho
+
+
+def map_results(holistic_results, face_mesh_results, roi, frame_shape):
+    """
+    Pasa las landmarks normalizadas al recorte `roi` a coordenadas
+    normalizadas del frame completo (modifica los resultados en el lugar).
+    """
+    if roi is None:
+        return
+    H, W = frame_shape[:2]
+    x0, y0 = roi[0] / float(W), roi[1] / float(H)
+    sx, sy = (roi[2] - roi[0]) / float(W), (roi[3] - roi[1]) / float(H)
+    for name in ("pose_landmarks", "face_landmarks", "left_hand_landmarks", "right_hand_landmarks"):
+        landmark_list = getattr(holistic_results, name, None)
+        if landmark_list:
+            _map_landmark_list(landmark_list, x0, y0, sx, sy)
+    if face_mesh_results is not None and face_mesh_results.multi_face_landmarks:
+        for face_landmarks in face_mesh_results.multi_face_landmarks:
+            _map_landmark_list(face_landmarks, x0, y0, sx, sy)
+
+
+def build_levels(width, complexity, min_width=256, step=0.8):
+    """
+    Escalera de calidad, de mayor a menor costo: primero se reduce el ancho
+    de inferencia y, llegado al mínimo, se baja model_complexity.
+    """
+    levels = []
+    for c in range(complexity, -1, -1):
+        w = float(width)
+        while w >= min_width:
+            levels.append((int(w), c))
+            w *= step
+    return levels or [(int(width), complexity)]
+
+
+class LatencyBudget:
+    """
+    Ajusta resolución y model_complexity según la latencia medida de la
+    inferencia: si el promedio supera el presupuesto baja un nivel, y si
+    queda holgado (por debajo de `headroom` del presupuesto) sube uno.
+    """
+
+    def __init__(self, budget_ms, width, complexity, min_width=256, alpha=0.1,
+                 headroom=0.6, cooldown=30):
+        self.budget = budget_ms / 1000.0
+        self.levels = build_levels(width, complexity, min_width)
+        self.level = 0
+        self.alpha = alpha
+        self.headroom = headroom
+        self.cooldown = cooldown
+        self.avg = None
+        self._frames_since_change = 0
+
+    @property
+    def width(self):
+        return self.levels[self.level][0]
+
+    @property
+    def complexity(self):
+        return self.levels[self.level][1]
+
+    def pin_complexity(self, complexity):
+        """Descarta los niveles con otro model_complexity (p. ej. si no se pudo cargar)."""
+        width = self.width
+        self.levels = [lvl for lvl in self.levels if lvl[1] == complexity] or [(width, complexity)]
+        self.level = min(range(len(self.levels)), key=lambda i: abs(self.levels[i][0] - width))
+
+    def record(self, seconds):
+        """Registra la latencia de un frame; devuelve True si cambió de nivel."""
+        self.avg = seconds if self.avg is None else self.alpha * seconds + (1 - self.alpha) * self.avg
+        self._frames_since_change += 1
+        if self._frames_since_change < self.cooldown:
+            return False
+
+        new_level = self.level
+        if self.avg > self.budget and self.level < len(self.levels) - 1:
+            new_level += 1
+        elif self.avg < self.budget * self.headroom and self.level > 0:
+            new_level -= 1
+        if new_level == self.level:
+            return False
+        self.level = new_level
+        self._frames_since_change = 0
+        self.avg = None
+        return True
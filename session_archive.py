@@ -0,0 +1,382 @@
+"""
+Archivo de sesiones grabadas con consultas por tiempo y por articulación.
+
+Cada sesión se guarda como un .naorec (el formato de NAOcontrol/recorder.py:
+bloques con timestamps float64 y una columna float32 por articulación) más
+un índice al lado (<sesión>.idx.npz) con, por bloque, su posición en el
+archivo, filas, primer y último timestamp y el mínimo/máximo de cada
+articulación. Las lecturas usan np.memmap: una consulta solo toca los
+bloques de su rango de tiempo y las columnas pedidas, y la iteración por
+bloques recorre sesiones de cualquier largo con memoria constante.
+
+El catálogo (catalog.json) guarda nombre, paciente, columnas y rango de
+tiempo de cada sesión.
+
+    python session_archive.py add NAOcontrol/nao_angles_*.csv --patient P07
+    python session_archive.py list
+    python session_archive.py query nao_angles_20250926_102502 --from 720 --to 840 \\
+        --joints LShoulderPitch,LShoulderRoll --csv hombro.csv
+"""
+import argparse
+import csv
+import json
+import os
+
+import numpy as np
+
+from NAOcontrol.recorder import (CHUNK_HEADER, CHUNK_MAGIC, CHUNK_ROWS, EXTENSION,
+                                 FILE_HEADER, MAGIC, NAMES_LEN, VERSION, file_header, iter_chunks)
+
+ARCHIVE_DIR = "sesiones"
+CATALOG = "catalog.json"
+INDEX_SUFFIX = ".idx.npz"
+
+
+# ======================
+# Lectura de una sesión
+# ======================
+class Session:
+    """
+    Sesión abierta con memmap; los arreglos devueltos por iter_chunks son
+    vistas. close() suelta la referencia de la sesión: el archivo se
+    desmapea cuando no queda ninguna vista viva.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.data = np.memmap(path, dtype=np.uint8, mode="r")
+        self.columns, self.header_size = self._read_header()
+        self.column_index = dict((name, i) for i, name in enumerate(self.columns))
+        index_path = path + INDEX_SUFFIX
+        self.index = load_index(index_path, path)
+        if self.index is None:
+            self.index = self._scan()
+            save_index(index_path, path, self.index)
+
+    def _read_header(self):
+        data = self.data
+        magic, version, ncols = FILE_HEADER.unpack(bytes(data[:FILE_HEADER.size]))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("{} no es una grabación {}".format(self.path, MAGIC.decode("ascii")))
+        pos = FILE_HEADER.size
+        length, = NAMES_LEN.unpack(bytes(data[pos:pos + NAMES_LEN.size]))
+        pos += NAMES_LEN.size
+        columns = bytes(data[pos:pos + length]).decode("utf-8").split(",")
+        return columns, pos + length
+
+    def _scan(self):
+        """Arma el índice recorriendo las cabeceras de los bloques."""
+        ncols = len(self.columns)
+        entries = []
+        pos = self.header_size
+        size = len(self.data)
+        while pos + CHUNK_HEADER.size <= size:
+            magic, rows, t_first, t_last = CHUNK_HEADER.unpack(bytes(self.data[pos:pos + CHUNK_HEADER.size]))
+            if magic != CHUNK_MAGIC:
+                raise ValueError("Bloque inválido en {} (byte {})".format(self.path, pos))
+            offset = pos + CHUNK_HEADER.size
+            end = offset + rows * (8 + 4 * ncols)
+            if end > size:
+                break  # bloque final cortado
+            values = self.data[offset + rows * 8:end].view("<f4").reshape(ncols, rows)
+            entries.append((offset, rows, t_first, t_last, _nanmin(values), _nanmax(values)))
+            pos = end
+        return _index_arrays(entries, ncols)
+
+    # ----- metadatos -----
+    @property
+    def rows(self):
+        return int(self.index["rows"].sum())
+
+    @property
+    def t_start(self):
+        return float(self.index["t_first"][0]) if len(self.index["rows"]) else None
+
+    @property
+    def t_end(self):
+        return float(self.index["t_last"][-1]) if len(self.index["rows"]) else None
+
+    # ----- lectura -----
+    def _chunk(self, k, joints):
+        offset = int(self.index["offset"][k])
+        rows = int(self.index["rows"][k])
+        timestamps = self.data[offset:offset + rows * 8].view("<f8")
+        base = offset + rows * 8
+        values = {}
+        for name in joints:
+            start = base + self.column_index[name] * rows * 4
+            values[name] = self.data[start:start + rows * 4].view("<f4")
+        return timestamps, values
+
+    def _bounds(self, start, end, relative):
+        if relative and self.t_start is not None:
+            start = None if start is None else self.t_start + start
+            end = None if end is None else self.t_start + end
+        return (-np.inf if start is None else start), (np.inf if end is None else end)
+
+    def chunk_range(self, start=None, end=None, relative=False):
+        """Bloques [k0, k1) que se solapan con [start, end]."""
+        start, end = self._bounds(start, end, relative)
+        k0 = int(np.searchsorted(self.index["t_last"], start, side="left"))
+        k1 = int(np.searchsorted(self.index["t_first"], end, side="right"))
+        return k0, max(k0, k1)
+
+    def iter_chunks(self, start=None, end=None, joints=None, relative=False):
+        """Genera (timestamps, {articulación: valores}) recortados a [start, end]."""
+        joints = self._joints(joints)
+        k0, k1 = self.chunk_range(start, end, relative)
+        start, end = self._bounds(start, end, relative)
+        for k in range(k0, k1):
+            timestamps, values = self._chunk(k, joints)
+            if timestamps[0] < start or timestamps[-1] > end:
+                a = int(np.searchsorted(timestamps, start, side="left"))
+                b = int(np.searchsorted(timestamps, end, side="right"))
+                timestamps = timestamps[a:b]
+                values = dict((name, v[a:b]) for name, v in values.items())
+            if len(timestamps):
+                yield timestamps, values
+
+    def query(self, start=None, end=None, joints=None, relative=False):
+        """Copia en memoria de un rango: timestamps (N,) y {articulación: (N,)}."""
+        joints = self._joints(joints)
+        stamps = []
+        parts = dict((name, []) for name in joints)
+        for timestamps, values in self.iter_chunks(start, end, joints, relative):
+            stamps.append(np.array(timestamps))
+            for name in joints:
+                parts[name].append(np.array(values[name], dtype=np.float64))
+        if not stamps:
+            return np.zeros(0), dict((name, np.zeros(0)) for name in joints)
+        return np.concatenate(stamps), dict((name, np.concatenate(v)) for name, v in parts.items())
+
+    def iter_rows(self, start=None, end=None, joints=None, relative=False):
+        """Genera (timestamp, {articulación: valor o None}) fila por fila."""
+        joints = self._joints(joints)
+        for timestamps, values in self.iter_chunks(start, end, joints, relative):
+            for i, ts in enumerate(timestamps.tolist()):
+                row = {}
+                for name in joints:
+                    v = float(values[name][i])
+                    row[name] = v if v == v else None
+                yield ts, row
+
+    def find(self, joint, low=-np.inf, high=np.inf, start=None, end=None, relative=False):
+        """
+        Timestamps donde joint está en [low, high]. Los resúmenes min/max
+        del índice descartan bloques enteros sin leerlos.
+        """
+        col = self.column_index[joint]
+        k0, k1 = self.chunk_range(start, end, relative)
+        lo, hi = self.index["min"][k0:k1, col], self.index["max"][k0:k1, col]
+        candidates = np.flatnonzero((hi >= low) & (lo <= high)) + k0
+        bounds = self._bounds(start, end, relative)
+        out = []
+        for k in candidates:
+            timestamps, values = self._chunk(k, [joint])
+            v = values[joint]
+            mask = (v >= low) & (v <= high) & (timestamps >= bounds[0]) & (timestamps <= bounds[1])
+            out.append(np.array(timestamps[mask]))
+        return np.concatenate(out) if out else np.zeros(0)
+
+    def _joints(self, joints):
+        if joints is None:
+            return list(self.columns)
+        missing = [j for j in joints if j not in self.column_index]
+        if missing:
+            raise KeyError("Articulaciones no grabadas: {}".format(", ".join(missing)))
+        return list(joints)
+
+    def close(self):
+        # Sin cerrar el mmap: las vistas entregadas lo mantienen vivo
+        self.data = None
+
+
+def _nanmin(values):
+    with np.errstate(invalid="ignore"):
+        return np.fmin.reduce(values, axis=1) if values.shape[1] else np.full(values.shape[0], np.nan)
+
+
+def _nanmax(values):
+    with np.errstate(invalid="ignore"):
+        return np.fmax.reduce(values, axis=1) if values.shape[1] else np.full(values.shape[0], np.nan)
+
+
+def _index_arrays(entries, ncols):
+    return {
+        "offset": np.array([e[0] for e in entries], dtype=np.int64),
+        "rows": np.array([e[1] for e in entries], dtype=np.int64),
+        "t_first": np.array([e[2] for e in entries], dtype=np.float64),
+        "t_last": np.array([e[3] for e in entries], dtype=np.float64),
+        "min": np.array([e[4] for e in entries], dtype=np.float32).reshape(len(entries), ncols),
+        "max": np.array([e[5] for e in entries], dtype=np.float32).reshape(len(entries), ncols),
+    }
+
+
+def save_index(index_path, data_path, index):
+    np.savez(index_path, size=os.path.getsize(data_path), **index)
+
+
+def load_index(index_path, data_path):
+    """Índice guardado, o None si falta o el archivo creció desde entonces."""
+    if not os.path.exists(index_path):
+        return None
+    with np.load(index_path) as f:
+        if int(f["size"]) != os.path.getsize(data_path):
+            return None
+        return dict((key, f[key]) for key in f.files if key != "size")
+
+
+# ======================
+# Importación
+# ======================
+def source_chunks(path, chunk_rows=CHUNK_ROWS):
+    """Bloques (timestamps, {columna: valores}) de un CSV o .naorec, sin cargarlo entero."""
+    if path.endswith(EXTENSION):
+        for timestamps, values in iter_chunks(path):
+            yield (np.frombuffer(timestamps, dtype=np.float64),
+                   dict((k, np.frombuffer(v, dtype=np.float32)) for k, v in values.items()))
+        return
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        names = header[1:]
+        block = []
+        for row in reader:
+            if row:
+                block.append([float(c) if c.strip() else np.nan for c in row[:len(header)]])
+            if len(block) == chunk_rows:
+                yield _block_arrays(block, names)
+                block = []
+        if block:
+            yield _block_arrays(block, names)
+
+
+def _block_arrays(block, names):
+    data = np.array(block, dtype=np.float64)
+    return data[:, 0], dict((name, data[:, i + 1]) for i, name in enumerate(names))
+
+
+def write_session(out_path, paths, chunk_rows=CHUNK_ROWS):
+    """Une las grabaciones en un .naorec indexado; devuelve las columnas."""
+    columns = None
+    entries = []
+    with open(out_path, "wb") as out:
+        for path in paths:
+            for timestamps, values in source_chunks(path, chunk_rows):
+                if columns is None:
+                    columns = list(values)
+                    out.write(file_header(columns))
+                order = np.argsort(timestamps, kind="stable")
+                timestamps = np.ascontiguousarray(timestamps[order], dtype="<f8")
+                n = len(timestamps)
+                block = np.full((len(columns), n), np.nan, dtype="<f4")
+                for i, name in enumerate(columns):
+                    if name in values:
+                        block[i] = values[name][order]
+                out.write(CHUNK_HEADER.pack(CHUNK_MAGIC, n, timestamps[0], timestamps[-1]))
+                offset = out.tell()
+                out.write(timestamps.tobytes())
+                out.write(block.tobytes())
+                entries.append((offset, n, timestamps[0], timestamps[-1], _nanmin(block), _nanmax(block)))
+    if columns is None:
+        os.remove(out_path)
+        raise ValueError("Sin filas en {}".format(", ".join(paths)))
+    save_index(out_path + INDEX_SUFFIX, out_path, _index_arrays(entries, len(columns)))
+    return columns
+
+
+class SessionArchive:
+    """Carpeta de sesiones indexadas con su catálogo."""
+
+    def __init__(self, root=ARCHIVE_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.catalog_path = os.path.join(root, CATALOG)
+        self.catalog = {}
+        if os.path.exists(self.catalog_path):
+            with open(self.catalog_path) as f:
+                self.catalog = json.load(f)
+
+    def _save_catalog(self):
+        tmp = self.catalog_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.catalog, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.catalog_path)
+
+    def add(self, paths, name=None, patient=None):
+        """Importa una o varias grabaciones (p. ej. los archivos rotados de una sesión)."""
+        if isinstance(paths, str):
+            paths = [paths]
+        name = name or os.path.splitext(os.path.basename(paths[0]))[0]
+        data_path = os.path.join(self.root, name + EXTENSION)
+        columns = write_session(data_path, paths)
+        session = Session(data_path)
+        self.catalog[name] = {
+            "file": name + EXTENSION, "patient": patient, "sources": [os.path.basename(p) for p in paths],
+            "columns": columns, "rows": session.rows, "t_start": session.t_start, "t_end": session.t_end,
+        }
+        session.close()
+        self._save_catalog()
+        return name
+
+    def sessions(self, patient=None):
+        return [dict(entry, name=name) for name, entry in sorted(self.catalog.items())
+                if patient is None or entry.get("patient") == patient]
+
+    def open(self, name):
+        if name not in self.catalog:
+            raise KeyError("No existe la sesión {}".format(name))
+        return Session(os.path.join(self.root, self.catalog[name]["file"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archivo indexado de sesiones grabadas")
+    parser.add_argument("--root", default=ARCHIVE_DIR, help="carpeta del archivo")
+    sub = parser.add_subparsers(dest="command", required=True)
+    add = sub.add_parser("add", help="importa grabaciones (CSV o .naorec)")
+    add.add_argument("files", nargs="+")
+    add.add_argument("--name", help="una sola sesión con todos los archivos, con este nombre")
+    add.add_argument("--patient")
+    lst = sub.add_parser("list", help="sesiones del archivo")
+    lst.add_argument("--patient")
+    query = sub.add_parser("query", help="rango de tiempo y articulaciones de una sesión")
+    query.add_argument("session")
+    query.add_argument("--from", dest="start", type=float, help="segundos desde el inicio de la sesión")
+    query.add_argument("--to", dest="end", type=float, help="segundos desde el inicio de la sesión")
+    query.add_argument("--absolute", action="store_true", help="--from/--to son timestamps absolutos")
+    query.add_argument("--joints", help="lista separada por comas (por defecto, todas)")
+    query.add_argument("--csv", help="guarda el resultado en este CSV")
+    args = parser.parse_args()
+
+    archive = SessionArchive(args.root)
+    if args.command == "add":
+        groups = [args.files] if args.name else [[f] for f in args.files]
+        for files in groups:
+            name = archive.add(files, args.name, args.patient)
+            entry = archive.catalog[name]
+            print("{}: {} filas, {:.1f} s".format(name, entry["rows"], entry["t_end"] - entry["t_start"]))
+    elif args.command == "list":
+        for entry in archive.sessions(args.patient):
+            print("{:<40} {:<8} {:>8} filas {:>8.1f} s".format(
+                entry["name"], entry["patient"] or "-", entry["rows"], entry["t_end"] - entry["t_start"]))
+    else:
+        session = archive.open(args.session)
+        joints = args.joints.split(",") if args.joints else None
+        joints = session._joints(joints)
+        rows = 0
+        out = open(args.csv, "w", newline="") if args.csv else None
+        writer = csv.writer(out) if out else None
+        if writer:
+            writer.writerow(["timestamp"] + joints)
+        for ts, row in session.iter_rows(args.start, args.end, joints, relative=not args.absolute):
+            rows += 1
+            if writer:
+                writer.writerow(["%.3f" % ts] + ["" if row[j] is None else "%.7g" % row[j] for j in joints])
+        if out:
+            out.close()
+        print("{} filas{}".format(rows, " -> " + args.csv if args.csv else ""))
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,389 @@
+"""
+Modo de dos cámaras: profundidad por triangulación en lugar de la z monocular
+de MediaPipe.
+
+Cada cámara corre en su propio proceso (captura + Holistic en paralelo, sin
+compartir el GIL) y manda sus landmarks con el timestamp de captura. El
+proceso principal empareja los frames de ambas cámaras por timestamp,
+triangula las articulaciones clave con la calibración estéreo guardada y
+devuelve landmarks (33, 4) en el mismo espacio que los de MediaPipe para la
+cámara 1 (x, y normalizados a la imagen; z relativa a las caderas en la
+escala de x), listos para HolisticData.bodyJointsArray.
+
+Calibración (una vez, con pares de fotos de un tablero de ajedrez):
+    python stereo_fusion.py calibrate fotos_izq/ fotos_der/ --board 9x6 --square 0.025
+Uso desde Vision_comp.py:
+    python Vision_comp.py --source 0 --source2 1 --stereo stereo_calib.npz
+"""
+import argparse
+import glob
+import multiprocessing
+import os
+import queue
+import time
+from collections import deque
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+from frame_sources import FrameSource, open_source
+from holistic_data import JointType, X, Y, Z, VISIBILITY, pose_landmarks_to_array
+
+CALIBRATION_FILE = "stereo_calib.npz"
+MAX_SKEW = 0.02          # s de diferencia máxima entre los frames de un par
+MIN_VISIBILITY = 0.5     # en ambas cámaras para triangular una articulación
+MAX_REPROJECTION_PX = 15.0
+QUEUE_SIZE = 2
+JPEG_QUALITY = 80
+
+# Articulaciones que se triangulan (las que usan los ángulos de brazos)
+STEREO_JOINTS = [
+    JointType.LeftShoulder, JointType.RightShoulder,
+    JointType.LeftElbow, JointType.RightElbow,
+    JointType.LeftWrist, JointType.RightWrist,
+    JointType.LeftHip, JointType.RightHip,
+]
+
+
+# ======================
+# Calibración
+# ======================
+class StereoCalibration:
+    """Intrínsecos de cada cámara y pose de la cámara 2 respecto de la 1."""
+
+    def __init__(self, K1, D1, K2, D2, R, T, image_size):
+        self.K1, self.D1 = np.asarray(K1, np.float64), np.asarray(D1, np.float64)
+        self.K2, self.D2 = np.asarray(K2, np.float64), np.asarray(D2, np.float64)
+        self.R, self.T = np.asarray(R, np.float64), np.asarray(T, np.float64).reshape(3, 1)
+        self.image_size = tuple(int(v) for v in image_size)  # (ancho, alto)
+
+    def save(self, path=CALIBRATION_FILE):
+        np.savez(path, K1=self.K1, D1=self.D1, K2=self.K2, D2=self.D2, R=self.R, T=self.T,
+                 image_size=np.array(self.image_size))
+
+    @classmethod
+    def load(cls, path=CALIBRATION_FILE):
+        with np.load(path) as f:
+            return cls(f["K1"], f["D1"], f["K2"], f["D2"], f["R"], f["T"], f["image_size"])
+
+
+def calibrate(left_dir, right_dir, board=(9, 6), square=0.025):
+    """Calibración estéreo con pares de fotos (mismo nombre en ambas carpetas)."""
+    objp = np.zeros((board[0] * board[1], 3), np.float32)
+    objp[:, :2] = np.mgrid[0:board[0], 0:board[1]].T.reshape(-1, 2) * square
+    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 1e-3)
+
+    object_points, left_points, right_points = [], [], []
+    size = None
+    for left_path in sorted(glob.glob(os.path.join(left_dir, "*"))):
+        right_path = os.path.join(right_dir, os.path.basename(left_path))
+        left, right = cv2.imread(left_path, cv2.IMREAD_GRAYSCALE), cv2.imread(right_path, cv2.IMREAD_GRAYSCALE)
+        if left is None or right is None:
+            continue
+        ok_l, corners_l = cv2.findChessboardCorners(left, board)
+        ok_r, corners_r = cv2.findChessboardCorners(right, board)
+        if not (ok_l and ok_r):
+            continue
+        size = left.shape[::-1]
+        object_points.append(objp)
+        left_points.append(cv2.cornerSubPix(left, corners_l, (11, 11), (-1, -1), criteria))
+        right_points.append(cv2.cornerSubPix(right, corners_r, (11, 11), (-1, -1), criteria))
+    if len(object_points) < 5:
+        raise ValueError("Se necesitan al menos 5 pares con el tablero visible (hay {})".format(len(object_points)))
+
+    _, K1, D1, _, _ = cv2.calibrateCamera(object_points, left_points, size, None, None)
+    _, K2, D2, _, _ = cv2.calibrateCamera(object_points, right_points, size, None, None)
+    error, K1, D1, K2, D2, R, T, _, _ = cv2.stereoCalibrate(
+        object_points, left_points, right_points, K1, D1, K2, D2, size,
+        criteria=criteria, flags=cv2.CALIB_FIX_INTRINSIC)
+    return StereoCalibration(K1, D1, K2, D2, R, T, size), error, len(object_points)
+
+
+# ======================
+# Triangulación
+# ======================
+def _pixels(landmarks, joints, shape):
+    height, width = shape[:2]
+    pts = landmarks[joints][:, [X, Y]].astype(np.float64)
+    pts[:, 0] *= width
+    pts[:, 1] *= height
+    return pts
+
+
+def _scale_calibration(K, shape, image_size):
+    """Ajusta K si la cámara entrega otra resolución que la de la calibración."""
+    height, width = shape[:2]
+    if (width, height) == image_size:
+        return K
+    K = K.copy()
+    K[0] *= width / float(image_size[0])
+    K[1] *= height / float(image_size[1])
+    return K
+
+
+def fuse_landmarks(calib, lm1, lm2, shape1, shape2, joints=STEREO_JOINTS,
+                   min_visibility=MIN_VISIBILITY, max_error=MAX_REPROJECTION_PX):
+    """
+    Landmarks (33, 4) de la cámara 1 con las articulaciones visibles en
+    ambas cámaras reemplazadas por su triangulación. Devuelve (landmarks,
+    cantidad de articulaciones trianguladas).
+    """
+    fused = np.array(lm1, dtype=np.float32, copy=True)
+    joints = np.asarray(joints)
+    visible = (lm1[joints, VISIBILITY] >= min_visibility) & (lm2[joints, VISIBILITY] >= min_visibility)
+    joints = joints[visible]
+    if len(joints) < 2:
+        return fused, 0
+
+    K1 = _scale_calibration(calib.K1, shape1, calib.image_size)
+    K2 = _scale_calibration(calib.K2, shape2, calib.image_size)
+    P1 = K1 @ np.hstack([np.eye(3), np.zeros((3, 1))])
+    P2 = K2 @ np.hstack([calib.R, calib.T])
+    pts1 = cv2.undistortPoints(_pixels(lm1, joints, shape1).reshape(-1, 1, 2), K1, calib.D1, P=K1).reshape(-1, 2)
+    pts2 = cv2.undistortPoints(_pixels(lm2, joints, shape2).reshape(-1, 1, 2), K2, calib.D2, P=K2).reshape(-1, 2)
+    homogeneous = cv2.triangulatePoints(P1, P2, pts1.T, pts2.T)
+    points = (homogeneous[:3] / homogeneous[3]).T  # (N, 3) en metros, sistema de la cámara 1
+
+    # Descarta puntos detrás de la cámara o que no reproyectan sobre las detecciones
+    proj1 = (P1 @ np.vstack([points.T, np.ones(len(points))])).T
+    proj2 = (P2 @ np.vstack([points.T, np.ones(len(points))])).T
+    with np.errstate(divide="ignore", invalid="ignore"):
+        err1 = np.linalg.norm(proj1[:, :2] / proj1[:, 2:] - pts1, axis=1)
+        err2 = np.linalg.norm(proj2[:, :2] / proj2[:, 2:] - pts2, axis=1)
+    good = (points[:, 2] > 0) & (proj2[:, 2] > 0) & (err1 < max_error) & (err2 < max_error)
+    if good.sum() < 2:
+        return fused, 0
+    joints, points = joints[good], points[good]
+
+    # Profundidad de referencia: el centro de las caderas (como MediaPipe) o,
+    # si no se triangularon, el promedio de lo triangulado
+    hips = np.isin(joints, [JointType.LeftHip, JointType.RightHip])
+    z_ref = points[hips, 2].mean() if hips.sum() == 2 else points[:, 2].mean()
+
+    height, width = shape1[:2]
+    fx, fy, cx, cy = K1[0, 0], K1[1, 1], K1[0, 2], K1[1, 2]
+    fused[joints, X] = (fx * points[:, 0] / points[:, 2] + cx) / width
+    fused[joints, Y] = (fy * points[:, 1] / points[:, 2] + cy) / height
+    # Un desplazamiento en profundidad dZ equivale a dZ * fx / (Z * ancho) en
+    # unidades de x, la misma escala que usa MediaPipe para z
+    fused[joints, Z] = (points[:, 2] - z_ref) * fx / (z_ref * width)
+    return fused, len(joints)
+
+
+# ======================
+# Procesos por cámara
+# ======================
+def _serialize(landmarks):
+    return landmarks.SerializeToString() if landmarks else None
+
+
+def _put_latest(out_queue, item):
+    """Cola de los más recientes: si está llena se descarta el más viejo."""
+    while True:
+        try:
+            out_queue.put_nowait(item)
+            return
+        except queue.Full:
+            try:
+                out_queue.get_nowait()
+            except queue.Empty:
+                pass
+
+
+def camera_worker(camera_id, spec, out_queue, stop_event, model_complexity, send_frames):
+    """Captura + Holistic de una cámara; manda (id, ts, forma, landmarks, jpeg)."""
+    import mediapipe as mp
+
+    holistic = mp.solutions.holistic.Holistic(static_image_mode=False, model_complexity=model_complexity)
+    try:
+        with open_source(spec) as source:
+            for capture_time, frame in source:
+                if stop_event.is_set():
+                    break
+                results = holistic.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+                jpeg = None
+                if send_frames:
+                    jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])[1].tobytes()
+                message = (camera_id, capture_time, frame.shape,
+                           _serialize(results.pose_landmarks), _serialize(results.face_landmarks),
+                           _serialize(results.left_hand_landmarks), _serialize(results.right_hand_landmarks),
+                           jpeg)
+                _put_latest(out_queue, message)
+    finally:
+        holistic.close()
+        _put_latest(out_queue, None)
+
+
+class StreamAligner:
+    """Empareja los frames de dos cámaras cuyo timestamp difiere a lo sumo max_skew."""
+
+    def __init__(self, max_skew=MAX_SKEW, history=4):
+        self.max_skew = max_skew
+        self.buffers = (deque(maxlen=history), deque(maxlen=history))
+        self.pairs = 0
+        self.unmatched = 0
+
+    def push(self, camera_id, timestamp, item):
+        """Devuelve (item_cámara_0, item_cámara_1, desfase) o None."""
+        other = self.buffers[1 - camera_id]
+        best = None
+        for i, (ts, _) in enumerate(other):
+            if abs(ts - timestamp) <= self.max_skew and (best is None or abs(ts - timestamp) < abs(other[best][0] - timestamp)):
+                best = i
+        if best is None:
+            own = self.buffers[camera_id]
+            if len(own) == own.maxlen:
+                self.unmatched += 1
+            own.append((timestamp, item))
+            return None
+        # Lo anterior al par ya no se va a emparejar
+        for _ in range(best):
+            other.popleft()
+            self.unmatched += 1
+        ts_other, match = other.popleft()
+        self.unmatched += len(self.buffers[camera_id])
+        self.buffers[camera_id].clear()
+        self.pairs += 1
+        pair = (item, match) if camera_id == 0 else (match, item)
+        return pair[0], pair[1], timestamp - ts_other
+
+
+class StereoFrame:
+    """Par fusionado: imagen y resultados de la cámara 1 más los landmarks triangulados."""
+    __slots__ = ("image", "results", "fused_landmarks", "triangulated", "skew")
+
+    def __init__(self, image, results, fused_landmarks, triangulated, skew):
+        self.image = image
+        self.results = results
+        self.fused_landmarks = fused_landmarks
+        self.triangulated = triangulated
+        self.skew = skew
+
+
+def _results_from_message(message):
+    from mediapipe.framework.formats import landmark_pb2
+
+    def parse(data):
+        return landmark_pb2.NormalizedLandmarkList.FromString(data) if data else None
+    _, _, _, pose, face, left, right, _ = message
+    return SimpleNamespace(pose_landmarks=parse(pose), face_landmarks=parse(face),
+                           left_hand_landmarks=parse(left), right_hand_landmarks=parse(right),
+                           segmentation_mask=None)
+
+
+class StereoCapture(FrameSource):
+    """
+    Fuente para Vision_comp: itera (timestamp, StereoFrame). La inferencia ya
+    viene hecha por los procesos de cada cámara.
+    """
+
+    def __init__(self, spec1, spec2, calibration, model_complexity=1, send_frames=True,
+                 max_skew=MAX_SKEW, metrics=None):
+        self.calib = calibration if isinstance(calibration, StereoCalibration) else StereoCalibration.load(calibration)
+        self.name = "estereo"
+        self.aligner = StreamAligner(max_skew)
+        self.metrics = metrics
+        self.send_frames = send_frames
+        ctx = multiprocessing.get_context("spawn")
+        self.stop_event = ctx.Event()
+        self.queues = [ctx.Queue(QUEUE_SIZE), ctx.Queue(QUEUE_SIZE)]
+        self.workers = [
+            ctx.Process(target=camera_worker, args=(i, spec, self.queues[i], self.stop_event,
+                                                     model_complexity, send_frames), daemon=True)
+            for i, spec in enumerate((spec1, spec2))
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    def frames(self):
+        finished = [False, False]
+        while not all(finished):
+            for camera_id, q in enumerate(self.queues):
+                if finished[camera_id]:
+                    continue
+                try:
+                    message = q.get(timeout=0.005)
+                except queue.Empty:
+                    continue
+                if message is None:
+                    finished[camera_id] = True
+                    continue
+                pair = self.aligner.push(camera_id, message[1], message)
+                if pair is not None:
+                    yield self._fuse(*pair)
+            if any(finished):
+                break  # sin una de las cámaras no hay estéreo
+
+    def _fuse(self, msg1, msg2, skew):
+        start = time.time()
+        results = _results_from_message(msg1)
+        fused, count = None, 0
+        pose2 = _results_from_message(msg2).pose_landmarks
+        if results.pose_landmarks and pose2:
+            fused, count = fuse_landmarks(self.calib, pose_landmarks_to_array(results.pose_landmarks),
+                                          pose_landmarks_to_array(pose2), msg1[2], msg2[2])
+        if msg1[7] is not None:
+            image = cv2.imdecode(np.frombuffer(msg1[7], np.uint8), cv2.IMREAD_COLOR)
+        else:
+            # Sin ventana: solo hace falta la forma de la imagen (vista sin memoria)
+            image = np.broadcast_to(np.zeros(1, np.uint8), msg1[2])
+        if self.metrics is not None:
+            self.metrics.observe("desfase_estereo", abs(skew))
+            self.metrics.observe("triangulacion", time.time() - start)
+        capture_time = (msg1[1] + msg2[1]) / 2.0
+        return capture_time, StereoFrame(image, results, fused, count, skew)
+
+    def close(self):
+        self.stop_event.set()
+        for q in self.queues:
+            # Vacía las colas para que los procesos puedan terminar
+            try:
+                while True:
+                    q.get_nowait()
+            except (queue.Empty, OSError):
+                pass
+        for worker in self.workers:
+            worker.join(timeout=2)
+            if worker.is_alive():
+                worker.terminate()
+        print("Estéreo: {} pares, {} frames sin pareja".format(self.aligner.pairs, self.aligner.unmatched))
+
+
+class StereoEngine:
+    """
+    Reemplaza a InferenceEngine en modo estéreo: la inferencia ya se hizo en
+    los procesos de cada cámara, aquí solo se desarma el StereoFrame.
+    """
+
+    def process(self, packet):
+        stereo = packet.frame
+        packet.frame = stereo.image
+        packet.holistic_results = stereo.results
+        packet.fused_landmarks = stereo.fused_landmarks
+        return packet
+
+    def close(self):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibración estéreo para el modo de dos cámaras")
+    sub = parser.add_subparsers(dest="command", required=True)
+    cal = sub.add_parser("calibrate", help="calibra con pares de fotos de un tablero")
+    cal.add_argument("left_dir")
+    cal.add_argument("right_dir")
+    cal.add_argument("--board", default="9x6", help="esquinas interiores, p. ej. 9x6")
+    cal.add_argument("--square", type=float, default=0.025, help="lado del cuadrado en metros")
+    cal.add_argument("--out", default=CALIBRATION_FILE)
+    args = parser.parse_args()
+
+    board = tuple(int(v) for v in args.board.lower().split("x"))
+    calib, error, pairs = calibrate(args.left_dir, args.right_dir, board, args.square)
+    calib.save(args.out)
+    print("Calibración con {} pares, error RMS {:.3f} px, base {:.3f} m -> {}".format(
+        pairs, error, float(np.linalg.norm(calib.T)), args.out))
+
+
+if __name__ == "__main__":
+    main()
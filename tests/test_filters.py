@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from filters import FilterBank, joint_params, KALMAN_PARAMS
+
+KINDS = ("kalman", "one_euro", "ema")
+
+
+def test_unknown_kind():
+    with pytest.raises(ValueError):
+        FilterBank("mediana")
+
+
+@pytest.mark.parametrize("kind", KINDS)
+def test_first_measurement_passes_through(kind):
+    bank = FilterBank(kind, horizon=0.5)
+    out = bank.smooth({"HeadYaw": 12.0, "LHand": 1, "Extra": 3}, 0.0)
+    assert out == {"HeadYaw": 12.0, "LHand": 1.0, "Extra": 3.0}
+
+
+@pytest.mark.parametrize("kind", KINDS)
+def test_noise_is_reduced(kind):
+    rng = np.random.default_rng(1)
+    bank = FilterBank(kind)
+    raw, out = [], []
+    for i in range(300):
+        value = 20.0 + rng.normal(0, 3)
+        raw.append(value)
+        out.append(bank.smooth({"LShoulderPitch": value}, i / 30.0)["LShoulderPitch"])
+    assert np.std(out[50:]) < 0.6 * np.std(raw[50:])
+    assert abs(np.mean(out[50:]) - 20.0) < 1.0
+
+
+@pytest.mark.parametrize("kind", ("kalman", "one_euro"))
+def test_velocity_and_horizon(kind):
+    bank = FilterBank(kind)
+    slope = 30.0  # grados/s
+    for i in range(120):
+        t = i / 30.0
+        out = bank.smooth({"HeadYaw": slope * t}, t)
+    assert abs(bank.v[bank.index["HeadYaw"]] - slope) < 3.0
+    ahead = bank.smooth({"HeadYaw": slope * 4.0}, 4.0, horizon=0.1)["HeadYaw"]
+    now = bank.x[bank.index["HeadYaw"]]
+    assert ahead == pytest.approx(now + bank.v[bank.index["HeadYaw"]] * 0.1)
+    if kind == "kalman":
+        # Velocidad constante: el Kalman sigue la rampa sin atraso
+        assert out["HeadYaw"] == pytest.approx(slope * (119 / 30.0), abs=1.0)
+
+
+def test_ema_ignores_horizon():
+    bank = FilterBank("ema", horizon=1.0)
+    bank.smooth({"HeadYaw": 0.0}, 0.0)
+    assert bank.smooth({"HeadYaw": 10.0}, 0.1)["HeadYaw"] == pytest.approx(2.0)
+
+
+def test_repeated_timestamp_does_not_update():
+    bank = FilterBank("kalman")
+    bank.smooth({"HeadYaw": 0.0}, 1.0)
+    assert bank.smooth({"HeadYaw": 50.0}, 1.0)["HeadYaw"] == 0.0
+
+
+def test_missing_joint_and_reset():
+    bank = FilterBank("one_euro")
+    bank.smooth({"HeadYaw": 0.0, "HeadPitch": 5.0}, 0.0)
+    out = bank.smooth({"HeadYaw": 1.0}, 0.033)
+    assert "HeadPitch" not in out
+    bank.reset()
+    assert bank.smooth({"HeadYaw": 40.0}, 0.066)["HeadYaw"] == 40.0
+
+
+def test_per_joint_params_override():
+    joints = ["HeadYaw", "LElbowRoll"]
+    params = joint_params(KALMAN_PARAMS, joints, {"LElbowRoll": {"r": 1.0}})
+    assert list(params["q"]) == [KALMAN_PARAMS["HeadYaw"]["q"], KALMAN_PARAMS["default"]["q"]]
+    assert list(params["r"]) == [KALMAN_PARAMS["HeadYaw"]["r"], 1.0]
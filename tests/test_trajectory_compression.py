@@ -0,0 +1,51 @@
+import numpy as np
+
+import trajectory_compression as tc
+
+
+def test_rdp_duplicate_timestamps_terminates():
+    t = np.array([0, .1, .2, .2, .3, .4])
+    y = np.array([0, 0, 0, 10, 0, 0.])
+    keys = tc.rdp_indices(t, y, 1.0)
+    assert keys[0] == 0 and keys[-1] == len(y) - 1
+    assert len(np.unique(keys)) == len(keys)
+
+
+def test_rdp_non_increasing_timestamps_terminates():
+    t = np.array([0, .3, .1, .2, .2, .05, .4])
+    y = np.array([0, 5, 0, 10, 0, 3, 0.])
+    keys = tc.rdp_indices(t, y, 1.0)
+    assert set(keys) <= set(range(len(y)))
+
+
+def test_rdp_respects_tolerance():
+    t = np.linspace(0, 10, 500)
+    y = 30 * np.sin(t)
+    keys = tc.rdp_indices(t, y, 0.5)
+    assert np.abs(np.interp(t, t[keys], y[keys]) - y).max() <= 0.5
+    assert len(keys) < len(t) / 5
+
+
+def test_merge_duplicates_sorts_and_averages():
+    t = np.array([0, .2, .1, .2, .3])
+    columns = {"a": np.array([0, 10, 1, np.nan, 3.]), "b": np.array([np.nan, 1, 2, 3, np.nan])}
+    t2, merged = tc.merge_duplicates(t, columns)
+    assert list(t2) == [0, .1, .2, .3]
+    assert list(merged["a"]) == [0, 1, 10, 3]
+    assert list(merged["b"][1:3]) == [2, 2]
+    assert np.isnan(merged["b"][0]) and np.isnan(merged["b"][3])
+
+
+def test_compress_csv_with_repeated_timestamps(tmp_path):
+    # Como to_csv de una grabación: "%.3f" y tramas del mismo recv repetidas
+    path = tmp_path / "s.csv"
+    lines = ["timestamp,HeadYaw,LHand"]
+    for i in range(600):
+        ts = 100 + (i // 2) * 0.016
+        lines.append("%.3f,%.3f,%d" % (ts, 20 * np.sin(i / 50.0) + (i % 2), i // 200 % 2))
+    path.write_text("\n".join(lines) + "\n")
+    timestamps, columns = tc.read_session(str(path))
+    assert np.all(np.diff(timestamps) > 0)
+    keyframes, report = tc.compress_session(timestamps, columns, 1.0)
+    assert report["max_error"] <= 1.0
+    assert report["rows_out"] < report["rows_in"]
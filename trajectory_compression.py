@@ -0,0 +1,242 @@
+"""
+Compresión de sesiones grabadas en keyframes por articulación.
+
+Cada articulación se simplifica por separado con Ramer–Douglas–Peucker en el
+espacio de ángulos: se conservan los puntos necesarios para que la
+interpolación lineal entre keyframes no se aparte más de la tolerancia (en
+grados) de ninguna muestra original. Las manos (0/1) conservan solo sus
+cambios de estado, y los tramos sin dato se simplifican por separado.
+
+La salida es un CSV con el mismo formato de siempre (timestamp +
+articulaciones) donde cada fila solo tiene las articulaciones que tienen
+keyframe en ese instante. cargar_csv.py completa las celdas vacías
+interpolando cada articulación entre sus keyframes (la misma reconstrucción
+que mide el error), así que lo reproduce en cualquiera de sus modos.
+
+    python trajectory_compression.py NAOcontrol/imitacion_nao.csv --tolerance 1.0 --out imitacion_kf.csv
+"""
+import argparse
+import csv
+import json
+import os
+
+import numpy as np
+
+TOLERANCE_DEG = 1.0
+STEP_JOINTS = ("LHand", "RHand")  # valores discretos: solo cambios de estado
+
+
+# ======================
+# Lectura y escritura
+# ======================
+def read_session(path):
+    """timestamps (N,) y {articulación: (N,) float} con NaN donde no hay dato."""
+    if path.endswith(".naorec"):
+        from NAOcontrol.recorder import iter_chunks
+        stamps, parts = [], {}
+        for timestamps, values in iter_chunks(path):
+            stamps.append(np.frombuffer(timestamps, dtype=np.float64))
+            for name, column in values.items():
+                parts.setdefault(name, []).append(np.frombuffer(column, dtype=np.float32))
+        if not stamps:
+            return np.zeros(0), {}
+        return merge_duplicates(np.concatenate(stamps),
+                                dict((k, np.concatenate(v).astype(np.float64)) for k, v in parts.items()))
+
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        rows = [r for r in reader if r]
+    names = header[1:]
+    data = np.full((len(rows), len(header)), np.nan)
+    for i, row in enumerate(rows):
+        for j, cell in enumerate(row[:len(header)]):
+            cell = cell.strip()
+            if cell:
+                data[i, j] = float(cell)
+    return merge_duplicates(data[:, 0], dict((name, data[:, j + 1]) for j, name in enumerate(names)))
+
+
+def merge_duplicates(timestamps, columns):
+    """
+    Ordena por tiempo y junta las filas con el mismo timestamp (p. ej. tramas
+    que llegaron en el mismo recv, o el "%.3f" de to_csv) en una sola, con el
+    promedio de los valores presentes. RDP y la interpolación necesitan
+    tiempos estrictamente crecientes.
+    """
+    order = np.argsort(timestamps, kind="stable")
+    timestamps = timestamps[order]
+    unique, starts = np.unique(timestamps, return_index=True)
+    if len(unique) == len(timestamps):
+        return timestamps, dict((name, y[order]) for name, y in columns.items())
+    merged = {}
+    for name, y in columns.items():
+        y = y[order]
+        valid = ~np.isnan(y)
+        sums = np.add.reduceat(np.where(valid, y, 0.0), starts)
+        counts = np.add.reduceat(valid.astype(np.int64), starts)
+        with np.errstate(invalid="ignore"):
+            merged[name] = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+    return unique, merged
+
+
+def write_keyframes(path, timestamps, columns, keyframes):
+    """CSV con una fila por instante que tenga algún keyframe."""
+    names = list(columns)
+    rows = np.unique(np.concatenate([keyframes[n] for n in names] + [np.zeros(0, dtype=np.int64)]))
+    keep = dict((n, np.zeros(len(timestamps), dtype=bool)) for n in names)
+    for n in names:
+        keep[n][keyframes[n]] = True
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["timestamp"] + names)
+        for i in rows:
+            writer.writerow(["%.3f" % timestamps[i]] +
+                            ["%.7g" % columns[n][i] if keep[n][i] else "" for n in names])
+    return len(rows)
+
+
+# ======================
+# Simplificación
+# ======================
+def rdp_indices(t, y, tolerance):
+    """
+    Índices que conserva RDP con error vertical máximo tolerance. En lugar
+    de recursión, cada pasada evalúa todos los segmentos a la vez: interpola
+    sobre los puntos conservados, busca el máximo error de cada segmento y
+    agrega ese punto donde supera la tolerancia. Solo suma índices nuevos y
+    termina cuando una pasada no agrega ninguno, aunque t tenga repetidos
+    (ver merge_duplicates).
+    """
+    n = len(y)
+    if n <= 2:
+        return np.arange(n)
+    keep = np.zeros(n, dtype=bool)
+    keep[[0, -1]] = True
+    while True:
+        idx = np.flatnonzero(keep)
+        err = np.abs(y - np.interp(t, t[idx], y[idx]))
+        err[keep] = 0.0  # con t repetidos un punto conservado puede quedar con error
+        seg_max = np.maximum.reduceat(err, idx[:-1])
+        segment = np.searchsorted(idx, np.arange(n), side="right") - 1
+        segment[-1] = len(idx) - 2
+        candidates = np.flatnonzero((err > tolerance) & (err == seg_max[segment]) & ~keep)
+        if len(candidates) == 0:
+            return idx
+        # Un punto por segmento (el primero con el error máximo)
+        _, first = np.unique(segment[candidates], return_index=True)
+        keep[candidates[first]] = True
+
+
+def step_indices(y):
+    """Para valores discretos: extremos y los dos lados de cada cambio."""
+    n = len(y)
+    if n <= 2:
+        return np.arange(n)
+    change = np.flatnonzero(y[1:] != y[:-1])
+    return np.unique(np.concatenate([[0, n - 1], change, change + 1]))
+
+
+def simplify_joint(t, y, tolerance, step=False):
+    """Índices (sobre la serie completa) de los keyframes de una articulación."""
+    valid = ~np.isnan(y)
+    if not valid.any():
+        return np.zeros(0, dtype=np.int64)
+    # Tramos contiguos con dato
+    edges = np.diff(np.concatenate([[0], valid.astype(np.int8), [0]]))
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    out = []
+    for a, b in zip(starts, ends):
+        local = step_indices(y[a:b]) if step else rdp_indices(t[a:b], y[a:b], tolerance)
+        out.append(local + a)
+    return np.concatenate(out)
+
+
+def reconstruct(t, keys, y):
+    """Serie reconstruida por interpolación lineal entre keyframes (NaN fuera de los tramos)."""
+    out = np.full(len(t), np.nan)
+    valid = ~np.isnan(y)
+    if len(keys) == 0:
+        return out
+    edges = np.diff(np.concatenate([[0], valid.astype(np.int8), [0]]))
+    for a, b in zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)):
+        k = keys[(keys >= a) & (keys < b)]
+        out[a:b] = np.interp(t[a:b], t[k], y[k])
+    return out
+
+
+def compress_session(timestamps, columns, tolerance=TOLERANCE_DEG):
+    """Devuelve ({articulación: índices}, reporte con relación y error)."""
+    keyframes, joints = {}, {}
+    all_errors = []
+    for name, y in columns.items():
+        keys = simplify_joint(timestamps, y, tolerance, step=name in STEP_JOINTS)
+        keyframes[name] = keys
+        valid = ~np.isnan(y)
+        err = np.abs(reconstruct(timestamps, keys, y)[valid] - y[valid])
+        all_errors.append(err)
+        joints[name] = {
+            "samples": int(valid.sum()), "keyframes": int(len(keys)),
+            "max_error": float(err.max()) if len(err) else 0.0,
+            "mean_error": float(err.mean()) if len(err) else 0.0,
+        }
+    errors = np.concatenate(all_errors) if all_errors else np.zeros(0)
+    samples = sum(j["samples"] for j in joints.values())
+    kept = sum(j["keyframes"] for j in joints.values())
+    rows_out = len(np.unique(np.concatenate(list(keyframes.values())))) if keyframes else 0
+    report = {
+        "tolerance": tolerance,
+        "rows_in": int(len(timestamps)), "rows_out": int(rows_out),
+        "samples_in": int(samples), "keyframes": int(kept),
+        "ratio": float(samples) / kept if kept else None,
+        "max_error": float(errors.max()) if len(errors) else 0.0,
+        "mean_error": float(errors.mean()) if len(errors) else 0.0,
+        "joints": joints,
+    }
+    return keyframes, report
+
+
+def print_report(path, report):
+    print("{}: {} filas -> {}, {} muestras -> {} keyframes (x{:.1f}), error máx {:.2f}°, medio {:.3f}°".format(
+        path, report["rows_in"], report["rows_out"], report["samples_in"], report["keyframes"],
+        report["ratio"] or 0.0, report["max_error"], report["mean_error"]))
+    for name, j in report["joints"].items():
+        if j["samples"]:
+            print("  {:<16} {:>6} -> {:>5}  máx {:.2f}  medio {:.3f}".format(
+                name, j["samples"], j["keyframes"], j["max_error"], j["mean_error"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reduce sesiones grabadas a keyframes por articulación")
+    parser.add_argument("inputs", nargs="+", help="CSV de ángulos o grabaciones .naorec")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE_DEG,
+                        help="error máximo de reconstrucción, en grados")
+    parser.add_argument("--out", help="CSV de salida (con una sola entrada)")
+    parser.add_argument("--out-dir", help="carpeta de salida: <nombre>_kf.csv por entrada")
+    parser.add_argument("--json", help="guarda los reportes en este archivo")
+    args = parser.parse_args()
+    if args.out and len(args.inputs) > 1:
+        parser.error("--out solo con una entrada; usar --out-dir")
+
+    reports = {}
+    for path in args.inputs:
+        timestamps, columns = read_session(path)
+        keyframes, report = compress_session(timestamps, columns, args.tolerance)
+        out = args.out
+        if args.out_dir:
+            os.makedirs(args.out_dir, exist_ok=True)
+            base = os.path.splitext(os.path.basename(path))[0]
+            out = os.path.join(args.out_dir, base + "_kf.csv")
+        if out:
+            write_keyframes(out, timestamps, columns, keyframes)
+            report["output"] = out
+        print_report(path, report)
+        reports[path] = report
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()